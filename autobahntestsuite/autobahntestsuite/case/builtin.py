@@ -0,0 +1,349 @@
+###############################################################################
+##
+##  Copyright (C) 2011-2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ("Cases",
+           "CaseSubCategories",
+           "createManifest",)
+
+##
+## All builtin cases, imported eagerly. Running wstest does not need this
+## module (see loadManifest() in __init__.py), which is used to create the
+## manifest of builtin cases:
+##
+##    python -m autobahntestsuite.case.builtin
+##
+
+import os, json
+
+from autobahntestsuite.case import CaseSetname, \
+                                   CaseBasename, \
+                                   CaseCategories, \
+                                   MANIFEST
+
+## subcategories of the builtin cases: some are added below from where cases
+## are generated
+##
+from autobahntestsuite.case import CaseSubCategories
+CaseSubCategories = dict(CaseSubCategories)
+
+## categories which only exist when optional dependencies are installed,
+## and the modules creating them
+##
+OPTIONAL_CATEGORIES = {"15": "case12_x_x",
+                       "16": "case12_x_x"}
+
+
+##
+## Cases
+##
+
+from case0_x_x import *
+
+from case1_1_1 import *
+from case1_1_2 import *
+from case1_1_3 import *
+from case1_1_4 import *
+from case1_1_5 import *
+from case1_1_6 import *
+from case1_1_7 import *
+from case1_1_8 import *
+
+from case1_2_1 import *
+from case1_2_2 import *
+from case1_2_3 import *
+from case1_2_4 import *
+from case1_2_5 import *
+from case1_2_6 import *
+from case1_2_7 import *
+from case1_2_8 import *
+
+from case2_1 import *
+from case2_2 import *
+from case2_3 import *
+from case2_4 import *
+from case2_5 import *
+from case2_6 import *
+from case2_7 import *
+from case2_8 import *
+from case2_9 import *
+from case2_10 import *
+from case2_11 import *
+
+from case3_1 import *
+from case3_2 import *
+from case3_3 import *
+from case3_4 import *
+from case3_5 import *
+from case3_6 import *
+from case3_7 import *
+
+from case4_1_1 import *
+from case4_1_2 import *
+from case4_1_3 import *
+from case4_1_4 import *
+from case4_1_5 import *
+
+from case4_2_1 import *
+from case4_2_2 import *
+from case4_2_3 import *
+from case4_2_4 import *
+from case4_2_5 import *
+
+from case5_1 import *
+from case5_2 import *
+from case5_3 import *
+from case5_4 import *
+from case5_5 import *
+from case5_6 import *
+from case5_7 import *
+from case5_8 import *
+from case5_9 import *
+from case5_10 import *
+from case5_11 import *
+from case5_12 import *
+from case5_13 import *
+from case5_14 import *
+from case5_15 import *
+from case5_16 import *
+from case5_17 import *
+from case5_18 import *
+from case5_19 import *
+from case5_20 import *
+
+from case6_1_1 import *
+from case6_1_2 import *
+from case6_1_3 import *
+
+from case6_2_1 import *
+from case6_2_2 import *
+from case6_2_3 import *
+from case6_2_4 import *
+
+from case6_3_1 import *
+from case6_3_2 import *
+
+from case6_4_1 import *
+from case6_4_2 import *
+from case6_4_3 import *
+from case6_4_4 import *
+
+from case6_x_x import *
+
+from case7_1_1 import *
+from case7_1_2 import *
+from case7_1_3 import *
+from case7_1_4 import *
+from case7_1_5 import *
+from case7_1_6 import *
+
+from case7_3_1 import *
+from case7_3_2 import *
+from case7_3_3 import *
+from case7_3_4 import *
+from case7_3_5 import *
+from case7_3_6 import *
+
+from case7_5_1 import *
+
+from case7_7_X import *
+from case7_9_X import *
+
+from case7_13_1 import *
+from case7_13_2 import *
+from case7_14_X import *
+
+from case9_1_1 import *
+from case9_1_2 import *
+from case9_1_3 import *
+from case9_1_4 import *
+from case9_1_5 import *
+from case9_1_6 import *
+
+from case9_2_1 import *
+from case9_2_2 import *
+from case9_2_3 import *
+from case9_2_4 import *
+from case9_2_5 import *
+from case9_2_6 import *
+
+from case9_3_1 import *
+from case9_3_2 import *
+from case9_3_3 import *
+from case9_3_4 import *
+from case9_3_5 import *
+from case9_3_6 import *
+from case9_3_7 import *
+from case9_3_8 import *
+from case9_3_9 import *
+
+from case9_4_1 import *
+from case9_4_2 import *
+from case9_4_3 import *
+from case9_4_4 import *
+from case9_4_5 import *
+from case9_4_6 import *
+from case9_4_7 import *
+from case9_4_8 import *
+from case9_4_9 import *
+
+from case9_5_1 import *
+from case9_5_2 import *
+from case9_5_3 import *
+from case9_5_4 import *
+from case9_5_5 import *
+from case9_5_6 import *
+
+from case9_6_1 import *
+from case9_6_2 import *
+from case9_6_3 import *
+from case9_6_4 import *
+from case9_6_5 import *
+from case9_6_6 import *
+
+from case9_7_X import *
+from case9_11_X import *
+from case9_13_X import *
+from case9_14_X import *
+from case9_16_X import *
+from case9_17_X import *
+from case9_18_X import *
+
+from case9_9_1 import *
+
+from case10_1_1 import *
+
+from case12_x_x import *
+from case14_x_x import *
+
+
+##
+## This is the list of Case classes that will be run by the fuzzing server/client
+##
+Cases = []
+
+Cases += [Case1_1_1, Case1_1_2, Case1_1_3, Case1_1_4, Case1_1_5, Case1_1_6, Case1_1_7, Case1_1_8]
+Cases += [Case1_2_1, Case1_2_2, Case1_2_3, Case1_2_4, Case1_2_5, Case1_2_6, Case1_2_7, Case1_2_8]
+Cases += [Case2_1, Case2_2, Case2_3, Case2_4, Case2_5, Case2_6, Case2_7, Case2_8, Case2_9, Case2_10, Case2_11]
+Cases += [Case3_1, Case3_2, Case3_3, Case3_4, Case3_5, Case3_6, Case3_7]
+Cases += [Case4_1_1, Case4_1_2, Case4_1_3, Case4_1_4, Case4_1_5]
+Cases += [Case4_2_1, Case4_2_2, Case4_2_3, Case4_2_4, Case4_2_5]
+Cases += [Case5_1, Case5_2, Case5_3, Case5_4, Case5_5, Case5_6, Case5_7, Case5_8, Case5_9, Case5_10, Case5_11, Case5_12, Case5_13, Case5_14, Case5_15, Case5_16, Case5_17, Case5_18, Case5_19, Case5_20]
+Cases += [Case6_1_1, Case6_1_2, Case6_1_3]
+Cases += [Case6_2_1, Case6_2_2, Case6_2_3, Case6_2_4]
+Cases += [Case6_3_1, Case6_3_2]
+Cases += [Case6_4_1, Case6_4_2, Case6_4_3, Case6_4_4]
+Cases.extend(Case6_X_X)
+CaseSubCategories.update(Case6_X_X_CaseSubCategories)
+Cases += [Case7_1_1, Case7_1_2, Case7_1_3, Case7_1_4, Case7_1_5, Case7_1_6]
+Cases += [Case7_3_1, Case7_3_2, Case7_3_3, Case7_3_4, Case7_3_5, Case7_3_6]
+Cases += [Case7_5_1]
+Cases.extend(Case7_7_X)
+Cases.extend(Case7_9_X)
+Cases += [Case7_13_1, Case7_13_2]
+Cases.extend(Case7_14_X)
+Cases += [Case9_1_1, Case9_1_2, Case9_1_3, Case9_1_4, Case9_1_5, Case9_1_6]
+Cases += [Case9_2_1, Case9_2_2, Case9_2_3, Case9_2_4, Case9_2_5, Case9_2_6]
+Cases += [Case9_3_1, Case9_3_2, Case9_3_3, Case9_3_4, Case9_3_5, Case9_3_6, Case9_3_7, Case9_3_8, Case9_3_9]
+Cases += [Case9_4_1, Case9_4_2, Case9_4_3, Case9_4_4, Case9_4_5, Case9_4_6, Case9_4_7, Case9_4_8, Case9_4_9]
+Cases += [Case9_5_1, Case9_5_2, Case9_5_3, Case9_5_4, Case9_5_5, Case9_5_6]
+Cases += [Case9_6_1, Case9_6_2, Case9_6_3, Case9_6_4, Case9_6_5, Case9_6_6]
+
+# this produces case 9.7.X and 9.8.X ... all come from one file: Case9_7_X .. its a bit hacky, ok.
+Cases.extend(Case9_7_X)
+Cases.extend(Case9_8_X)
+
+#Cases += [Case9_9_1]
+
+## this produces cases 9.11.X and 9.12.X (windowed, pipelined echo)
+Cases.extend(Case9_11_X)
+Cases.extend(Case9_12_X)
+
+Cases.extend(Case9_13_X)
+
+## this produces cases 9.14.X (ping under bulk load) and 9.15.X (ping throughput)
+Cases.extend(Case9_14_X)
+Cases.extend(Case9_15_X)
+
+Cases.extend(Case9_16_X)
+Cases.extend(Case9_17_X)
+Cases.extend(Case9_18_X)
+
+Cases += [Case10_1_1]
+
+## WebSocket Compression ("permessage-deflate")
+Cases.extend(Case12_X_X)
+CaseSubCategories.update(Case12_X_X_CaseSubCategories)
+
+Cases.extend(Case13_X_X)
+CaseSubCategories.update(Case13_X_X_CaseSubCategories)
+
+Cases.extend(Case14_X_X)
+CaseSubCategories.update(Case14_X_X_CaseSubCategories)
+
+## Opening handshake performance
+Cases.extend(Case0_X_X)
+CaseSubCategories.update(Case0_X_X_CaseSubCategories)
+
+## WebSocket Compression ("permessage-bzip2", "permessage-snappy")
+Cases.extend(Case15_X_X)
+CaseSubCategories.update(Case15_X_X_CaseSubCategories)
+
+Cases.extend(Case16_X_X)
+CaseSubCategories.update(Case16_X_X_CaseSubCategories)
+
+
+
+def createManifest(filename = None):
+   """
+   Create the manifest of builtin cases: for every case (in order) the case
+   ID, the module defining it and a one-line description.
+
+   :param filename: If given, write the manifest to this file.
+   :type filename: str
+   :returns: dict -- The manifest.
+   """
+   from autobahntestsuite.caseset import CaseSet
+   caseSet = CaseSet(CaseSetname, CaseBasename, Cases, CaseCategories, CaseSubCategories)
+
+   ## optional categories are never listed, so the manifest is the same
+   ## whether their dependencies are installed or not
+   cases = []
+   for C in Cases:
+      caseId = caseSet.caseClasstoId(C)
+      if caseId.split('.')[0] in OPTIONAL_CATEGORIES:
+         continue
+      cases.append({"id": caseId,
+                    "module": C.__module__.split('.')[-1],
+                    "description": caseSet.caseClassToPrettyDescription(C)})
+
+   subCategories = dict([(k, v) for (k, v) in CaseSubCategories.items() if k.split('.')[0] not in OPTIONAL_CATEGORIES])
+
+   manifest = {"cases": cases,
+               "subCategories": subCategories,
+               "optional": dict(OPTIONAL_CATEGORIES)}
+
+   if filename:
+      with open(filename, 'w') as f:
+         json.dump(manifest, f, indent = 1, sort_keys = True, separators = (',', ': '))
+         f.write('\n')
+
+   return manifest
+
+
+if __name__ == '__main__':
+   createManifest(os.path.join(os.path.dirname(os.path.abspath(__file__)), MANIFEST))
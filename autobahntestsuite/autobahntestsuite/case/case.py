@@ -37,6 +37,10 @@ class Case:
 
    SUBCASES = []
 
+   ## batch runner class (derived from CaseBatch) for cases which may run
+   ## together on one connection, when the spec enables batching
+   BATCH = None
+
    def __init__(self, protocol):
       self.p = protocol
       self.received = []
@@ -49,6 +53,18 @@ class Case:
       self.reportTime = False
       self.reportCompressionRatio = False
       self.trafficStats = None
+      self.reportLatency = False
+      self.latencyStats = None # stats.Histogram of per-message round-trip times
+      self.reportThroughput = False
+      self.throughputStats = None
+      self.reportCompressionCost = False
+      self.compressionStats = None # dict with fuzzer side compression timing (see compresstiming)
+      self.reportMemory = False
+      self.memoryStats = None
+      self.reportClose = False
+      self.closeStats = None # dict with closing handshake latencies over many connections
+      self.reportHandshake = False
+      self.handshakeStats = None # dict with opening handshake latencies and rate over many connections
       self.subcase = None
       self.suppressClose = False # suppresses automatic close behavior (used in cases that deliberately send bad close behavior)
 
@@ -138,3 +154,25 @@ class Case:
       if self.expectedClose["closedByMe"] and not self.suppressClose:
          self.p.sendClose(self.expectedClose["closeCode"][0])
 
+
+
+class CaseBatch(Case):
+   """
+   Runs several cases sharing the same Case.BATCH on one connection. The
+   batch is reported per case, from what batchResults() returns once the
+   connection is gone.
+   """
+
+   def __init__(self, protocol, cases):
+      self.cases = cases
+      Case.__init__(self, protocol)
+
+   def batchResults(self):
+      """
+      Results of the cases in the batch.
+
+      :returns: list -- (case class, dict) pairs, where the dict overrides
+         behavior, result, expected and received of the batch result.
+      """
+      return []
+
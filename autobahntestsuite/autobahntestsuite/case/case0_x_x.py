@@ -0,0 +1,237 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case0_X_X',
+           'Case0_X_X_CaseSubCategories',
+           ]
+
+from case import Case
+from peers import PeerClientFactory, connectPeers
+from autobahntestsuite.util import monotonic
+from autobahntestsuite.stats import Histogram
+from autobahn.websocket.compress import *
+
+
+##
+## Cases 0.x.x: opening handshake performance. On many (additional)
+## connections, measure the time from sending the opening handshake request
+## until the connection is open (upgrade latency), and the sustained rate of
+## handshakes, with increasingly expensive handshake requests.
+##
+
+## list of (connections, connections open at a time, case timeout)
+##
+CONNECTIONS = [(1000, 1,  120),
+               (1000, 50, 120)]
+
+
+def headers(count, size):
+   return dict([("X-Autobahn-Testsuite-%d" % i, "*" * size) for i in xrange(count)])
+
+def protocols(count):
+   return ["autobahn.testsuite.%d" % i for i in xrange(count)]
+
+## all combinations of permessage-deflate offer parameters
+##
+DEFLATE_OFFERS_ALL = [PerMessageDeflateOffer(acceptNoContextTakeover = anct,
+                                             acceptMaxWindowBits = amwb,
+                                             requestNoContextTakeover = rnct,
+                                             requestMaxWindowBits = rmwb)
+                      for anct in [True, False]
+                      for amwb in [True, False]
+                      for rnct in [True, False]
+                      for rmwb in [0, 8, 15]]
+
+## list of (description, extra headers, subprotocols, permessage-deflate offers)
+##
+VARIATIONS = [("Plain handshake", None, None, None),
+              ("10 extra headers of 32 octets", headers(10, 32), None, None),
+              ("100 extra headers of 32 octets", headers(100, 32), None, None),
+              ("1 extra header of 4096 octets", headers(1, 4096), None, None),
+              ("1 extra header of 16384 octets", headers(1, 16384), None, None),
+              ("10 subprotocols offered", None, protocols(10), None),
+              ("100 subprotocols offered", None, protocols(100), None),
+              ("1 permessage-deflate offer with all parameters",
+                 None, None, [PerMessageDeflateOffer(acceptNoContextTakeover = True, acceptMaxWindowBits = True, requestNoContextTakeover = True, requestMaxWindowBits = 10)]),
+              ("%d permessage-deflate offers (all parameter combinations)" % len(DEFLATE_OFFERS_ALL),
+                 None, None, DEFLATE_OFFERS_ALL)]
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportHandshake = True
+
+def onOpen(self):
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+
+   if self.p.factory.isServer:
+      ## we can't open additional connections to a testee client
+      self.behavior = Case.INFORMATIONAL
+      self.result = "Case only runs with the fuzzer being a client (fuzzingclient mode)."
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+      return
+
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   self.upgradeLatency = Histogram()
+   self.connected = 0
+   self.connecting = 0
+   self.closed = 0
+   self.rejected = 0
+   self.open = []
+   self.negotiated = None
+   self.requestSize = None
+   self.finished = False
+
+   options = {}
+   if self.OFFERS:
+      def accept(response):
+         if isinstance(response, PerMessageDeflateResponse):
+            return PerMessageDeflateResponseAccept(response)
+      options = {"perMessageCompressionOffers": self.OFFERS,
+                 "perMessageCompressionAccept": accept}
+   self.factory = PeerClientFactory(self, self.p.factory.url,
+                                    protocols = self.PROTOCOLS,
+                                    headers = self.HEADERS,
+                                    options = options)
+   self.started = monotonic()
+   self.connectMore()
+
+def connectMore(self):
+   n = min(self.CONCURRENCY - (self.connected - self.closed) - self.connecting, self.CONNECTIONS - self.connected - self.connecting)
+   if n > 0:
+      self.connecting += n
+      connectPeers(self.factory, n)
+
+def onPeerConnect(self, peer):
+   self.connecting -= 1
+   self.connected += 1
+   peer.opened = False
+   peer.handshakeSent = monotonic()
+
+def onPeerOpen(self, peer):
+   self.upgradeLatency.record(int(round(1000000. * (monotonic() - peer.handshakeSent))))
+   peer.opened = True
+   if self.negotiated is None:
+      self.requestSize = len(peer.http_request_data)
+      self.negotiated = {"protocol": peer.websocket_protocol_in_use,
+                         "extensions": repr(peer.websocket_extensions_in_use)}
+   self.open.append(peer)
+   peer.sendClose(peer.CLOSE_STATUS_CODE_NORMAL)
+
+def onPeerFailed(self, reason):
+   self.finish(Case.FAILED, "Could not connect %d of %d (%s)." % (self.connected + 1, self.CONNECTIONS, reason.getErrorMessage()))
+
+def onPeerMessage(self, peer, payload, isBinary):
+   pass
+
+def onPeerClose(self, peer, wasClean, code, reason):
+   if self.finished:
+      return
+   if not getattr(peer, 'opened', False):
+      self.rejected += 1
+   else:
+      self.open.remove(peer)
+   self.closed += 1
+
+   if self.closed == self.CONNECTIONS:
+      duration = monotonic() - self.started
+      self.handshakeStats = {"variation": self.VARIATION,
+                             "connections": self.CONNECTIONS,
+                             "concurrency": self.CONCURRENCY,
+                             "requestSize": self.requestSize,
+                             "negotiated": self.negotiated,
+                             "rejected": self.rejected,
+                             "duration": duration,
+                             "handshakesPerSec": (self.CONNECTIONS - self.rejected) / duration if duration > 0 else None,
+                             "upgradeLatency": self.upgradeLatency.__json__()}
+      if self.rejected == self.CONNECTIONS:
+         self.finish(Case.INFORMATIONAL, "Testee rejected all opening handshakes.")
+      elif self.rejected > 0:
+         self.finish(Case.NON_STRICT, "Testee rejected %d of %d opening handshakes." % (self.rejected, self.CONNECTIONS))
+      else:
+         self.finish(Case.OK, "Ok, %d handshakes at %.1f handshakes/s, upgrade latency p50/p99 = %s/%s us." % (self.CONNECTIONS, self.handshakeStats["handshakesPerSec"], self.upgradeLatency.percentile(50), self.upgradeLatency.percentile(99)))
+   else:
+      self.connectMore()
+
+def finish(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   self.behavior = behavior
+   self.result = result
+   for peer in self.open:
+      if peer.state == peer.STATE_OPEN:
+         peer.sendClose(peer.CLOSE_STATUS_CODE_NORMAL)
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+def onConnectionLost(self, failedByMe):
+   Case.onConnectionLost(self, failedByMe)
+   if hasattr(self, 'open'):
+      for peer in self.open:
+         if peer.state != peer.STATE_CLOSED:
+            peer.dropConnection()
+
+
+
+##
+## Cases 0.x.x
+##
+Case0_X_X = []
+Case0_X_X_CaseSubCategories = {}
+
+j = 1
+for v in VARIATIONS:
+
+   Case0_X_X_CaseSubCategories['0.%d' % j] = "Opening handshake performance - " + v[0]
+
+   i = 1
+   for s in CONNECTIONS:
+      cc = "Case0_%d_%d" % (j, i)
+      DESCRIPTION = """Perform %d opening handshakes on additional connections (%d at a time), each closed right after it is open. %s. Measure the time from sending the handshake request until the connection is open, and the sustained rate of handshakes.""" % (s[0], s[1], v[0])
+      EXPECTATION = """Testee accepts all handshakes. Rejecting some is NON-STRICT, rejecting all INFORMATIONAL. Timeout case after %d secs.""" % (s[2])
+      C = type(cc,
+                (object, Case, ),
+                {"CONNECTIONS": s[0],
+                 "CONCURRENCY": s[1],
+                 "WAITSECS": s[2],
+                 "VARIATION": v[0],
+                 "HEADERS": v[1],
+                 "PROTOCOLS": v[2],
+                 "OFFERS": v[3],
+                 "DESCRIPTION": """%s""" % DESCRIPTION,
+                 "EXPECTATION": """%s""" % EXPECTATION,
+                 "__init__": __init__,
+                 "onOpen": onOpen,
+                 "connectMore": connectMore,
+                 "onPeerConnect": onPeerConnect,
+                 "onPeerOpen": onPeerOpen,
+                 "onPeerFailed": onPeerFailed,
+                 "onPeerMessage": onPeerMessage,
+                 "onPeerClose": onPeerClose,
+                 "finish": finish,
+                 "onConnectionLost": onConnectionLost,
+                 })
+      Case0_X_X.append(C)
+      i += 1
+   j += 1
@@ -20,11 +20,23 @@ __all__ = ['Case12_X_X',
            'Case12_X_X_CaseSubCategories',
            'Case13_X_X',
            'Case13_X_X_CaseSubCategories',
+           'Case15_X_X',
+           'Case15_X_X_CaseSubCategories',
+           'Case16_X_X',
+           'Case16_X_X_CaseSubCategories',
+           'COMPRESSION_EXTENSIONS',
+           'resolveCorpora',
+           'generateCorpusCases',
            ]
 
-import copy, os, pkg_resources, hashlib, binascii
+import copy, os, glob, pkg_resources, hashlib, binascii
 
 from case import Case
+from corpus import getCorpus
+from compresstiming import CompressionTimer
+from autobahntestsuite.util import monotonic
+from autobahntestsuite.stats import Histogram
+from autobahn.websocket import compress
 from autobahn.websocket.compress import *
 
 
@@ -96,12 +108,14 @@ def __init__(self, protocol):
 def init(self):
    self.reportTime = True
    self.reportCompressionRatio = True
+   self.reportCompressionCost = True
+   self.reportLatency = True
 
    self.expectedClose = {"closedByMe": True,
                          "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL],
                          "requireClean": True}
 
-   ## permessage-deflate setup
+   ## permessage-compress setup
    ##
    if self.p.factory.isServer:
       self.p.perMessageCompressionAccept = self.SERVER_ACCEPT
@@ -110,18 +124,22 @@ def init(self):
       self.p.perMessageCompressionOffers = self.CLIENT_OFFERS
 
       def accept(response):
-         if isinstance(response, PerMessageDeflateResponse):
-            return PerMessageDeflateResponseAccept(response)
+         for ext in PERMESSAGE_COMPRESSION_EXTENSION.values():
+            if isinstance(response, ext['Response']):
+               return ext['ResponseAccept'](response)
 
       self.p.perMessageCompressionAccept = accept
 
 
-   self.payloadRXPtr = 0
-   self.payloadTXPtr = 0
-
-   fn = pkg_resources.resource_filename("autobahntestsuite", "testdata/%s" % self.TESTDATA['file'])
-   self.testData = open(fn, 'rb').read()
-   self.testDataLen = len(self.testData)
+   ## test data is memory-mapped once per process, and the digests of
+   ## the messages we send are only computed once (not while running the case)
+   ##
+   if os.path.isabs(self.TESTDATA['file']):
+      fn = self.TESTDATA['file']
+   else:
+      fn = pkg_resources.resource_filename("autobahntestsuite", "testdata/%s" % self.TESTDATA['file'])
+   self.corpus = getCorpus(fn)
+   self.expectedDigests = self.corpus.digests(self.LEN, self.COUNT)
 
 
 def onOpen(self):
@@ -136,31 +154,27 @@ def onOpen(self):
       self.result = "Case did not finish within %d seconds." % self.WAITSECS
       self.p.closeAfter(self.WAITSECS)
 
+      ## measure our own compression/decompression time per message
+      self.compressionTimer = CompressionTimer(self.p._perMessageCompress)
+      self.p._perMessageCompress = self.compressionTimer
+      self.latencyStats = Histogram()
+
       self.count = 0
       self.sendOne()
 
 
 def sendOne(self):
-   if self.LEN > 0:
-      idxFrom = self.payloadRXPtr
-      idxTo = (self.payloadRXPtr + self.LEN) % self.testDataLen
-      if idxTo > idxFrom:
-         msg = self.testData[idxFrom:idxTo]
-      else:
-         msg = self.testData[idxFrom:] + self.testData[:idxTo]
-      self.payloadRXPtr = idxTo
-   else:
-      msg = ''
-
-   m = hashlib.sha1()
-   m.update(msg)
-   self._expected_hash = m.digest()
+   msg = self.corpus.message(self.count * self.LEN, self.LEN)
+   self._expected_hash = self.expectedDigests[self.count]
 
+   self.sent = monotonic()
    self.p.sendMessage(msg, self.TESTDATA['binary'])
    self.count += 1
 
 
 def onMessage(self, msg, binary):
+   self.latencyStats.record(round(1000000. * (monotonic() - self.sent)))
+
    m = hashlib.sha1()
    m.update(msg)
    received_hash = m.digest()
@@ -191,35 +205,68 @@ def onMessage(self, msg, binary):
       self.behavior = Case.OK
       self.result = "Ok, received all echo'ed messages in time."
       self.trafficStats = copy.deepcopy(self.p.trafficStats)
+      self.compressionStats = self.compressionTimer.stats(self.p.factory.isServer)
+      self.compressionStats.update({"corpus": self.TESTDATA['file'],
+                                    "size": self.LEN,
+                                    "messages": self.COUNT,
+                                    "autoFragmentSize": self.AUTOFRAGSIZE,
+                                    "noContextTakeover": getattr(self.compressionTimer.pmce, 'server_no_context_takeover' if self.p.factory.isServer else 'client_no_context_takeover', None)})
       self.p.enableWirelog(True)
       self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
 
 
 
 ##
-## Cases 12.x.x
+## Cases 12.x.x (permessage-deflate) and equivalent families for the other
+## per-message compression extensions supported by Autobahn: 15.x.x
+## (permessage-bzip2) and 16.x.x (permessage-snappy, only when python-snappy
+## is installed)
 ##
-Case12_X_X = []
-Case12_X_X_CaseSubCategories = {}
-
 def accept_deflate(self, offers):
    for offer in offers:
       if isinstance(offer, PerMessageDeflateOffer):
          return PerMessageDeflateOfferAccept(offer)
 
-j = 1
-for td in WS_COMPRESSION_TESTDATA:
+## list of (case category, extension name, client offers, server accept)
+##
+COMPRESSION_EXTENSIONS = [(12, "permessage-deflate", [PerMessageDeflateOffer()], accept_deflate)]
+
+if hasattr(compress, 'PerMessageBzip2Offer'):
+   def accept_bzip2(self, offers):
+      for offer in offers:
+         if isinstance(offer, PerMessageBzip2Offer):
+            return PerMessageBzip2OfferAccept(offer)
+
+   COMPRESSION_EXTENSIONS.append((15, "permessage-bzip2", [PerMessageBzip2Offer()], accept_bzip2))
+
+if hasattr(compress, 'PerMessageSnappyOffer'):
+   def accept_snappy(self, offers):
+      for offer in offers:
+         if isinstance(offer, PerMessageSnappyOffer):
+            return PerMessageSnappyOfferAccept(offer)
+
+   COMPRESSION_EXTENSIONS.append((16, "permessage-snappy", [PerMessageSnappyOffer()], accept_snappy))
 
-   isBinary = WS_COMPRESSION_TESTDATA[td]["binary"]
-   fn = pkg_resources.resource_filename("autobahntestsuite", "testdata/%s" % WS_COMPRESSION_TESTDATA[td]['file'])
-   fileSize = os.path.getsize(fn)
 
-   Case12_X_X_CaseSubCategories['12.%d' % j] = WS_COMPRESSION_TESTDATA[td]["desc"] + (" (%s, %s bytes)" % ("binary" if isBinary else "utf8", fileSize))
+def createPayloadCases(extension, j, td, source = ""):
+   """
+   Create cases <category>.j.x sending messages from test data td with the
+   MSG_SIZES matrix, using given compression extension.
+
+   :returns: tuple -- (list of case classes, case subcategory description)
+   """
+   category, name, clientOffers, serverAccept = extension
+
+   cases = []
+   fileSize = os.path.getsize(td['file'] if os.path.isabs(td['file']) else pkg_resources.resource_filename("autobahntestsuite", "testdata/%s" % td['file']))
+   subCategory = td["desc"] + (" (%s, %s bytes)" % ("binary" if td["binary"] else "utf8", fileSize))
+   if category != 12:
+      subCategory += " - " + name
 
    i = 1
    for s in MSG_SIZES:
-      cc = "Case12_%d_%d" % (j, i)
-      DESCRIPTION = """Send %d compressed messages each of payload size %d, auto-fragment to %s octets. Use default permessage-deflate offer.""" % (s[1], s[0], s[3])
+      cc = "Case%d_%d_%d" % (category, j, i)
+      DESCRIPTION = """Send %d compressed messages each of payload size %d%s, auto-fragment to %s octets. Use default %s offer.""" % (s[1], s[0], source, s[3], name)
       EXPECTATION = """Receive echo'ed messages (with payload as sent). Timeout case after %d secs.""" % (s[2])
       C = type(cc,
                 (object, Case, ),
@@ -227,9 +274,9 @@ for td in WS_COMPRESSION_TESTDATA:
                  "COUNT": s[1],
                  "WAITSECS": s[2],
                  "AUTOFRAGSIZE": s[3],
-                 "CLIENT_OFFERS": [PerMessageDeflateOffer()],
-                 "SERVER_ACCEPT": accept_deflate,
-                 "TESTDATA": WS_COMPRESSION_TESTDATA[td],
+                 "CLIENT_OFFERS": clientOffers,
+                 "SERVER_ACCEPT": serverAccept,
+                 "TESTDATA": td,
                  "DESCRIPTION": """%s""" % DESCRIPTION,
                  "EXPECTATION": """%s""" % EXPECTATION,
                  "__init__": __init__,
@@ -238,9 +285,90 @@ for td in WS_COMPRESSION_TESTDATA:
                  "onMessage": onMessage,
                  "sendOne": sendOne,
                  })
-      Case12_X_X.append(C)
+      cases.append(C)
       i += 1
-   j += 1
+
+   return cases, subCategory
+
+
+Case12_X_X = []
+Case12_X_X_CaseSubCategories = {}
+Case15_X_X = []
+Case15_X_X_CaseSubCategories = {}
+Case16_X_X = []
+Case16_X_X_CaseSubCategories = {}
+
+_families = {12: (Case12_X_X, Case12_X_X_CaseSubCategories),
+             15: (Case15_X_X, Case15_X_X_CaseSubCategories),
+             16: (Case16_X_X, Case16_X_X_CaseSubCategories)}
+
+for ext in COMPRESSION_EXTENSIONS:
+   j = 1
+   for td in WS_COMPRESSION_TESTDATA:
+      cases, subCategory = createPayloadCases(ext, j, WS_COMPRESSION_TESTDATA[td])
+      _families[ext[0]][0].extend(cases)
+      _families[ext[0]][1]['%d.%d' % (ext[0], j)] = subCategory
+      j += 1
+
+
+def resolveCorpora(corpora):
+   """
+   Resolve the "compression-corpora" spec option into a list of test data
+   descriptors (like the entries in WS_COMPRESSION_TESTDATA). The option is
+   a directory, a glob pattern or a list of those. List entries may also be
+   dicts with "path" and optionally "desc" and "binary" (default: true).
+   """
+   if type(corpora) != list:
+      corpora = [corpora]
+   res = []
+   for c in corpora:
+      if type(c) == dict:
+         path = c["path"]
+         binary = c.get("binary", True)
+         desc = c.get("desc", None)
+      else:
+         path = c
+         binary = True
+         desc = None
+      path = os.path.expanduser(path)
+      if os.path.isdir(path):
+         files = sorted([os.path.join(path, f) for f in os.listdir(path)])
+      else:
+         files = sorted(glob.glob(path))
+      files = [f for f in files if os.path.isfile(f) and os.path.getsize(f) > 0]
+      if len(files) == 0:
+         raise Exception("no (non-empty) corpus files found for %s" % path)
+      for fn in files:
+         res.append({'desc': desc or "User corpus %s" % os.path.basename(fn),
+                     'url': None,
+                     'file': os.path.abspath(fn),
+                     'binary': binary})
+   return res
+
+
+def generateCorpusCases(corpora):
+   """
+   Generate cases 12.x.x (and 15.x.x, 16.x.x for the other compression
+   extensions) for user supplied corpus files, with the same message size
+   matrix as the bundled test data. Subcategories are numbered after the
+   bundled ones. Corpus files are memory-mapped (when the cases are run), so
+   large corpora are paged in from disk rather than loaded into memory.
+
+   :param corpora: "compression-corpora" option from the spec (see resolveCorpora).
+   :returns: tuple -- (list of case classes, dict of case subcategories)
+   """
+   cases = []
+   subCategories = {}
+
+   for ext in COMPRESSION_EXTENSIONS:
+      j = len(WS_COMPRESSION_TESTDATA) + 1
+      for td in resolveCorpora(corpora):
+         c, subCategory = createPayloadCases(ext, j, td, " from corpus file %s" % td['file'])
+         cases.extend(c)
+         subCategories['%d.%d' % (ext[0], j)] = subCategory
+         j += 1
+
+   return cases, subCategories
 
 
 
@@ -0,0 +1,252 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case14_X_X',
+           'Case14_X_X_CaseSubCategories',
+           ]
+
+import pkg_resources
+
+from twisted.internet import reactor
+
+from case import Case
+from corpus import getCorpus
+from peers import PeerClientFactory, connectPeers
+from case12_x_x import DEFLATE_PARAMS, TEST_DATA
+from autobahntestsuite.util import readRss
+from autobahn.websocket.compress import *
+
+
+## list of (connections, case timeout)
+##
+CONNECTIONS = [(100, 120),
+               (500, 240),
+               (1000, 480)]
+
+## messages sent on each connection (to get the compression contexts
+## of the testee allocated and filled) and payload size
+##
+COUNT = 10
+LEN = 4096
+
+## secs to wait before sampling testee memory
+##
+SETTLE = 1
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportMemory = True
+
+
+def init(self):
+   fn = pkg_resources.resource_filename("autobahntestsuite", "testdata/%s" % TEST_DATA['file'])
+   self.corpus = getCorpus(fn)
+   self.messages = [self.corpus.message(i * LEN, LEN) for i in xrange(COUNT)]
+
+
+def onOpen(self):
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+
+   if self.p.factory.isServer:
+      ## we can't open additional connections to a testee client
+      self.behavior = Case.INFORMATIONAL
+      self.result = "Case only runs with the fuzzer being a client (fuzzingclient mode)."
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+      return
+
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   self.peers = []
+   self.peersFailed = 0
+   self.peersDone = 0
+   self.finished = False
+   self.started = False
+
+   ## testee process to sample memory of, from spec (see FuzzingClientFactory)
+   self.memorySource = getattr(self.p.factory, 'testeeMemory', None)
+   self.rssBaseline = self.sampleRss()
+
+   def accept(response):
+      if isinstance(response, PerMessageDeflateResponse):
+         return PerMessageDeflateResponseAccept(response)
+
+   factory = PeerClientFactory(self, self.p.factory.url,
+                               options = {"perMessageCompressionOffers": self.CLIENT_OFFERS,
+                                          "perMessageCompressionAccept": accept})
+   connectPeers(factory, self.CONNECTIONS)
+
+def sampleRss(self):
+   if self.memorySource is not None:
+      return readRss(self.memorySource)
+   return None
+
+def onPeerOpen(self, peer):
+   peer.opened = True
+   peer.count = 0
+   peer.done = False
+   self.peers.append(peer)
+   if peer._perMessageCompress is None:
+      self.finish(Case.UNIMPLEMENTED, "Testee did not accept permessage-deflate offer.")
+   else:
+      self.checkStart()
+
+def onPeerFailed(self, reason):
+   self.peersFailed += 1
+   self.checkStart()
+
+def checkStart(self):
+   ## start sending on all connections when all are open
+   if len(self.peers) + self.peersFailed == self.CONNECTIONS and not self.finished:
+      if self.peersFailed > 0:
+         self.finish(Case.FAILED, "Could only open %d of %d connections." % (len(self.peers), self.CONNECTIONS))
+      else:
+         self.started = True
+         self.rssOpen = self.sampleRss()
+         for peer in self.peers:
+            self.sendOne(peer)
+
+def sendOne(self, peer):
+   peer.sendMessage(self.messages[peer.count], TEST_DATA['binary'])
+   peer.count += 1
+
+def onPeerMessage(self, peer, payload, isBinary):
+   if self.finished:
+      return
+   if payload != self.messages[peer.count - 1]:
+      self.finish(Case.FAILED, "Echo'ed message differs from what I sent (got binary = %s, payload length = %s)." % (isBinary, len(payload)))
+   elif peer.count < COUNT:
+      self.sendOne(peer)
+   else:
+      peer.done = True
+      self.peersDone += 1
+      if self.peersDone == self.CONNECTIONS:
+         ## give the testee a moment (e.g. to run its GC) before sampling
+         reactor.callLater(SETTLE, self.sampleAndFinish)
+
+def sampleAndFinish(self):
+   if self.finished:
+      return
+   rssLoaded = self.sampleRss()
+
+   octetsApp = sum([p.trafficStats.outgoingOctetsAppLevel + p.trafficStats.incomingOctetsAppLevel for p in self.peers])
+   octetsWs = sum([p.trafficStats.outgoingOctetsWebSocketLevel + p.trafficStats.incomingOctetsWebSocketLevel for p in self.peers])
+
+   def perConnection(rss):
+      if rss is not None and self.rssBaseline is not None:
+         return float(rss - self.rssBaseline) / self.CONNECTIONS
+      return None
+
+   self.memoryStats = {"connections": self.CONNECTIONS,
+                       "clientOffers": self.CLIENT_OFFERS_DESC,
+                       "negotiated": repr(self.peers[0]._perMessageCompress),
+                       "rssBaseline": self.rssBaseline,
+                       "rssOpen": self.rssOpen,
+                       "rssLoaded": rssLoaded,
+                       "bytesPerConnectionOpen": perConnection(self.rssOpen),
+                       "bytesPerConnection": perConnection(rssLoaded),
+                       "compressionRatio": float(octetsWs) / float(octetsApp) if octetsApp > 0 else None}
+
+   if self.memorySource is None:
+      self.finish(Case.OK, "Ok, all messages echo'ed on all connections (testee memory not sampled: no 'memory' given for server in spec).")
+   elif rssLoaded is None or self.rssBaseline is None:
+      self.finish(Case.OK, "Ok, all messages echo'ed on all connections (testee memory could not be read from %s)." % self.memorySource)
+   else:
+      self.finish(Case.OK, "Ok, all messages echo'ed on all connections. Testee memory per connection: %d bytes." % self.memoryStats["bytesPerConnection"])
+
+def onPeerClose(self, peer, wasClean, code, reason):
+   if self.finished:
+      return
+   if not getattr(peer, 'opened', False):
+      ## opening handshake rejected, or connection reset (e.g. at the testee's connection limit)
+      self.peersFailed += 1
+      self.checkStart()
+   elif not self.started:
+      self.finish(Case.FAILED, "Connection was closed by testee before all connections were open (code = %s, reason = %s)." % (code, reason))
+   elif not peer.done:
+      self.finish(Case.FAILED, "Connection was closed by testee before all echo'ed messages were received (code = %s, reason = %s)." % (code, reason))
+
+def finish(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   self.behavior = behavior
+   self.result = result
+   for peer in self.peers:
+      if peer.state == peer.STATE_OPEN:
+         peer.sendClose(peer.CLOSE_STATUS_CODE_NORMAL)
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+def onConnectionLost(self, failedByMe):
+   Case.onConnectionLost(self, failedByMe)
+   if hasattr(self, 'peers'):
+      for peer in self.peers:
+         if peer.state != peer.STATE_CLOSED:
+            peer.dropConnection()
+
+
+
+##
+## Cases 14.x.x
+##
+Case14_X_X = []
+Case14_X_X_CaseSubCategories = {}
+
+j = 1
+for dp in DEFLATE_PARAMS:
+
+   co = dp[1]
+   co_desc = "client offers (requestNoContextTakeover, requestMaxWindowBits): {0}".format([(x.requestNoContextTakeover, x.requestMaxWindowBits) for x in co])
+
+   Case14_X_X_CaseSubCategories['14.%d' % j] = "Testee memory per compressed connection - " + co_desc
+
+   i = 1
+   for s in CONNECTIONS:
+      cc = "Case14_%d_%d" % (j, i)
+      DESCRIPTION = """Open %d additional connections using permessage-deflate %s, and send %d compressed messages of payload size %d on each. Sample the resident memory of the testee process before opening the connections, with all connections open, and after sending the messages.""" % (s[0], co_desc, COUNT, LEN)
+      EXPECTATION = """Receive echo'ed messages (with payload as sent) on all connections. Timeout case after %d secs. Memory is only sampled when the spec provides the testee process ("memory" in server entry).""" % (s[1])
+      C = type(cc,
+                (object, Case, ),
+                {"CONNECTIONS": s[0],
+                 "WAITSECS": s[1],
+                 "CLIENT_OFFERS": co,
+                 "CLIENT_OFFERS_DESC": co_desc,
+                 "DESCRIPTION": """%s""" % DESCRIPTION,
+                 "EXPECTATION": """%s""" % EXPECTATION,
+                 "__init__": __init__,
+                 "init": init,
+                 "onOpen": onOpen,
+                 "sampleRss": sampleRss,
+                 "onPeerOpen": onPeerOpen,
+                 "onPeerFailed": onPeerFailed,
+                 "checkStart": checkStart,
+                 "sendOne": sendOne,
+                 "onPeerMessage": onPeerMessage,
+                 "sampleAndFinish": sampleAndFinish,
+                 "onPeerClose": onPeerClose,
+                 "finish": finish,
+                 "onConnectionLost": onConnectionLost,
+                 })
+      Case14_X_X.append(C)
+      i += 1
+   j += 1
@@ -17,16 +17,22 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case1_1_8(Case):
+class Case1_1_8(DeclarativeCase):
 
    DESCRIPTION = """Send text message message with payload of length 65536. Sent out data in chops of 997 octets."""
 
    EXPECTATION = """Receive echo'ed text message (with payload as sent). Clean close with normal code."""
 
-   def onOpen(self):
-      payload = "*" * 65536
-      self.expected[Case.OK] = [("message", payload, False)]
-      self.expectedClose = {"closedByMe":True,"closeCode":[self.p.CLOSE_STATUS_CODE_NORMAL],"requireClean":True}
-      self.p.sendFrame(opcode = 1, payload = payload, chopsize = 997)
-      self.p.killAfter(10)
+   PAYLOAD = "*" * 65536
+
+   STEPS = [send(opcode = 1, payload = PAYLOAD, chopsize = 997),
+            killAfter(10)]
+
+   EXPECTED = {Case.OK: [("message", PAYLOAD, False)]}
+
+   EXPECTED_CLOSE = {"closedByMe": True,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_NORMAL],
+                     "requireClean": True}
@@ -17,16 +17,22 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case1_2_2(Case):
+class Case1_2_2(DeclarativeCase):
 
    DESCRIPTION = """Send binary message message with payload of length 125."""
 
    EXPECTATION = """Receive echo'ed binary message (with payload as sent). Clean close with normal code."""
 
-   def onOpen(self):
-      payload = "\xfe" * 125
-      self.expected[Case.OK] = [("message", payload, True)]
-      self.expectedClose = {"closedByMe":True,"closeCode":[self.p.CLOSE_STATUS_CODE_NORMAL],"requireClean":True}
-      self.p.sendFrame(opcode = 2, payload = payload)
-      self.p.killAfter(1)
+   PAYLOAD = "\xfe" * 125
+
+   STEPS = [send(opcode = 2, payload = PAYLOAD),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: [("message", PAYLOAD, True)]}
+
+   EXPECTED_CLOSE = {"closedByMe": True,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_NORMAL],
+                     "requireClean": True}
@@ -17,16 +17,22 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case1_2_6(Case):
+class Case1_2_6(DeclarativeCase):
 
    DESCRIPTION = """Send binary message message with payload of length 65535."""
 
    EXPECTATION = """Receive echo'ed binary message (with payload as sent). Clean close with normal code."""
 
-   def onOpen(self):
-      payload = "\xfe" * 65535
-      self.expected[Case.OK] = [("message", payload, True)]
-      self.expectedClose = {"closedByMe":True,"closeCode":[self.p.CLOSE_STATUS_CODE_NORMAL],"requireClean":True}
-      self.p.sendFrame(opcode = 2, payload = payload)
-      self.p.killAfter(10)
+   PAYLOAD = "\xfe" * 65535
+
+   STEPS = [send(opcode = 2, payload = PAYLOAD),
+            killAfter(10)]
+
+   EXPECTED = {Case.OK: [("message", PAYLOAD, True)]}
+
+   EXPECTED_CLOSE = {"closedByMe": True,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_NORMAL],
+                     "requireClean": True}
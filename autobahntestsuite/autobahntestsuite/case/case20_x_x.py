@@ -0,0 +1,187 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['GENERATED_CATEGORY',
+           'parseGenerate',
+           'generateMatrixCases',
+           ]
+
+from case import Case
+from autobahntestsuite.util import monotonic
+from autobahntestsuite.stats import Histogram
+
+
+##
+## Cases 20.x.x: generated at load time from the "generate" section of the
+## spec, one subcategory per matrix:
+##
+##    "generate": {"sizes": [64, 4096, 65536],
+##                 "fragments": [0, 1024],
+##                 "chopsize": [0, 1],
+##                 "binary": [true, false],
+##                 "count": 100,
+##                 "timeout": 60}
+##
+## "generate" may also be a list of such matrices. Every combination of
+## sizes, fragments (fragment size, 0 for unfragmented), chopsize (0 for
+## not chopping) and binary becomes a case sending "count" messages one after
+## another, each after the previous one was echo'ed.
+##
+
+## category number reserved for generated cases
+##
+GENERATED_CATEGORY = 20
+
+## defaults for what a matrix doesn't specify
+##
+MATRIX_DEFAULTS = {"fragments": [0],
+                   "chopsize": [0],
+                   "binary": [True],
+                   "count": 100,
+                   "timeout": 120}
+
+
+def parseGenerate(generate):
+   """
+   Check and complete the "generate" section from the spec.
+
+   :param generate: Matrix or list of matrices.
+   :type generate: dict or list
+   :returns: list -- Matrices with defaults filled in.
+   """
+   if type(generate) == dict:
+      generate = [generate]
+   matrices = []
+   for g in generate:
+      if type(g) != dict or not g.has_key("sizes"):
+         raise Exception("invalid generate specification %s (need at least 'sizes')" % g)
+      m = MATRIX_DEFAULTS.copy()
+      m.update(g)
+      for k in ["sizes", "fragments", "chopsize", "binary"]:
+         if type(m[k]) != list:
+            m[k] = [m[k]]
+      for k in ["sizes", "fragments", "chopsize"]:
+         for v in m[k]:
+            if type(v) not in [int, long] or v < 0:
+               raise Exception("invalid generate specification %s (%s must be non-negative integers)" % (g, k))
+      if int(m["count"]) < 1 or int(m["timeout"]) < 1:
+         raise Exception("invalid generate specification %s (count and timeout must be positive)" % g)
+      matrices.append(m)
+   return matrices
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportLatency = True
+   self.reportThroughput = True
+
+def onOpen(self):
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+   self.count = 0
+   self.latencyStats = Histogram()
+   self.started = monotonic()
+   self.sendOne()
+
+def sendOne(self):
+   opcode = 2 if self.BINARY else 1
+   payload = "\xfe" if self.BINARY else "*"
+   chopsize = self.CHOPSIZE if self.CHOPSIZE > 0 else None
+   self.sent = monotonic()
+   if self.FRAGSIZE == 0 or self.LEN <= self.FRAGSIZE:
+      self.p.sendFrame(opcode = opcode, payload = payload, payload_len = self.LEN, chopsize = chopsize)
+   else:
+      for i in xrange(0, self.LEN, self.FRAGSIZE):
+         l = min(self.FRAGSIZE, self.LEN - i)
+         self.p.sendFrame(opcode = opcode if i == 0 else 0, fin = i + l == self.LEN, payload = payload, payload_len = l, chopsize = chopsize)
+   self.count += 1
+
+def onMessage(self, msg, binary):
+   self.latencyStats.record(round(1000000. * (monotonic() - self.sent)))
+   if binary != self.BINARY or len(msg) != self.LEN:
+      self.behavior = Case.FAILED
+      self.result = "Echo'ed message type or length differs from what I sent (got binary = %s, payload length = %s)." % (binary, len(msg))
+      self.p.enableWirelog(True)
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+   elif self.count < self.COUNT:
+      self.sendOne()
+   else:
+      duration = monotonic() - self.started
+      self.throughputStats = {"size": self.LEN,
+                              "fragmentSize": self.FRAGSIZE,
+                              "chopsize": self.CHOPSIZE,
+                              "binary": self.BINARY,
+                              "messages": self.COUNT,
+                              "duration": duration,
+                              "messagesPerSec": self.COUNT / duration if duration > 0 else None,
+                              "octetsPerSec": self.COUNT * self.LEN / duration if duration > 0 else None}
+      self.behavior = Case.OK
+      self.result = "Ok, received all echo'ed messages in time."
+      self.p.enableWirelog(True)
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+
+def generateMatrixCases(generate):
+   """
+   Generate cases 20.x.x from the "generate" section of the spec.
+
+   :param generate: "generate" option from the spec (see parseGenerate).
+   :returns: tuple -- (list of case classes, dict of case subcategories)
+   """
+   cases = []
+   subCategories = {}
+
+   j = 1
+   for m in parseGenerate(generate):
+      subCategories['%d.%d' % (GENERATED_CATEGORY, j)] = "Generated from spec - sizes %s, fragments %s, chopsize %s, binary %s, %d messages" % \
+         (m["sizes"], m["fragments"], m["chopsize"], m["binary"], m["count"])
+      i = 1
+      for size in m["sizes"]:
+         for frag in m["fragments"]:
+            for chop in m["chopsize"]:
+               for binary in m["binary"]:
+                  mt = "binary" if binary else "text"
+                  DESCRIPTION = """Send %d %s messages of payload size %d%s%s, each after the previous one was echo'ed.""" % \
+                     (m["count"], mt, size,
+                      ", in fragments of %d octets" % frag if frag > 0 else "",
+                      ", written to the TCP stream in chops of %d octets" % chop if chop > 0 else "")
+                  EXPECTATION = """Receive echo'ed %s messages (with payload length as sent). Timeout case after %d secs.""" % (mt, m["timeout"])
+                  C = type("Case%d_%d_%d" % (GENERATED_CATEGORY, j, i),
+                            (object, Case, ),
+                            {"LEN": size,
+                             "FRAGSIZE": frag,
+                             "CHOPSIZE": chop,
+                             "BINARY": bool(binary),
+                             "COUNT": int(m["count"]),
+                             "WAITSECS": int(m["timeout"]),
+                             "DESCRIPTION": """%s""" % DESCRIPTION,
+                             "EXPECTATION": """%s""" % EXPECTATION,
+                             "__init__": __init__,
+                             "onOpen": onOpen,
+                             "sendOne": sendOne,
+                             "onMessage": onMessage,
+                             })
+                  cases.append(C)
+                  i += 1
+      j += 1
+
+   return cases, subCategories
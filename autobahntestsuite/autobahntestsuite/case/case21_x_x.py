@@ -0,0 +1,184 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['REPRO_CATEGORY',
+           'frame',
+           'encodeFrames',
+           'saveRepro',
+           'loadRepro',
+           'generateReproCases',
+           ]
+
+import os, glob, json, binascii
+
+from case import Case
+from frames import encodeFrame
+
+
+##
+## Cases 21.x.x: replay frame sequences found by the mutation fuzzer
+## (mode "mutationfuzzing"), one subcategory per entry of the "repros"
+## section of the spec:
+##
+##    "repros": ["./reports/mutations/repro_*.json"]
+##
+## A repro file holds the frames as sent (possibly invalid in any way), e.g.
+##
+##    {"kind": "hang",
+##     "seed": "3.2",
+##     "mutations": ["fragment", "fin"],
+##     "frames": [{"opcode": 1, "fin": false, "rsv": 0, "masked": true,
+##                 "lengthBytes": null, "payload": "48656c6c6f"}]}
+##
+## After the frames, a Ping is sent: the testee must either answer it or
+## fail the connection.
+##
+
+## category number reserved for replayed repros
+##
+REPRO_CATEGORY = 21
+
+
+def frame(opcode, payload = "", fin = True, rsv = 0, masked = True, lengthBytes = None):
+   """
+   A frame in a (mutated) frame sequence. Frames are masked with a random
+   mask when encoded, and the length is encoded with lengthBytes extended
+   length octets (None for minimal).
+   """
+   return {"opcode": opcode,
+           "payload": payload,
+           "fin": fin,
+           "rsv": rsv,
+           "masked": masked,
+           "lengthBytes": lengthBytes}
+
+
+def encodeFrames(frames):
+   """
+   Encode a frame sequence to octets.
+   """
+   return ''.join([encodeFrame(f["opcode"], f["payload"], f["fin"], f["rsv"], f["masked"], lengthBytes = f["lengthBytes"]) for f in frames])
+
+
+def saveRepro(filename, repro):
+   """
+   Save a repro (dict with "frames" and any other info) to a file.
+   """
+   r = dict(repro)
+   r["frames"] = [dict(f, payload = binascii.b2a_hex(f["payload"])) for f in repro["frames"]]
+   with open(filename, 'w') as f:
+      f.write(json.dumps(r, sort_keys = True, indent = 3, separators = (',', ': ')))
+
+
+def loadRepro(filename):
+   """
+   Load a repro saved with saveRepro.
+   """
+   with open(filename) as f:
+      r = json.load(f)
+   r["frames"] = [frame(f["opcode"], binascii.a2b_hex(f["payload"]), f["fin"], f["rsv"], f["masked"], f["lengthBytes"]) for f in r["frames"]]
+   return r
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+
+def onOpen(self):
+   self.expectedClose = {"closedByMe": False, "closeCode": [], "requireClean": False}
+   self.timedOut = False
+
+   if self.p.factory.isServer:
+      ## repros are frames as sent from a client (masked)
+      self.behavior = Case.INFORMATIONAL
+      self.result = "Case only runs with the fuzzer being a client (fuzzingclient mode)."
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+      return
+
+   self.behavior = Case.FAILED
+   self.result = "Testee neither answered the Ping nor failed the connection within %d seconds." % self.WAITSECS
+   self.probe = "Autobahn repro probe"
+   self.p.sendData(encodeFrames(self.FRAMES))
+   self.p.sendFrame(opcode = 9, payload = self.probe)
+   self.p.continueLater(self.WAITSECS, self.onTimeout)
+
+def onPong(self, payload):
+   self.received.append(("pong", payload))
+   if payload == self.probe and self.behavior == Case.FAILED:
+      self.behavior = Case.OK
+      self.result = "Testee answered the Ping sent after the frames."
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+      self.p.killAfter(self.WAITSECS)
+
+def onTimeout(self):
+   if self.p.state != self.p.STATE_CLOSED and self.behavior == Case.FAILED:
+      self.timedOut = True
+      self.p.failConnection()
+
+def onConnectionLost(self, failedByMe):
+   Case.onConnectionLost(self, failedByMe)
+   if self.p.connectionWasOpen and self.behavior == Case.FAILED and not self.timedOut:
+      self.behavior = Case.OK
+      self.result = "Testee failed the connection."
+   self.behaviorClose = Case.INFORMATIONAL
+   self.resultClose = "Closing behavior is not checked when replaying mutated frames."
+
+
+def generateReproCases(repros):
+   """
+   Generate cases 21.x.x from the "repros" section of the spec.
+
+   :param repros: List of repro files or glob patterns.
+   :type repros: list
+   :returns: tuple -- (list of case classes, dict of case subcategories)
+   """
+   if type(repros) != list:
+      repros = [repros]
+
+   cases = []
+   subCategories = {}
+
+   j = 1
+   for pattern in repros:
+      files = sorted(glob.glob(os.path.expanduser(pattern)))
+      if len(files) == 0:
+         raise Exception("no repro files match %s" % pattern)
+      subCategories['%d.%d' % (REPRO_CATEGORY, j)] = "Mutation fuzzer repros - %s" % pattern
+      i = 1
+      for fn in files:
+         r = loadRepro(fn)
+         timeout = int(r.get("timeout", 5))
+         DESCRIPTION = """Replay %d frames which made the mutation fuzzer detect a %s (seed case %s, mutations %s), then send a Ping.<br><br>Repro: %s""" % \
+            (len(r["frames"]), r.get("kind", "?"), r.get("seed", "?"), ', '.join(r.get("mutations", [])), os.path.abspath(fn))
+         EXPECTATION = """Testee answers the Ping or fails the connection. Timeout case after %d secs.""" % timeout
+         C = type("Case%d_%d_%d" % (REPRO_CATEGORY, j, i),
+                   (object, Case, ),
+                   {"FRAMES": r["frames"],
+                    "WAITSECS": timeout,
+                    "DESCRIPTION": """%s""" % DESCRIPTION,
+                    "EXPECTATION": """%s""" % EXPECTATION,
+                    "__init__": __init__,
+                    "onOpen": onOpen,
+                    "onPong": onPong,
+                    "onTimeout": onTimeout,
+                    "onConnectionLost": onConnectionLost,
+                    })
+         cases.append(C)
+         i += 1
+      j += 1
+
+   return cases, subCategories
@@ -17,17 +17,20 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case3_1(Case):
+class Case3_1(DeclarativeCase):
 
    DESCRIPTION = """Send small text message with <b>RSV = 1</b>."""
 
    EXPECTATION = """The connection is failed immediately (1002/protocol error), since RSV must be 0, when no extension defining RSV meaning has been negotiated."""
 
-   def onOpen(self):
-      self.expected[Case.OK] = []
-      self.expectedClose = {"closedByMe": False,
-                            "closeCode": [self.p.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
-                            "requireClean": False}
-      self.p.sendFrame(opcode = 1, payload = "Hello, world!", rsv = 1)
-      self.p.killAfter(1)
+   STEPS = [send(opcode = 1, payload = "Hello, world!", rsv = 1),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: []}
+
+   EXPECTED_CLOSE = {"closedByMe": False,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
+                     "requireClean": False}
@@ -17,19 +17,25 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case3_4(Case):
+class Case3_4(DeclarativeCase):
 
    DESCRIPTION = """Send small text message, then send again with <b>RSV = 4</b>, then send Ping. Octets are sent in octet-wise chops."""
 
    EXPECTATION = """Echo for first message is received, but then connection is failed immediately, since RSV must be 0, when no extension defining RSV meaning has been negotiated. The Pong is not received."""
 
-   def onOpen(self):
-      payload = "Hello, world!"
-      self.expected[Case.OK] = [("message", payload, False)]
-      self.expected[Case.NON_STRICT] = []
-      self.expectedClose = {"closedByMe":False,"closeCode":[self.p.CLOSE_STATUS_CODE_PROTOCOL_ERROR],"requireClean":False}
-      self.p.sendFrame(opcode = 1, payload = payload, chopsize = 1)
-      self.p.sendFrame(opcode = 1, payload = payload, rsv = 4, chopsize = 1)
-      self.p.sendFrame(opcode = 9, chopsize = 1)
-      self.p.killAfter(1)
+   PAYLOAD = "Hello, world!"
+
+   STEPS = [send(opcode = 1, payload = PAYLOAD, chopsize = 1),
+            send(opcode = 1, payload = PAYLOAD, rsv = 4, chopsize = 1),
+            send(opcode = 9, chopsize = 1),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: [("message", PAYLOAD, False)],
+               Case.NON_STRICT: []}
+
+   EXPECTED_CLOSE = {"closedByMe": False,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
+                     "requireClean": False}
@@ -17,16 +17,22 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case3_5(Case):
+class Case3_5(DeclarativeCase):
 
    DESCRIPTION = """Send small binary message with <b>RSV = 5</b>."""
 
    EXPECTATION = """The connection is failed immediately, since RSV must be 0."""
 
-   def onOpen(self):
-      payload = "\x00\xff\xfe\xfd\xfc\xfb\x00\xff"
-      self.expected[Case.OK] = []
-      self.expectedClose = {"closedByMe":False,"closeCode":[self.p.CLOSE_STATUS_CODE_PROTOCOL_ERROR],"requireClean":False}
-      self.p.sendFrame(opcode = 2, payload = payload, rsv = 5)
-      self.p.killAfter(1)
+   PAYLOAD = "\x00\xff\xfe\xfd\xfc\xfb\x00\xff"
+
+   STEPS = [send(opcode = 2, payload = PAYLOAD, rsv = 5),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: []}
+
+   EXPECTED_CLOSE = {"closedByMe": False,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
+                     "requireClean": False}
@@ -17,16 +17,22 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case3_6(Case):
+class Case3_6(DeclarativeCase):
 
    DESCRIPTION = """Send Ping with <b>RSV = 6</b>."""
 
    EXPECTATION = """The connection is failed immediately, since RSV must be 0."""
 
-   def onOpen(self):
-      payload = "Hello, world!"
-      self.expected[Case.OK] = []
-      self.expectedClose = {"closedByMe":False,"closeCode":[self.p.CLOSE_STATUS_CODE_PROTOCOL_ERROR],"requireClean":False}
-      self.p.sendFrame(opcode = 2, payload = payload, rsv = 6)
-      self.p.killAfter(1)
+   PAYLOAD = "Hello, world!"
+
+   STEPS = [send(opcode = 2, payload = PAYLOAD, rsv = 6),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: []}
+
+   EXPECTED_CLOSE = {"closedByMe": False,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
+                     "requireClean": False}
@@ -17,15 +17,20 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case3_7(Case):
+class Case3_7(DeclarativeCase):
 
    DESCRIPTION = """Send Close with <b>RSV = 7</b>."""
 
    EXPECTATION = """The connection is failed immediately, since RSV must be 0."""
 
-   def onOpen(self):
-      self.expected[Case.OK] = []
-      self.expectedClose = {"closedByMe":False,"closeCode":[self.p.CLOSE_STATUS_CODE_PROTOCOL_ERROR],"requireClean":False}
-      self.p.sendFrame(opcode = 8, rsv = 7)
-      self.p.killAfter(1)
+   STEPS = [send(opcode = 8, rsv = 7),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: []}
+
+   EXPECTED_CLOSE = {"closedByMe": False,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
+                     "requireClean": False}
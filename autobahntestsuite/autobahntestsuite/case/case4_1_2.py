@@ -17,15 +17,20 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case4_1_2(Case):
+class Case4_1_2(DeclarativeCase):
 
    DESCRIPTION = """Send frame with reserved non-control <b>Opcode = 4</b> and non-empty payload."""
 
    EXPECTATION = """The connection is failed immediately."""
 
-   def onOpen(self):
-      self.expected[Case.OK] = []
-      self.expectedClose = {"closedByMe":False,"closeCode":[self.p.CLOSE_STATUS_CODE_PROTOCOL_ERROR],"requireClean":False}
-      self.p.sendFrame(opcode = 4, payload = "reserved opcode payload")
-      self.p.killAfter(1)
+   STEPS = [send(opcode = 4, payload = "reserved opcode payload"),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: []}
+
+   EXPECTED_CLOSE = {"closedByMe": False,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
+                     "requireClean": False}
@@ -17,19 +17,25 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case4_1_3(Case):
+class Case4_1_3(DeclarativeCase):
 
    DESCRIPTION = """Send small text message, then send frame with reserved non-control <b>Opcode = 5</b>, then send Ping."""
 
    EXPECTATION = """Echo for first message is received, but then connection is failed immediately, since reserved opcode frame is used. A Pong is not received."""
 
-   def onOpen(self):
-      payload = "Hello, world!"
-      self.expected[Case.OK] = [("message", payload, False)]
-      self.expected[Case.NON_STRICT] = []
-      self.expectedClose = {"closedByMe":False,"closeCode":[self.p.CLOSE_STATUS_CODE_PROTOCOL_ERROR],"requireClean":False}
-      self.p.sendFrame(opcode = 1, payload = payload)
-      self.p.sendFrame(opcode = 5)
-      self.p.sendFrame(opcode = 9)
-      self.p.killAfter(1)
+   PAYLOAD = "Hello, world!"
+
+   STEPS = [send(opcode = 1, payload = PAYLOAD),
+            send(opcode = 5),
+            send(opcode = 9),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: [("message", PAYLOAD, False)],
+               Case.NON_STRICT: []}
+
+   EXPECTED_CLOSE = {"closedByMe": False,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
+                     "requireClean": False}
@@ -17,15 +17,20 @@
 ###############################################################################
 
 from case import Case
+from declarative import *
+from autobahn.websocket.protocol import WebSocketProtocol
 
-class Case4_2_1(Case):
+class Case4_2_1(DeclarativeCase):
 
    DESCRIPTION = """Send frame with reserved control <b>Opcode = 11</b>."""
 
    EXPECTATION = """The connection is failed immediately."""
 
-   def onOpen(self):
-      self.expected[Case.OK] = []
-      self.expectedClose = {"closedByMe":False,"closeCode":[self.p.CLOSE_STATUS_CODE_PROTOCOL_ERROR],"requireClean":False}
-      self.p.sendFrame(opcode = 11)
-      self.p.killAfter(1)
+   STEPS = [send(opcode = 11),
+            killAfter(1)]
+
+   EXPECTED = {Case.OK: []}
+
+   EXPECTED_CLOSE = {"closedByMe": False,
+                     "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_PROTOCOL_ERROR],
+                     "requireClean": False}
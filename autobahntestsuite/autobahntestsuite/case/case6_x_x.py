@@ -19,7 +19,7 @@
 ###############################################################################
 
 import binascii
-from case import Case
+from case import Case, CaseBatch
 from autobahn.websocket.utf8validator import Utf8Validator
 
 
@@ -332,6 +332,48 @@ def onOpen(self):
    self.p.killAfter(0.5)
 
 
+class Case6_X_X_Batch(CaseBatch):
+   """
+   Runs cases 6.x.x with valid UTF-8 together: every payload is sent as a text
+   message of its own, and every echo is checked against its case.
+   """
+
+   WAITSECS = 10
+
+   def onOpen(self):
+      self.expected[Case.OK] = [("message", C.PAYLOAD, False) for C in self.cases]
+      self.expectedClose = {"closedByMe": True,
+                            "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL],
+                            "requireClean": True}
+      for C in self.cases:
+         self.p.sendMessage(C.PAYLOAD, False)
+      self.p.killAfter(self.WAITSECS)
+
+   def onMessage(self, msg, binary):
+      ## echos are checked per case in batchResults()
+      self.received.append(("message", msg, binary))
+      if len(self.received) == len(self.cases):
+         self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+   def batchResults(self):
+      ## messages are echo'ed in order, so the k-th message is the k-th case's echo
+      messages = [e for e in self.received if e[0] == "message"]
+      results = []
+      for k in xrange(len(self.cases)):
+         C = self.cases[k]
+         expected = [("message", C.PAYLOAD, False)]
+         received = messages[k:k + 1]
+         if self.compare(received, expected):
+            behavior, result = Case.OK, "Actual events match at least one expected."
+         else:
+            behavior, result = Case.FAILED, "Actual events differ from any expected."
+         results.append((C, {"behavior": behavior,
+                             "result": result,
+                             "expected": {Case.OK: expected},
+                             "received": received}))
+      return results
+
+
 i = 5
 for t in createUtf8TestSequences():
    j = 1
@@ -347,6 +389,7 @@ for t in createUtf8TestSequences():
                 (object, Case, ),
                 {"PAYLOAD": p[1],
                  "isValid": p[0],
+                 "BATCH": Case6_X_X_Batch if p[0] else None,
                  "DESCRIPTION": """%s<br><br>Payload: 0x%s""" % (desc, binascii.b2a_hex(p[1])),
                  "EXPECTATION": """%s""" % exp,
                  "__init__": __init__,
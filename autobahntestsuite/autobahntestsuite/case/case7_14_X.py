@@ -0,0 +1,202 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case7_14_X']
+
+from case import Case
+from peers import PeerClientFactory, connectPeers
+from autobahntestsuite.util import monotonic
+from autobahntestsuite.stats import Histogram
+
+
+##
+## Cases 7.14.x: closing handshake latency. On many (additional) connections,
+## measure the time from sending our close frame until the testee's close
+## reply arrives, and until the testee drops the TCP connection.
+##
+
+## list of (connections, bulk message size before closing or 0, connections
+## open at a time, case timeout)
+##
+TESTS = [(100,  0,     1,  60),
+         (1000, 0,     1,  240),
+         (1000, 0,     50, 120),
+         (100,  65536, 1,  120),
+         (100,  2**20, 1,  240),
+         (1000, 65536, 50, 240)]
+
+## secs we wait for the close reply, and for the testee to drop the TCP
+## (closeHandshakeTimeout / serverConnectionDropTimeout of the connections)
+##
+CLOSE_TIMEOUT = 10
+
+Case7_14_X = []
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportClose = True
+
+def onOpen(self):
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+
+   if self.p.factory.isServer:
+      ## we can't open additional connections to a testee client
+      self.behavior = Case.INFORMATIONAL
+      self.result = "Case only runs with the fuzzer being a client (fuzzingclient mode)."
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+      return
+
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   self.closeReply = Histogram()
+   self.tcpFin = Histogram()
+   self.peers = []
+   self.connecting = 0
+   self.closed = 0
+   self.closeHandshakeTimeouts = 0
+   self.serverConnectionDropTimeouts = 0
+   self.notClean = 0
+   self.finished = False
+
+   self.factory = PeerClientFactory(self, self.p.factory.url,
+                                    options = {"closeHandshakeTimeout": CLOSE_TIMEOUT,
+                                               "serverConnectionDropTimeout": CLOSE_TIMEOUT})
+   self.connectMore()
+
+def connectMore(self):
+   n = min(self.CONCURRENCY - (len(self.peers) - self.closed) - self.connecting, self.CONNECTIONS - len(self.peers) - self.connecting)
+   if n > 0:
+      self.connecting += n
+      connectPeers(self.factory, n)
+
+def onPeerOpen(self, peer):
+   self.connecting -= 1
+   peer.closeSent = None
+   self.peers.append(peer)
+   if self.BULK > 0:
+      peer.sendMessage("\xfe" * self.BULK, True)
+   else:
+      self.closePeer(peer)
+
+def onPeerFailed(self, reason):
+   self.finish(Case.FAILED, "Could not open connection %d of %d (%s)." % (len(self.peers) + 1, self.CONNECTIONS, reason.getErrorMessage()))
+
+def onPeerMessage(self, peer, payload, isBinary):
+   if self.finished:
+      return
+   if not isBinary or len(payload) != self.BULK:
+      self.finish(Case.FAILED, "Echo'ed message type or length differs from what I sent (got binary = %s, payload length = %s)." % (isBinary, len(payload)))
+   else:
+      self.closePeer(peer)
+
+def closePeer(self, peer):
+   peer.closeSent = monotonic()
+   peer.sendClose(peer.CLOSE_STATUS_CODE_NORMAL)
+
+def onPeerCloseFrame(self, peer, code):
+   if peer.closeSent is not None:
+      self.closeReply.record(int(round(1000000. * (monotonic() - peer.closeSent))))
+
+def onPeerClose(self, peer, wasClean, code, reason):
+   if self.finished:
+      return
+   if getattr(peer, 'closeSent', None) is None:
+      self.finish(Case.FAILED, "Connection was closed by testee before we initiated the closing handshake (code = %s, reason = %s)." % (code, reason))
+      return
+
+   if peer.wasCloseHandshakeTimeout:
+      self.closeHandshakeTimeouts += 1
+   elif peer.wasServerConnectionDropTimeout:
+      self.serverConnectionDropTimeouts += 1
+   else:
+      self.tcpFin.record(int(round(1000000. * (monotonic() - peer.closeSent))))
+   if not wasClean:
+      self.notClean += 1
+
+   self.closed += 1
+   if self.closed == self.CONNECTIONS:
+      self.closeStats = {"connections": self.CONNECTIONS,
+                         "bulkSize": self.BULK,
+                         "concurrency": self.CONCURRENCY,
+                         "closeTimeout": CLOSE_TIMEOUT,
+                         "closeReply": self.closeReply.__json__(),
+                         "tcpFin": self.tcpFin.__json__(),
+                         "closeHandshakeTimeouts": self.closeHandshakeTimeouts,
+                         "serverConnectionDropTimeouts": self.serverConnectionDropTimeouts,
+                         "notClean": self.notClean}
+      summary = "close reply p50/p99 = %s/%s us, TCP FIN p50/p99 = %s/%s us" % (self.closeReply.percentile(50), self.closeReply.percentile(99), self.tcpFin.percentile(50), self.tcpFin.percentile(99))
+      if self.closeHandshakeTimeouts > 0:
+         self.finish(Case.FAILED, "Testee did not reply to our close frame within %d secs on %d of %d connections (%s)." % (CLOSE_TIMEOUT, self.closeHandshakeTimeouts, self.CONNECTIONS, summary))
+      elif self.serverConnectionDropTimeouts > 0:
+         self.finish(Case.NON_STRICT, "Testee did not drop the TCP connection within %d secs after the closing handshake on %d of %d connections (%s)." % (CLOSE_TIMEOUT, self.serverConnectionDropTimeouts, self.CONNECTIONS, summary))
+      else:
+         self.finish(Case.OK, "Ok, all %d connections closed cleanly (%s)." % (self.CONNECTIONS, summary))
+   else:
+      self.connectMore()
+
+def finish(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   self.behavior = behavior
+   self.result = result
+   for peer in self.peers:
+      if peer.state == peer.STATE_OPEN:
+         peer.sendClose(peer.CLOSE_STATUS_CODE_NORMAL)
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+def onConnectionLost(self, failedByMe):
+   Case.onConnectionLost(self, failedByMe)
+   if hasattr(self, 'peers'):
+      for peer in self.peers:
+         if peer.state != peer.STATE_CLOSED:
+            peer.dropConnection()
+
+
+i = 1
+for s in TESTS:
+   DESCRIPTION = """Open %d additional connections (%d at a time). On each, %s, then send a close frame. Measure the time until the testee's close reply arrives, and until the testee drops the TCP connection.""" % (s[0], s[2], "send a binary message of payload size %d and wait for its echo" % s[1] if s[1] else "right after the opening handshake")
+   EXPECTATION = """Testee replies to the close frame and drops the TCP connection within %d secs on all connections. Not dropping the TCP in time is NON-STRICT. Timeout case after %d secs.""" % (CLOSE_TIMEOUT, s[3])
+   C = type("Case7_14_%d" % i,
+             (object, Case, ),
+             {"CONNECTIONS": s[0],
+              "BULK": s[1],
+              "CONCURRENCY": s[2],
+              "WAITSECS": s[3],
+              "DESCRIPTION": """%s""" % DESCRIPTION,
+              "EXPECTATION": """%s""" % EXPECTATION,
+              "__init__": __init__,
+              "onOpen": onOpen,
+              "connectMore": connectMore,
+              "onPeerOpen": onPeerOpen,
+              "onPeerFailed": onPeerFailed,
+              "onPeerMessage": onPeerMessage,
+              "closePeer": closePeer,
+              "onPeerCloseFrame": onPeerCloseFrame,
+              "onPeerClose": onPeerClose,
+              "finish": finish,
+              "onConnectionLost": onConnectionLost,
+              })
+   Case7_14_X.append(C)
+   i += 1
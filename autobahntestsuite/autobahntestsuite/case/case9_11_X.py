@@ -0,0 +1,128 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case9_11_X',
+           'Case9_12_X',
+           ]
+
+from collections import deque
+
+from case import Case
+from autobahntestsuite.util import monotonic
+from autobahntestsuite.stats import Histogram
+
+## list of (payload length, message count, case timeout)
+##
+MSG_SIZES = [(16,    10000, 60),
+             (256,   10000, 60),
+             (4096,  5000,  120),
+             (65536, 1000,  240)]
+
+## number of messages kept in flight
+##
+WINDOWS = [1, 8, 64, 512]
+
+Case9_11_X = []
+Case9_12_X = []
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportLatency = True
+   self.reportThroughput = True
+
+def onOpen(self):
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+   self.sentCount = 0
+   self.receivedCount = 0
+   self.inflight = deque()
+   self.latencyStats = Histogram()
+   self.started = monotonic()
+   for i in xrange(min(self.WINDOW, self.COUNT)):
+      self.sendOne()
+
+def sendOne(self):
+   self.inflight.append(monotonic())
+   if self.BINARY:
+      self.p.sendFrame(opcode = 2, payload = "\xfe", payload_len = self.LEN)
+   else:
+      self.p.sendFrame(opcode = 1, payload = "*", payload_len = self.LEN)
+   self.sentCount += 1
+
+def onMessage(self, msg, binary):
+   ## echo preserves message order, so this answers the oldest message in flight
+   self.latencyStats.record(round(1000000. * (monotonic() - self.inflight.popleft())))
+   self.receivedCount += 1
+   if binary != self.BINARY or len(msg) != self.LEN:
+      self.behavior = Case.FAILED
+      self.result = "Echo'ed message type or length differs from what I sent (got binary = %s, payload length = %s)." % (binary, len(msg))
+      self.p.enableWirelog(True)
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+   elif self.receivedCount < self.COUNT:
+      if self.sentCount < self.COUNT:
+         self.sendOne()
+   else:
+      duration = monotonic() - self.started
+      self.throughputStats = {"window": self.WINDOW,
+                              "size": self.LEN,
+                              "messages": self.receivedCount,
+                              "octets": self.receivedCount * self.LEN,
+                              "duration": duration,
+                              "messagesPerSec": self.receivedCount / duration if duration > 0 else None,
+                              "octetsPerSec": self.receivedCount * self.LEN / duration if duration > 0 else None}
+      self.behavior = Case.OK
+      self.result = "Ok, received all echo'ed messages in time."
+      self.p.enableWirelog(True)
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+for b in [False, True]:
+   i = 1
+   for s in MSG_SIZES:
+      for w in WINDOWS:
+         if b:
+            mt = "binary"
+            cc = "Case9_12_%d"
+         else:
+            mt = "text"
+            cc = "Case9_11_%d"
+         DESCRIPTION = """Send %d %s messages of payload size %d, keeping %d messages in flight (sending the next message whenever an echo arrives), to measure implementation/network throughput and latency.""" % (s[1], mt, s[0], w)
+         EXPECTATION = """Receive echo'ed %s messages (with payload as sent). Timeout case after %d secs.""" % (mt, s[2])
+         C = type(cc % i,
+                   (object, Case, ),
+                   {"LEN": s[0],
+                    "COUNT": s[1],
+                    "WAITSECS": s[2],
+                    "WINDOW": w,
+                    "BINARY": b,
+                    "DESCRIPTION": """%s""" % DESCRIPTION,
+                    "EXPECTATION": """%s""" % EXPECTATION,
+                    "__init__": __init__,
+                    "onOpen": onOpen,
+                    "onMessage": onMessage,
+                    "sendOne": sendOne,
+                    })
+         if b:
+            Case9_12_X.append(C)
+         else:
+            Case9_11_X.append(C)
+         i += 1
@@ -0,0 +1,184 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case9_13_X']
+
+from case import Case
+from peers import PeerClientFactory, connectPeers
+from autobahntestsuite.util import monotonic
+from autobahntestsuite.stats import Histogram, jainFairness
+
+## list of (connections, messages per connection, payload length, case timeout)
+##
+tests = [(10,   1000, 64,   60),
+         (100,  100,  64,   120),
+         (1000, 10,   64,   240),
+         (10,   1000, 4096, 120),
+         (100,  100,  4096, 240),
+         (1000, 10,   4096, 480)]
+
+Case9_13_X = []
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportLatency = True
+   self.reportThroughput = True
+
+def onOpen(self):
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+
+   if self.p.factory.isServer:
+      ## we can't open additional connections to a testee client
+      self.behavior = Case.INFORMATIONAL
+      self.result = "Case only runs with the fuzzer being a client (fuzzingclient mode)."
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+      return
+
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   self.peers = []
+   self.peersFailed = 0
+   self.peersDone = 0
+   self.finished = False
+   self.latencyStats = Histogram()
+   self.started = None
+
+   connectPeers(PeerClientFactory(self, self.p.factory.url), self.CONNECTIONS)
+
+def onPeerOpen(self, peer):
+   peer.opened = True
+   peer.count = 0
+   peer.received = 0
+   peer.sent = None
+   peer.done = None
+   self.peers.append(peer)
+   self.checkStart()
+
+def onPeerFailed(self, reason):
+   self.peersFailed += 1
+   self.checkStart()
+
+def checkStart(self):
+   ## start sending on all connections at once, when all are open
+   if len(self.peers) + self.peersFailed == self.CONNECTIONS and not self.finished:
+      if self.peersFailed > 0:
+         self.finish(Case.FAILED, "Could only open %d of %d connections." % (len(self.peers), self.CONNECTIONS))
+      else:
+         self.started = monotonic()
+         for peer in self.peers:
+            self.sendOne(peer)
+
+def sendOne(self, peer):
+   peer.sent = monotonic()
+   peer.sendFrame(opcode = 1, payload = "*", payload_len = self.LEN)
+   peer.count += 1
+
+def onPeerMessage(self, peer, payload, isBinary):
+   now = monotonic()
+   self.latencyStats.record(round(1000000. * (now - peer.sent)))
+   peer.received += 1
+   if isBinary or len(payload) != self.LEN:
+      self.finish(Case.FAILED, "Echo'ed message type or length differs from what I sent (got binary = %s, payload length = %s)." % (isBinary, len(payload)))
+   elif peer.count < self.COUNT:
+      self.sendOne(peer)
+   else:
+      peer.done = now
+      self.peersDone += 1
+      if self.peersDone == self.CONNECTIONS:
+         self.finish(Case.OK, "Ok, received all echo'ed messages on all connections in time.")
+
+def onPeerClose(self, peer, wasClean, code, reason):
+   if self.finished:
+      return
+   if not getattr(peer, 'opened', False):
+      ## opening handshake rejected, or connection reset (e.g. at the testee's connection limit)
+      self.peersFailed += 1
+      self.checkStart()
+   elif self.started is None:
+      self.finish(Case.FAILED, "Connection was closed by testee before all connections were open (code = %s, reason = %s)." % (code, reason))
+   elif peer.done is None:
+      self.finish(Case.FAILED, "Connection was closed by testee before all echo'ed messages were received (code = %s, reason = %s)." % (code, reason))
+
+def finish(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   if self.started is not None and self.peersDone > 0:
+      duration = monotonic() - self.started
+      perConnection = [float(self.COUNT) / (p.done - self.started) for p in self.peers if p.done is not None and p.done > self.started]
+      messages = sum([p.received for p in self.peers])
+      self.throughputStats = {"connections": self.CONNECTIONS,
+                              "size": self.LEN,
+                              "messages": messages,
+                              "octets": messages * self.LEN,
+                              "duration": duration,
+                              "messagesPerSec": messages / duration if duration > 0 else None,
+                              "octetsPerSec": messages * self.LEN / duration if duration > 0 else None,
+                              "connectionMinMessagesPerSec": min(perConnection) if perConnection else None,
+                              "connectionMaxMessagesPerSec": max(perConnection) if perConnection else None,
+                              "fairness": jainFairness(perConnection)}
+   self.behavior = behavior
+   self.result = result
+   self.closePeers()
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+def closePeers(self):
+   for peer in self.peers:
+      if peer.state == peer.STATE_OPEN:
+         peer.sendClose(peer.CLOSE_STATUS_CODE_NORMAL)
+
+def onConnectionLost(self, failedByMe):
+   Case.onConnectionLost(self, failedByMe)
+   if hasattr(self, 'peers'):
+      for peer in self.peers:
+         if peer.state != peer.STATE_CLOSED:
+            peer.dropConnection()
+
+
+i = 1
+for s in tests:
+   DESCRIPTION = """Open %d additional connections and send %d text messages of payload size %d on each of them concurrently (one message in flight per connection), to measure aggregate throughput, per-connection fairness and tail latency.""" % (s[0], s[1], s[2])
+   EXPECTATION = """Receive echo'ed text messages (with payload as sent) on all connections. Timeout case after %d secs.""" % (s[3])
+   C = type("Case9_13_%d" % i,
+             (object, Case, ),
+             {"CONNECTIONS": s[0],
+              "COUNT": s[1],
+              "LEN": s[2],
+              "WAITSECS": s[3],
+              "DESCRIPTION": """%s""" % DESCRIPTION,
+              "EXPECTATION": """%s""" % EXPECTATION,
+              "__init__": __init__,
+              "onOpen": onOpen,
+              "onPeerOpen": onPeerOpen,
+              "onPeerFailed": onPeerFailed,
+              "onPeerMessage": onPeerMessage,
+              "onPeerClose": onPeerClose,
+              "checkStart": checkStart,
+              "sendOne": sendOne,
+              "finish": finish,
+              "closePeers": closePeers,
+              "onConnectionLost": onConnectionLost,
+              })
+   Case9_13_X.append(C)
+   i += 1
@@ -0,0 +1,296 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case9_14_X',
+           'Case9_15_X',
+           ]
+
+import struct
+
+from twisted.internet import reactor
+
+from case import Case
+from autobahntestsuite.util import monotonic
+from autobahntestsuite.stats import Histogram
+
+
+##
+## Cases 9.14.x: Ping/Pong roundtrip time while the testee is busy receiving
+## and echo'ing a large fragmented message
+##
+
+## list of (message size, fragment size, ping interval in ms, case timeout)
+##
+BULK_TESTS = [(16 * 2**20, 4096,    10, 240),
+              (16 * 2**20, 65536,   10, 120),
+              (16 * 2**20, 2**20,   10, 120),
+              (16 * 2**20, 65536,   1,  120),
+              (64 * 2**20, 65536,   10, 480)]
+
+## octets of fragments we send per reactor iteration
+##
+BULK_BATCH = 65536
+
+Case9_14_X = []
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportLatency = True
+   self.reportThroughput = True
+
+def onOpen(self):
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   self.latencyStats = Histogram()
+   self.pings = {}
+   self.pingSeq = 0
+   self.pongsReceived = 0
+   self.lastPong = None
+   self.sentOctets = 0
+   self.echoed = False
+   self.finished = False
+   self.paused = False
+   self.started = monotonic()
+
+   ## we are a (streaming) producer for the transport, so we only send
+   ## fragments as fast as the testee consumes them
+   self.p.registerProducer(self, True)
+   self.sendFragments()
+   self.sendPing()
+
+def pauseProducing(self):
+   self.paused = True
+
+def resumeProducing(self):
+   if self.paused:
+      self.paused = False
+      reactor.callLater(0, self.sendFragments)
+
+def stopProducing(self):
+   self.finished = True
+
+def sendFragments(self):
+   n = 0
+   while not self.paused and not self.finished and self.sentOctets < self.LEN and n < BULK_BATCH:
+      l = min(self.FRAGSIZE, self.LEN - self.sentOctets)
+      opcode = 2 if self.sentOctets == 0 else 0
+      self.sentOctets += l
+      self.p.sendFrame(opcode = opcode, fin = self.sentOctets == self.LEN, payload = "\xfe", payload_len = l)
+      n += l
+   if not self.paused and not self.finished and self.sentOctets < self.LEN:
+      ## give pongs a chance to come in
+      reactor.callLater(0, self.sendFragments)
+
+def sendPing(self):
+   if self.finished or self.echoed:
+      return
+   self.pingSeq += 1
+   self.pings[self.pingSeq] = monotonic()
+   self.p.sendFrame(opcode = 9, payload = str(self.pingSeq))
+   reactor.callLater(self.PING_INTERVAL / 1000., self.sendPing)
+
+def onPong(self, payload):
+   try:
+      seq = int(payload)
+      sent = self.pings.pop(seq)
+   except:
+      self.finish(Case.FAILED, "Received Pong for a Ping never sent (payload = %s)." % payload)
+      return
+   self.latencyStats.record(round(1000000. * (monotonic() - sent)))
+   self.pongsReceived += 1
+   self.lastPong = seq
+   if self.echoed and seq == self.pingSeq:
+      self.finishEchoed()
+
+def onMessage(self, msg, binary):
+   if not binary or len(msg) != self.LEN:
+      self.finish(Case.FAILED, "Echo'ed message type or length differs from what I sent (got binary = %s, payload length = %s)." % (binary, len(msg)))
+   else:
+      self.echoed = True
+      self.duration = monotonic() - self.started
+      ## a testee may answer only the most recent Ping, so we're done when
+      ## our last Ping was answered
+      if self.lastPong == self.pingSeq:
+         self.finishEchoed()
+
+def finishEchoed(self):
+   self.throughputStats = {"size": self.LEN,
+                           "fragmentSize": self.FRAGSIZE,
+                           "pingInterval": self.PING_INTERVAL,
+                           "pingsSent": self.pingSeq,
+                           "pongsReceived": self.pongsReceived,
+                           "octets": self.LEN,
+                           "duration": self.duration,
+                           "octetsPerSec": self.LEN / self.duration if self.duration > 0 else None}
+   self.finish(Case.OK, "Ok, received echo'ed message and Pongs for %d of %d Pings." % (self.pongsReceived, self.pingSeq))
+
+def finish(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   self.behavior = behavior
+   self.result = result
+   self.p.unregisterProducer()
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+
+i = 1
+for s in BULK_TESTS:
+   DESCRIPTION = """Send a binary message of payload size %d in fragments of %d octets, as fast as the testee consumes them. While doing so, and until the echo'ed message has been received, send a Ping every %d ms, to measure Ping/Pong roundtrip time of a testee busy with bulk data.""" % (s[0], s[1], s[2])
+   EXPECTATION = """Receive echo'ed binary message (with payload length as sent) and a Pong for (at least) the last Ping. Timeout case after %d secs.""" % (s[3])
+   C = type("Case9_14_%d" % i,
+             (object, Case, ),
+             {"LEN": s[0],
+              "FRAGSIZE": s[1],
+              "PING_INTERVAL": s[2],
+              "WAITSECS": s[3],
+              "DESCRIPTION": """%s""" % DESCRIPTION,
+              "EXPECTATION": """%s""" % EXPECTATION,
+              "__init__": __init__,
+              "onOpen": onOpen,
+              "pauseProducing": pauseProducing,
+              "resumeProducing": resumeProducing,
+              "stopProducing": stopProducing,
+              "sendFragments": sendFragments,
+              "sendPing": sendPing,
+              "onPong": onPong,
+              "onMessage": onMessage,
+              "finishEchoed": finishEchoed,
+              "finish": finish,
+              })
+   Case9_14_X.append(C)
+   i += 1
+
+
+
+##
+## Cases 9.15.x: Ping throughput
+##
+
+## list of (number of pings, ping payload size, pings in flight, case timeout)
+##
+PING_TESTS = [(1000,   8,   1,  60),
+              (10000,  8,   1,  120),
+              (10000,  125, 1,  120),
+              (10000,  8,   16, 120),
+              (100000, 8,   64, 240)]
+
+Case9_15_X = []
+
+
+def onOpenPings(self):
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   self.latencyStats = Histogram()
+   self.pings = {}
+   self.pingSeq = 0
+   self.lastPong = 0
+   self.pongsReceived = 0
+   self.finished = False
+   self.started = monotonic()
+   for i in xrange(min(self.WINDOW, self.COUNT)):
+      self.sendPing()
+
+def sendPingSeq(self):
+   self.pingSeq += 1
+   self.pings[self.pingSeq] = monotonic()
+   ## sequence number, padded to payload size
+   payload = struct.pack("!Q", self.pingSeq) + "*" * (self.LEN - 8)
+   self.p.sendFrame(opcode = 9, payload = payload)
+
+def onPongPings(self, payload):
+   if self.finished:
+      return
+   try:
+      seq = struct.unpack("!Q", payload[:8])[0]
+      sent = self.pings.pop(seq)
+   except:
+      self.finish(Case.FAILED, "Received Pong for a Ping never sent (payload = %s)." % payload.encode("hex"))
+      return
+   if len(payload) != self.LEN:
+      self.finish(Case.FAILED, "Pong payload differs from Ping payload (got payload length = %d)." % len(payload))
+      return
+   now = monotonic()
+   self.latencyStats.record(round(1000000. * (now - sent)))
+   self.pongsReceived += 1
+
+   ## a testee may answer only the most recent of multiple Pings in flight:
+   ## all Pings sent before the one answered are done too
+   answered = 1
+   for s in range(self.lastPong + 1, seq):
+      if self.pings.pop(s, None) is not None:
+         answered += 1
+   self.lastPong = max(self.lastPong, seq)
+
+   for i in xrange(answered):
+      if self.pingSeq < self.COUNT:
+         self.sendPing()
+
+   if self.lastPong == self.COUNT:
+      duration = now - self.started
+      self.throughputStats = {"window": self.WINDOW,
+                              "size": self.LEN,
+                              "pingsSent": self.pingSeq,
+                              "pongsReceived": self.pongsReceived,
+                              "duration": duration,
+                              "pingsPerSec": self.COUNT / duration if duration > 0 else None,
+                              ## for the master report
+                              "messagesPerSec": self.COUNT / duration if duration > 0 else None}
+      self.finish(Case.OK, "Ok, received Pongs for %d of %d Pings (including the last one)." % (self.pongsReceived, self.COUNT))
+
+def finishPings(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   self.behavior = behavior
+   self.result = result
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+
+i = 1
+for s in PING_TESTS:
+   DESCRIPTION = """Send %d Pings with payload size %d, keeping %d Pings in flight (sending the next Ping whenever a Pong arrives), to measure Ping throughput and Pong roundtrip time.""" % (s[0], s[1], s[2])
+   EXPECTATION = """Receive Pongs (with payload as sent), at least for the last Ping. Timeout case after %d secs.""" % (s[3])
+   C = type("Case9_15_%d" % i,
+             (object, Case, ),
+             {"COUNT": s[0],
+              "LEN": s[1],
+              "WINDOW": s[2],
+              "WAITSECS": s[3],
+              "DESCRIPTION": """%s""" % DESCRIPTION,
+              "EXPECTATION": """%s""" % EXPECTATION,
+              "__init__": __init__,
+              "onOpen": onOpenPings,
+              "sendPing": sendPingSeq,
+              "onPong": onPongPings,
+              "finish": finishPings,
+              })
+   Case9_15_X.append(C)
+   i += 1
@@ -0,0 +1,212 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case9_16_X']
+
+from twisted.internet import reactor
+
+from case import Case
+from autobahntestsuite.util import monotonic, readRss, transportPending
+
+
+##
+## Cases 9.16.x: the fuzzer stops reading from its socket while it keeps
+## sending messages to be echo'ed. A testee either applies backpressure
+## (stops reading itself), drops the connection, or buffers everything.
+##
+
+## list of (payload length, max. octets to send, case timeout)
+##
+TESTS = [(64,    16 * 2**20,  120),
+         (4096,  64 * 2**20,  240),
+         (65536, 256 * 2**20, 480)]
+
+## secs without the testee accepting any octets for backpressure to be detected
+##
+STALL = 2
+
+## secs between checking progress
+##
+MONITOR_INTERVAL = 0.1
+
+## octets of messages we send per reactor iteration
+##
+BATCH = 65536
+
+Case9_16_X = []
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportThroughput = True
+
+def onOpen(self):
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   ## octets on the wire per message: header (with mask when we are client)
+   self.frameLen = self.LEN + (2 if self.LEN < 126 else (4 if self.LEN < 65536 else 10)) + (0 if self.p.factory.isServer else 4)
+
+   self.sentCount = 0
+   self.receivedCount = 0
+   self.paused = False
+   self.reading = False
+   self.finished = False
+   self.accepted = 0
+   self.backpressure = None
+   self.memorySource = getattr(self.p.factory, 'testeeMemory', None)
+   self.rssBefore = readRss(self.memorySource) if self.memorySource is not None else None
+   self.started = monotonic()
+   self.lastProgress = self.started
+
+   if transportPending(self.p.transport) is None:
+      ## without the socket backlog, backpressure can't be told from buffering
+      self.finished = True
+      self.behavior = Case.INFORMATIONAL
+      self.result = "Cannot measure socket backlog on this transport (%s)." % self.p.transport.__class__.__name__
+      self.p.enableWirelog(True)
+      self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+      return
+
+   ## stop reading from the socket, but keep sending as fast as the testee accepts
+   self.p.transport.pauseProducing()
+   self.p.registerProducer(self, True)
+   self.sendMessages()
+   reactor.callLater(MONITOR_INTERVAL, self.monitor)
+
+def pauseProducing(self):
+   self.paused = True
+
+def resumeProducing(self):
+   if self.paused:
+      self.paused = False
+      reactor.callLater(0, self.sendMessages)
+
+def stopProducing(self):
+   self.finished = True
+
+def sendMessages(self):
+   n = 0
+   while not self.paused and not self.reading and not self.finished and self.sentCount * self.LEN < self.MAXOCTETS and n < BATCH:
+      self.p.sendFrame(opcode = 2, payload = "\xfe", payload_len = self.LEN)
+      self.sentCount += 1
+      n += self.LEN
+   if not self.paused and not self.reading and not self.finished and self.sentCount * self.LEN < self.MAXOCTETS:
+      reactor.callLater(0, self.sendMessages)
+
+def monitor(self):
+   if self.finished or self.reading:
+      return
+   now = monotonic()
+   pending = transportPending(self.p.transport)
+   accepted = self.sentCount * self.frameLen - pending
+   if accepted > self.accepted:
+      self.accepted = accepted
+      self.lastProgress = now
+   if self.sentCount * self.LEN >= self.MAXOCTETS and pending == 0:
+      self.resumeReading(False)
+   elif now - self.lastProgress >= STALL:
+      self.resumeReading(True)
+   else:
+      reactor.callLater(MONITOR_INTERVAL, self.monitor)
+
+def resumeReading(self, backpressure):
+   self.backpressure = backpressure
+   self.timeToBackpressure = self.lastProgress - self.started
+   self.rssStalled = readRss(self.memorySource) if self.memorySource is not None else None
+   self.reading = True
+   self.resumed = monotonic()
+   self.p.transport.resumeProducing()
+
+def onMessage(self, msg, binary):
+   if self.finished:
+      return
+   self.receivedCount += 1
+   if not binary or len(msg) != self.LEN:
+      self.finish(Case.FAILED, "Echo'ed message type or length differs from what I sent (got binary = %s, payload length = %s)." % (binary, len(msg)))
+   elif self.reading and self.receivedCount == self.sentCount:
+      recovery = monotonic() - self.resumed
+      self.throughputStats = {"size": self.LEN,
+                              "messages": self.sentCount,
+                              "octetsAccepted": self.accepted,
+                              "backpressure": self.backpressure,
+                              "timeToBackpressure": self.timeToBackpressure if self.backpressure else None,
+                              "testeeRssBefore": self.rssBefore,
+                              "testeeRssStalled": self.rssStalled,
+                              "recoveryTime": recovery,
+                              "messagesPerSec": self.receivedCount / recovery if recovery > 0 else None,
+                              "duration": monotonic() - self.started}
+      if self.backpressure:
+         self.finish(Case.OK, "Ok, testee applied backpressure after accepting %d octets, and echo'ed all messages within %.3f s after we resumed reading." % (self.accepted, recovery))
+      else:
+         self.finish(Case.NON_STRICT, "Testee accepted all %d octets sent without applying backpressure (buffering echo'ed messages), and echo'ed all messages within %.3f s after we resumed reading." % (self.accepted, recovery))
+
+def finish(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   self.behavior = behavior
+   self.result = result
+   self.p.unregisterProducer()
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+def onConnectionLost(self, failedByMe):
+   if not self.finished and hasattr(self, 'reading') and not self.reading:
+      ## we only notice the testee dropping us when writing fails
+      self.finished = True
+      self.behavior = Case.INFORMATIONAL
+      self.result = "Testee dropped the connection after accepting %d octets (%.3f s) while we did not read." % (self.accepted, self.lastProgress - self.started)
+      self.throughputStats = {"size": self.LEN,
+                              "messages": self.sentCount,
+                              "octetsAccepted": self.accepted,
+                              "backpressure": False,
+                              "testeeRssBefore": self.rssBefore,
+                              "duration": monotonic() - self.started}
+   Case.onConnectionLost(self, failedByMe)
+
+
+i = 1
+for s in TESTS:
+   DESCRIPTION = """Stop reading from the socket, and send binary messages of payload size %d as fast as the testee accepts them, up to %d octets in total. When the testee does not accept any more data for %d secs (backpressure), or all has been sent, resume reading. Report the octets the testee accepted (including what is buffered in the TCP stacks) and how long it takes to receive all echo'ed messages after we resumed reading. When the spec provides the testee process ("memory"), its resident memory is sampled before and when we resume reading.""" % (s[0], s[1], STALL)
+   EXPECTATION = """Testee applies backpressure (stops reading), and echo's all messages once we resume reading. Buffering everything is NON-STRICT, dropping the connection INFORMATIONAL (as is a transport where the socket backlog can't be measured, e.g. TLS). Timeout case after %d secs.""" % (s[2])
+   C = type("Case9_16_%d" % i,
+             (object, Case, ),
+             {"LEN": s[0],
+              "MAXOCTETS": s[1],
+              "WAITSECS": s[2],
+              "DESCRIPTION": """%s""" % DESCRIPTION,
+              "EXPECTATION": """%s""" % EXPECTATION,
+              "__init__": __init__,
+              "onOpen": onOpen,
+              "pauseProducing": pauseProducing,
+              "resumeProducing": resumeProducing,
+              "stopProducing": stopProducing,
+              "sendMessages": sendMessages,
+              "monitor": monitor,
+              "resumeReading": resumeReading,
+              "onMessage": onMessage,
+              "finish": finish,
+              "onConnectionLost": onConnectionLost,
+              })
+   Case9_16_X.append(C)
+   i += 1
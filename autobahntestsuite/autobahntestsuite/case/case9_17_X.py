@@ -0,0 +1,139 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case9_17_X']
+
+from twisted.internet import reactor
+
+from case import Case
+from frames import encodeFrame
+from autobahntestsuite.util import monotonic, transportPending
+
+
+##
+## Cases 9.17.x: a message sent as a huge number of tiny fragments, which
+## makes implementations concatenating buffers per frame (quadratic cost)
+## stand out.
+##
+
+## list of (number of fragments, fragment payload size, chopsize, case timeout)
+##
+TESTS = [(10000,   1,  None,  60),
+         (100000,  1,  None,  120),
+         (1000000, 1,  None,  480),
+         (100000,  16, None,  120),
+         (100000,  1,  1021,  240),
+         (1000000, 1,  65521, 480)]
+
+## secs between checking if all data has left our send buffers
+##
+DRAIN_INTERVAL = 0.001
+
+## number of different (masked) continuation frames we cycle through
+##
+FRAME_POOL = 256
+
+Case9_17_X = []
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportThroughput = True
+
+def onOpen(self):
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   ## pre-encode the whole message, so we measure the testee, not us
+   masked = not self.p.factory.isServer
+   payload = "\xfe" * self.FRAGSIZE
+   pool = [encodeFrame(0, payload, fin = False, masked = masked) for i in xrange(FRAME_POOL)]
+   frames = [encodeFrame(2, payload, fin = False, masked = masked)]
+   for i in xrange(self.COUNT - 2):
+      frames.append(pool[i % FRAME_POOL])
+   frames.append(encodeFrame(0, payload, fin = True, masked = masked))
+   data = ''.join(frames)
+
+   self.finished = False
+   self.drained = None
+   self.started = monotonic()
+   self.p.sendData(data, chopsize = self.CHOPSIZE)
+   self.checkDrained()
+
+def checkDrained(self):
+   if self.finished:
+      return
+   pending = transportPending(self.p.transport)
+   if pending is None:
+      ## can't tell for this transport (e.g. TLS): no send time reported
+      return
+   if len(self.p.send_queue) == 0 and pending == 0:
+      self.drained = monotonic()
+   else:
+      reactor.callLater(DRAIN_INTERVAL, self.checkDrained)
+
+def onMessage(self, msg, binary):
+   now = monotonic()
+   if not binary or len(msg) != self.COUNT * self.FRAGSIZE:
+      self.finish(Case.FAILED, "Echo'ed message type or length differs from what I sent (got binary = %s, payload length = %s)." % (binary, len(msg)))
+   else:
+      duration = now - self.started
+      self.throughputStats = {"fragments": self.COUNT,
+                              "fragmentSize": self.FRAGSIZE,
+                              "chopsize": self.CHOPSIZE,
+                              "size": self.COUNT * self.FRAGSIZE,
+                              "sendTime": self.drained - self.started if self.drained is not None else None,
+                              "echoLatency": now - self.drained if self.drained is not None else None,
+                              "duration": duration,
+                              "fragmentsPerSec": self.COUNT / duration if duration > 0 else None}
+      self.finish(Case.OK, "Ok, received echo'ed message in time.")
+
+def finish(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   self.behavior = behavior
+   self.result = result
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+
+i = 1
+for s in TESTS:
+   DESCRIPTION = """Send a binary message as %d fragments of payload size %d%s. Measure the time until the testee has read all fragments (our send buffers drained) and until the echo'ed message arrives.""" % (s[0], s[1], ", written to the TCP stream in chops of %d octets" % s[2] if s[2] else "")
+   EXPECTATION = """Receive echo'ed binary message (with payload length as sent). Timeout case after %d secs.""" % (s[3])
+   C = type("Case9_17_%d" % i,
+             (object, Case, ),
+             {"COUNT": s[0],
+              "FRAGSIZE": s[1],
+              "CHOPSIZE": s[2],
+              "WAITSECS": s[3],
+              "DESCRIPTION": """%s""" % DESCRIPTION,
+              "EXPECTATION": """%s""" % EXPECTATION,
+              "__init__": __init__,
+              "onOpen": onOpen,
+              "checkDrained": checkDrained,
+              "onMessage": onMessage,
+              "finish": finish,
+              })
+   Case9_17_X.append(C)
+   i += 1
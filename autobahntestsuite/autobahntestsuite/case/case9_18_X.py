@@ -0,0 +1,135 @@
+# coding=utf-8
+
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Case9_18_X']
+
+from case import Case
+from frames import encodeFrame
+from autobahntestsuite.util import monotonic
+
+
+##
+## Cases 9.18.x: throughput of UTF-8 validation on large text messages made
+## of multi-byte code points, unfragmented and with fragment boundaries
+## falling within code points (like 6.2.x, but large).
+##
+
+## list of (description, repeated pattern)
+##
+CHARSETS = [("2-octet code points (U+00E4)", u"ä".encode("utf8")),
+            ("3-octet code points (U+20AC)", u"€".encode("utf8")),
+            ("4-octet code points (U+1F600)", "\xf0\x9f\x98\x80"),
+            ("mixed 1/2/3/4-octet code points", "a" + u"ä€".encode("utf8") + "\xf0\x9f\x98\x80")]
+
+## list of (approx. message size, fragment size or None, case timeout)
+##
+## a fragment size not dividing any of the pattern lengths, so that
+## fragment boundaries fall within code points
+##
+SIZES = [(16 * 2**20, None,  120),
+         (16 * 2**20, 65537, 120),
+         (16 * 2**20, 1021,  240)]
+
+Case9_18_X = []
+
+
+def __init__(self, protocol):
+   Case.__init__(self, protocol)
+   self.reportTime = True
+   self.reportThroughput = True
+
+def init(self):
+   ## message and frames are prepared here, so that encoding and masking is
+   ## not part of what we measure
+   self.payload = self.PATTERN * (self.LEN // len(self.PATTERN))
+   masked = not self.p.factory.isServer
+   if self.FRAGSIZE is None:
+      self.data = encodeFrame(1, self.payload, masked = masked)
+   else:
+      frames = []
+      for i in xrange(0, len(self.payload), self.FRAGSIZE):
+         frames.append(encodeFrame(1 if i == 0 else 0,
+                                   self.payload[i:i + self.FRAGSIZE],
+                                   fin = i + self.FRAGSIZE >= len(self.payload),
+                                   masked = masked))
+      self.data = ''.join(frames)
+
+def onOpen(self):
+   self.p.enableWirelog(False)
+   self.behavior = Case.FAILED
+   self.expectedClose = {"closedByMe": True, "closeCode": [self.p.CLOSE_STATUS_CODE_NORMAL], "requireClean": True}
+   self.result = "Case did not finish within %d seconds." % self.WAITSECS
+   self.p.closeAfter(self.WAITSECS)
+
+   self.finished = False
+   self.started = monotonic()
+   self.p.sendData(self.data)
+   self.data = None
+
+def onMessage(self, msg, binary):
+   now = monotonic()
+   if binary or msg != self.payload:
+      self.finish(Case.FAILED, "Echo'ed message type or payload differs from what I sent (got binary = %s, payload length = %s)." % (binary, len(msg)))
+   else:
+      duration = now - self.started
+      codePoints = len(self.payload.decode("utf8"))
+      self.throughputStats = {"charset": self.CHARSET,
+                              "size": len(self.payload),
+                              "fragmentSize": self.FRAGSIZE,
+                              "codePoints": codePoints,
+                              "duration": duration,
+                              "octetsPerSec": len(self.payload) / duration if duration > 0 else None,
+                              "MBPerSec": len(self.payload) / duration / 2**20 if duration > 0 else None,
+                              "codePointsPerSec": codePoints / duration if duration > 0 else None}
+      self.finish(Case.OK, "Ok, received echo'ed text message in %.3f s (%.1f MB/s)." % (duration, self.throughputStats["MBPerSec"] or 0))
+
+def finish(self, behavior, result):
+   if self.finished:
+      return
+   self.finished = True
+   self.behavior = behavior
+   self.result = result
+   self.p.enableWirelog(True)
+   self.p.sendClose(self.p.CLOSE_STATUS_CODE_NORMAL)
+
+
+i = 1
+for c in CHARSETS:
+   for s in SIZES:
+      LEN = s[0] // len(c[1]) * len(c[1])
+      DESCRIPTION = """Send a text message of payload size %d consisting of %s, %s. Measure the time until the echo'ed message arrives, which is dominated by UTF-8 validation (twice) in the testee.""" % (LEN, c[0], "in fragments of %d octets (fragment boundaries falling within code points)" % s[1] if s[1] else "in one frame")
+      EXPECTATION = """Receive echo'ed text message (with payload as sent). Timeout case after %d secs.""" % (s[2])
+      C = type("Case9_18_%d" % i,
+                (object, Case, ),
+                {"CHARSET": c[0],
+                 "PATTERN": c[1],
+                 "LEN": LEN,
+                 "FRAGSIZE": s[1],
+                 "WAITSECS": s[2],
+                 "DESCRIPTION": """%s""" % DESCRIPTION,
+                 "EXPECTATION": """%s""" % EXPECTATION,
+                 "__init__": __init__,
+                 "init": init,
+                 "onOpen": onOpen,
+                 "onMessage": onMessage,
+                 "finish": finish,
+                 })
+      Case9_18_X.append(C)
+      i += 1
@@ -17,6 +17,8 @@
 ###############################################################################
 
 from case import Case
+from autobahntestsuite.util import monotonic
+from autobahntestsuite.stats import Histogram
 
 ## list of (payload length, message count, case timeout)
 tests = [(0, 1000, 60),
@@ -33,6 +35,7 @@ Case9_8_X = []
 def __init__(self, protocol):
    Case.__init__(self, protocol)
    self.reportTime = True
+   self.reportLatency = True
 
 def onOpen(self):
    self.p.enableWirelog(False)
@@ -41,9 +44,11 @@ def onOpen(self):
    self.result = "Case did not finish within %d seconds." % self.WAITSECS
    self.p.closeAfter(self.WAITSECS)
    self.count = 0
+   self.latencyStats = Histogram()
    self.sendOne()
 
 def sendOne(self):
+   self.sent = monotonic()
    if self.BINARY:
       self.p.sendFrame(opcode = 2, payload = "\xfe", payload_len = self.LEN)
    else:
@@ -51,6 +56,8 @@ def sendOne(self):
    self.count += 1
 
 def onMessage(self, msg, binary):
+   ## round-trip time of this message in microseconds
+   self.latencyStats.record(round(1000000. * (monotonic() - self.sent)))
    if binary != self.BINARY or len(msg) != self.LEN:
       self.behavior = Case.FAILED
       self.result = "Echo'ed message type or length differs from what I sent (got binary = %s, payload length = %s)." % (binary, len(msg))
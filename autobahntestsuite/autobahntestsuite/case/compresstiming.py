@@ -0,0 +1,142 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['CompressionTimer']
+
+from autobahntestsuite.util import perf_counter
+from autobahntestsuite.stats import Histogram
+
+
+class CompressionTimer:
+   """
+   Wraps the per-message compression extension processor of a protocol
+   instance (e.g. PerMessageDeflate) and measures how long the fuzzer spends
+   compressing and decompressing each message.
+
+   Install on an open connection:
+
+      timer = CompressionTimer(self.p._perMessageCompress)
+      self.p._perMessageCompress = timer
+   """
+
+   def __init__(self, pmce):
+      self.pmce = pmce
+
+      ## per message times (in us)
+      self.deflateStats = Histogram()
+      self.inflateStats = Histogram()
+
+      ## accumulated totals (in s / octets)
+      self.deflateTime = 0.
+      self.deflateOctetsIn = 0
+      self.deflateOctetsOut = 0
+      self.inflateTime = 0.
+      self.inflateOctetsIn = 0
+      self.inflateOctetsOut = 0
+
+      self._deflateMessageTime = 0.
+      self._inflateMessageTime = 0.
+
+
+   def __getattr__(self, name):
+      ## everything we don't time goes to the wrapped processor
+      return getattr(self.pmce, name)
+
+
+   def startCompressMessage(self):
+      t0 = perf_counter()
+      self.pmce.startCompressMessage()
+      self._deflateMessageTime = perf_counter() - t0
+
+
+   def compressMessageData(self, data):
+      t0 = perf_counter()
+      res = self.pmce.compressMessageData(data)
+      self._deflateMessageTime += perf_counter() - t0
+      self.deflateOctetsIn += len(data)
+      self.deflateOctetsOut += len(res)
+      return res
+
+
+   def endCompressMessage(self):
+      t0 = perf_counter()
+      res = self.pmce.endCompressMessage()
+      self._deflateMessageTime += perf_counter() - t0
+      self.deflateOctetsOut += len(res)
+      self.deflateTime += self._deflateMessageTime
+      self.deflateStats.record(round(1000000. * self._deflateMessageTime))
+      return res
+
+
+   def startDecompressMessage(self):
+      t0 = perf_counter()
+      self.pmce.startDecompressMessage()
+      self._inflateMessageTime = perf_counter() - t0
+
+
+   def decompressMessageData(self, data):
+      t0 = perf_counter()
+      res = self.pmce.decompressMessageData(data)
+      self._inflateMessageTime += perf_counter() - t0
+      self.inflateOctetsIn += len(data)
+      self.inflateOctetsOut += len(res)
+      return res
+
+
+   def endDecompressMessage(self):
+      t0 = perf_counter()
+      self.pmce.endDecompressMessage()
+      self._inflateMessageTime += perf_counter() - t0
+      self.inflateTime += self._inflateMessageTime
+      self.inflateStats.record(round(1000000. * self._inflateMessageTime))
+
+
+   def windowBits(self, isServer):
+      """
+      Window bits used by (own compressor, peer compressor), or None if the
+      extension has no notion of window bits.
+      """
+      server = getattr(self.pmce, 'server_max_window_bits', None)
+      client = getattr(self.pmce, 'client_max_window_bits', None)
+      if isServer:
+         return (server, client)
+      else:
+         return (client, server)
+
+
+   def stats(self, isServer):
+      """
+      Summary of compression cost, suitable for case results.
+      """
+      def mbps(octets, secs):
+         return octets / secs / 1048576. if secs > 0 else None
+
+      wb = self.windowBits(isServer)
+      return {"extension": self.pmce.EXTENSION_NAME,
+              "windowBits": wb[0],
+              "peerWindowBits": wb[1],
+              "deflateTime": self.deflateTime,
+              "deflateOctetsIn": self.deflateOctetsIn,
+              "deflateOctetsOut": self.deflateOctetsOut,
+              "deflateMBPerSec": mbps(self.deflateOctetsIn, self.deflateTime),
+              "deflatePerMessage": self.deflateStats.summary(),
+              "inflateTime": self.inflateTime,
+              "inflateOctetsIn": self.inflateOctetsIn,
+              "inflateOctetsOut": self.inflateOctetsOut,
+              "inflateMBPerSec": mbps(self.inflateOctetsOut, self.inflateTime),
+              "inflatePerMessage": self.inflateStats.summary()}
@@ -0,0 +1,113 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['Corpus',
+           'getCorpus',
+           ]
+
+import os, mmap, hashlib
+
+##
+## Test data (corpus) files used by the compression cases. Messages are
+## taken from a corpus file as consecutive slices, wrapping around at the
+## end of the file ("ring buffer").
+##
+## Corpus files are memory-mapped once per process and shared by all case
+## instances, and the expected SHA-1 digests of messages are computed once
+## per (corpus, message size, offset), so a case run only needs to hash the
+## messages it receives.
+##
+
+try:
+   ## Python 2: memoryview doesn't support mmap objects, but buffer does
+   _view = buffer
+except NameError:
+   def _view(obj, offset, size):
+      return memoryview(obj)[offset:offset + size]
+
+
+class Corpus:
+
+   def __init__(self, filename):
+      self.filename = filename
+      self.size = os.path.getsize(filename)
+      if self.size > 0:
+         self._file = open(filename, 'rb')
+         self.data = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ)
+      else:
+         ## can't mmap empty files
+         self._file = None
+         self.data = ''
+      self._digests = {}
+
+
+   def slices(self, offset, length):
+      """
+      Generate (offset, length) pieces of the ring buffer making up a message.
+      """
+      offset = offset % self.size
+      while length > 0:
+         n = min(length, self.size - offset)
+         yield (offset, n)
+         length -= n
+         offset = 0
+
+
+   def message(self, offset, length):
+      """
+      Get message of given length starting at given offset.
+      """
+      if length == 0 or self.size == 0:
+         return ''
+      return ''.join([self.data[o:o + n] for (o, n) in self.slices(offset, length)])
+
+
+   def digest(self, offset, length):
+      """
+      SHA-1 digest of message of given length starting at given offset (cached).
+      """
+      offset = offset % self.size if self.size > 0 else 0
+      key = (offset, length)
+      if not self._digests.has_key(key):
+         m = hashlib.sha1()
+         if length > 0 and self.size > 0:
+            for (o, n) in self.slices(offset, length):
+               m.update(_view(self.data, o, n))
+         self._digests[key] = m.digest()
+      return self._digests[key]
+
+
+   def digests(self, length, count):
+      """
+      SHA-1 digests of a sequence of consecutive messages, starting at offset 0.
+      """
+      return [self.digest(i * length, length) for i in xrange(count)]
+
+
+## process-wide corpus cache: filename => Corpus
+##
+_corpora = {}
+
+def getCorpus(filename):
+   """
+   Get (shared) corpus for file.
+   """
+   filename = os.path.abspath(filename)
+   if not _corpora.has_key(filename):
+      _corpora[filename] = Corpus(filename)
+   return _corpora[filename]
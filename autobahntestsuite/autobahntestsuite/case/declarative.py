@@ -0,0 +1,226 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['DeclarativeCase',
+           'send',
+           'wait',
+           'killAfter',
+           'closeAfter',
+           'compileCase',
+           ]
+
+##
+## Declarative cases: instead of building frames in onOpen(), a case
+## describes what to send and what to expect as data:
+##
+##    class Case1_1_2(DeclarativeCase):
+##
+##       STEPS = [send(opcode = 1, payload = "*" * 125),
+##                killAfter(1)]
+##
+##       EXPECTED = {Case.OK: [("message", "*" * 125, False)]}
+##
+##       EXPECTED_CLOSE = {"closedByMe": True,
+##                         "closeCode": [WebSocketProtocol.CLOSE_STATUS_CODE_NORMAL],
+##                         "requireClean": True}
+##
+## The steps are compiled once per case class (and masking mode) into frame
+## octets, with consecutive frames coalesced into one write (still logged per
+## frame). When frames need masking, only fresh masks are applied per run, to
+## all frames of a write in one pass.
+##
+
+import os
+
+from autobahn.websocket.protocol import FrameHeader
+
+from case import Case
+from frames import encodeHeader, xorBytes
+
+
+def send(opcode, payload = "", fin = True, rsv = 0, payload_len = None, chopsize = None, sync = False):
+   """
+   Send a frame (same parameters as WebSocketProtocol.sendFrame).
+   """
+   return ("send", opcode, payload, fin, rsv, payload_len, chopsize, sync)
+
+def wait(delay):
+   """
+   Continue with the following steps after delay secs.
+   """
+   return ("wait", delay)
+
+def killAfter(delay):
+   """
+   Fail the connection after delay secs.
+   """
+   return ("killAfter", delay)
+
+def closeAfter(delay):
+   """
+   Start the closing handshake after delay secs.
+   """
+   return ("closeAfter", delay)
+
+
+## (case class, masked) => compiled program
+##
+_programs = {}
+
+
+def compileCase(klass, masked):
+   """
+   Compile the steps of a declarative case into a program, which is a list of
+
+      ("write", frames, sync, chopsize, data)
+      ("wait", delay)
+      ("killAfter", delay)
+      ("closeAfter", delay)
+
+   where frames is a list of (FrameHeader, header octets, payload, log payload,
+   payload_len) and data the octets to write, or None when frames get masks
+   when written. Programs are cached.
+
+   :param klass: Case class with STEPS.
+   :type klass: class
+   :param masked: Iff True, frames are sent masked.
+   :type masked: bool
+   :returns: list -- Program.
+   """
+   key = (klass, masked)
+   if _programs.has_key(key):
+      return _programs[key]
+
+   program = []
+   for step in klass.STEPS:
+      if step[0] == "send":
+         opcode, payload, fin, rsv, payload_len, chopsize, sync = step[1:]
+         if payload_len is not None:
+            l = len(payload)
+            pl = payload * (payload_len // l) + payload[:payload_len % l] if l > 0 else ""
+         else:
+            pl = payload
+         frame = (FrameHeader(opcode, fin, rsv, len(pl), None),
+                  encodeHeader(opcode, len(pl), fin, rsv, masked),
+                  pl,
+                  payload,
+                  payload_len)
+         ## frames written without sync and chop coalesce into one write
+         if not sync and not chopsize and len(program) > 0 and program[-1][0] == "write" and not program[-1][2] and not program[-1][3]:
+            program[-1][1].append(frame)
+         else:
+            program.append(["write", [frame], sync, chopsize, None])
+      else:
+         program.append(step)
+
+   if not masked:
+      for op in program:
+         if op[0] == "write":
+            op[4] = ''.join([f[1] + f[2] for f in op[1]])
+
+   program = [tuple(op) for op in program]
+   _programs[key] = program
+   return program
+
+
+class DeclarativeCase(Case):
+   """
+   Base class for declarative cases (see above).
+   """
+
+   STEPS = []
+   EXPECTED = {}
+   EXPECTED_CLOSE = {}
+
+   def onOpen(self):
+      ## copies, since expected events get rewritten when the case is logged
+      self.expected = dict([(k, list(v)) for (k, v) in self.EXPECTED.items()])
+      self.expectedClose = dict(self.EXPECTED_CLOSE)
+
+      if self.p.factory.isServer:
+         masked = self.p.maskServerFrames
+      else:
+         masked = self.p.maskClientFrames
+      self.runProgram(compileCase(self.__class__, masked))
+
+   def runProgram(self, program):
+      for i in xrange(len(program)):
+         op = program[i]
+         if op[0] == "write":
+            self.write(op)
+         elif op[0] == "wait":
+            self.p.continueLater(op[1], lambda: self.runProgram(program[i + 1:]))
+            return
+         elif op[0] == "killAfter":
+            self.p.killAfter(op[1])
+         elif op[0] == "closeAfter":
+            self.p.closeAfter(op[1])
+         else:
+            raise Exception("unknown step %s" % op[0])
+
+   def write(self, op):
+      frames, sync, chopsize, data = op[1:]
+      masks = [None] * len(frames)
+
+      if data is None:
+         ## fresh masks for all frames, applied in one pass (unless the
+         ## applyMask option says to send masks, but not apply them)
+         masks = [os.urandom(4) for f in frames]
+         payload = ''.join([f[2] for f in frames])
+         if self.p.applyMask:
+            key = ''.join([(masks[j] * (len(frames[j][2]) // 4 + 1))[:len(frames[j][2])] for j in xrange(len(frames))])
+            masked = xorBytes(payload, key)
+         else:
+            masked = payload
+         parts = []
+         o = 0
+         for j in xrange(len(frames)):
+            l = len(frames[j][2])
+            parts.append(frames[j][1] + masks[j] + masked[o:o + l])
+            o += l
+         data = ''.join(parts)
+
+      ## octets of each frame within data
+      bounds = []
+      o = 0
+      for j in xrange(len(frames)):
+         l = len(frames[j][1]) + len(frames[j][2]) + (4 if masks[j] else 0)
+         bounds.append((o, o + l))
+         o += l
+
+      ## with nothing queued, all frames go out in one write, but frames and
+      ## octets are logged per frame, so wire log and traffic stats look the
+      ## same as with sendFrame()
+      coalesce = len(frames) > 1 and len(self.p.send_queue) == 0
+      if coalesce:
+         self.p.transport.write(data)
+
+      for j in xrange(len(frames)):
+         h = frames[j][0]
+         if h.opcode in [0, 1, 2]:
+            self.p.trafficStats.outgoingWebSocketFrames += 1
+         if self.p.logFrames:
+            self.p.logTxFrame(FrameHeader(h.opcode, h.fin, h.rsv, h.length, masks[j]), frames[j][3], frames[j][4], chopsize, sync)
+         octets = data[bounds[j][0]:bounds[j][1]]
+         if coalesce:
+            if self.p.state == self.p.STATE_OPEN:
+               self.p.trafficStats.outgoingOctetsWireLevel += len(octets)
+            if self.p.logOctets:
+               self.p.logTxOctets(octets, False)
+         else:
+            self.p.sendData(octets, sync, chopsize)
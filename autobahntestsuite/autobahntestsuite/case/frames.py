@@ -0,0 +1,89 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['xorBytes',
+           'maskPayload',
+           'encodeHeader',
+           'encodeFrame',
+           ]
+
+##
+## Encoding of WebSocket frames to octets, for cases which prepare what they
+## send up front (so that framing and masking in the fuzzer is not part of
+## what the case measures), and then write it using protocol.sendData().
+##
+
+import os, struct, binascii
+
+
+def xorBytes(data, key):
+   """
+   XOR data with key of same length. Done with long integers in one pass,
+   which is a lot faster than a pure Python masker for large payloads.
+   """
+   n = len(data)
+   if n == 0:
+      return data
+   x = int(binascii.hexlify(data), 16) ^ int(binascii.hexlify(key), 16)
+   return binascii.unhexlify('%0*x' % (2 * n, x))
+
+
+def maskPayload(mask, payload):
+   """
+   XOR payload with 4 octets mask.
+   """
+   n = len(payload)
+   return xorBytes(payload, (mask * (n // 4 + 1))[:n])
+
+
+def encodeHeader(opcode, length, fin = True, rsv = 0, masked = False, lengthBytes = None):
+   """
+   Encode frame header (without the mask) for a payload of given length.
+   The length is encoded with the minimal number of octets, unless given
+   in lengthBytes (0, 2 or 8 extended length octets).
+
+   :returns: str -- Octets of frame header.
+   """
+   b0 = (0x80 if fin else 0) | ((rsv & 0x07) << 4) | (opcode & 0x0F)
+   b1 = 0x80 if masked else 0
+
+   if lengthBytes is None:
+      lengthBytes = 0 if length <= 125 else 2 if length <= 0xFFFF else 8
+
+   if lengthBytes == 0:
+      return struct.pack("!BB", b0, b1 | length)
+   elif lengthBytes == 2:
+      return struct.pack("!BBH", b0, b1 | 126, length)
+   else:
+      return struct.pack("!BBQ", b0, b1 | 127, length)
+
+
+def encodeFrame(opcode, payload = "", fin = True, rsv = 0, masked = False, mask = None, lengthBytes = None):
+   """
+   Encode a frame. When masked, the payload is masked with given mask, or
+   a random one.
+
+   :returns: str -- Octets of frame.
+   """
+   header = encodeHeader(opcode, len(payload), fin, rsv, masked, lengthBytes)
+   if masked:
+      if mask is None:
+         mask = os.urandom(4)
+      return header + mask + maskPayload(mask, payload)
+   else:
+      return header + payload
@@ -0,0 +1,108 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['PeerClientProtocol',
+           'PeerClientFactory',
+           'connectPeers',
+           ]
+
+##
+## Additional WebSocket connections opened by a test case (next to the
+## connection the case is running on) to the same testee. This only works
+## when the fuzzer is a client (the testee is a server).
+##
+## The case owning the peers gets the following callbacks:
+##
+##   onPeerConnect(peer)
+##   onPeerOpen(peer)
+##   onPeerMessage(peer, payload, isBinary)
+##   onPeerPong(peer, payload)
+##   onPeerCloseFrame(peer, code)
+##   onPeerClose(peer, wasClean, code, reason)
+##   onPeerFailed(reason)
+##
+
+from twisted.internet import reactor
+
+from autobahn.twisted.websocket import connectWS, \
+                                       WebSocketClientFactory, \
+                                       WebSocketClientProtocol
+
+
+class PeerClientProtocol(WebSocketClientProtocol):
+
+   def connectionMade(self):
+      ## TCP is up, and we are about to send the opening handshake
+      if hasattr(self.factory.owner, 'onPeerConnect'):
+         self.factory.owner.onPeerConnect(self)
+      WebSocketClientProtocol.connectionMade(self)
+
+   def onOpen(self):
+      self.factory.owner.onPeerOpen(self)
+
+   def onMessage(self, payload, isBinary):
+      self.factory.owner.onPeerMessage(self, payload, isBinary)
+
+   def onPong(self, payload):
+      if hasattr(self.factory.owner, 'onPeerPong'):
+         self.factory.owner.onPeerPong(self, payload)
+
+   def onCloseFrame(self, code, reasonRaw):
+      if hasattr(self.factory.owner, 'onPeerCloseFrame'):
+         self.factory.owner.onPeerCloseFrame(self, code)
+      return WebSocketClientProtocol.onCloseFrame(self, code, reasonRaw)
+
+   def onClose(self, wasClean, code, reason):
+      self.factory.owner.onPeerClose(self, wasClean, code, reason)
+
+
+class PeerClientFactory(WebSocketClientFactory):
+
+   protocol = PeerClientProtocol
+
+   def __init__(self, owner, url, protocols = None, headers = None, options = None):
+      WebSocketClientFactory.__init__(self, url, protocols = protocols, headers = headers)
+      self.owner = owner
+      self.setProtocolOptions(failByDrop = False) # spec conformance
+      if options:
+         self.setProtocolOptions(**options)
+
+   def clientConnectionFailed(self, connector, reason):
+      self.owner.onPeerFailed(reason)
+
+   def connectPeer(self):
+      ## connect the way the fuzzer connects to the testee (e.g. through the
+      ## network emulation proxy of the current network profile)
+      server = self.owner.p.factory
+      if hasattr(server, 'connectServer'):
+         server.connectServer(self)
+      else:
+         connectWS(self)
+
+
+def connectPeers(factory, count, batchsize = 50):
+   """
+   Open a number of connections using given factory. Connections are opened
+   in batches (one batch per reactor iteration), since most testees listen
+   with a small accept backlog.
+   """
+   n = min(count, batchsize)
+   for i in xrange(n):
+      factory.connectPeer()
+   if count > n:
+      reactor.callLater(0, connectPeers, factory, count - n, batchsize)
@@ -16,10 +16,11 @@
 ##
 ###############################################################################
 
-__all__ = ("CaseSet",)
+__all__ = ("CaseSet",
+           "ManifestCaseSet",)
 
 
-import re
+import re, types
 
 
 class CaseSet:
@@ -184,3 +185,113 @@ class CaseSet:
             if not self.checkAgentCaseExclude(epats, testee, caseId):
                res[testee].append(self.CasesById[caseId])
       return res
+
+
+
+class _CaseLoader(dict):
+   """
+   Case ID => case class, importing the module defining a case on first use.
+   """
+
+   def __init__(self, caseSet):
+      dict.__init__(self)
+      self.caseSet = caseSet
+
+   def __missing__(self, caseId):
+      self.caseSet.loadModule(self.caseSet.CaseModules[caseId])
+      return dict.__getitem__(self, caseId)
+
+
+
+class ManifestCaseSet(CaseSet):
+   """
+   Case set which knows its cases from a manifest of case IDs and the modules
+   defining them, and imports those modules only when cases from them are
+   actually used. The manifest is
+
+      {"cases": [{"id": "1.1.1", "module": "case1_1_1", "description": ".."}, ..],
+       "optional": {"16": "case12_x_x"}}
+
+   where "optional" lists categories which were not there when the manifest
+   was created, since they depend on optional dependencies. Those get
+   imported when a case pattern touches them.
+   """
+
+   def __init__(self, CaseSetName, CaseBaseName, manifest, package, CaseCategories, CaseSubCategories, Cases = []):
+      self.CaseSetName = CaseSetName
+      self.CaseBaseName = CaseBaseName
+      self.CaseCategories = CaseCategories
+      self.CaseSubCategories = CaseSubCategories
+      self.package = package
+      self.optional = dict(manifest.get("optional", {}))
+
+      ## Index:
+      ## "1.2.3" => Index (1-based) of Case1_2_3 in manifest
+      ##
+      self.CasesIndices = {}
+
+      ## Index:
+      ## "1.2.3" => Module defining Case1_2_3
+      ##
+      self.CaseModules = {}
+
+      ## Index:
+      ## "1.2.3" => Case1_2_3 (loaded on first use)
+      ##
+      self.CasesById = _CaseLoader(self)
+
+      for c in manifest["cases"]:
+         self.CasesIndices[c["id"]] = len(self.CasesIndices) + 1
+         self.CaseModules[c["id"]] = c["module"]
+
+      ## cases not from modules (e.g. generated from a spec)
+      ##
+      for c in Cases:
+         self.addCase(c)
+
+
+   def __getattr__(self, name):
+      if name == "Cases":
+         ## all cases, in order: this imports all case modules
+         return [self.CasesById[c] for c in sorted(self.CasesIndices.keys(), key = self.CasesIndices.get)]
+      raise AttributeError(name)
+
+
+   def addCase(self, klass):
+      caseId = self.caseClasstoId(klass)
+      if not self.CasesIndices.has_key(caseId):
+         self.CasesIndices[caseId] = len(self.CasesIndices) + 1
+      dict.__setitem__(self.CasesById, caseId, klass)
+
+
+   def loadModule(self, module, categories = []):
+      """
+      Import a module defining cases, and index cases from there (those
+      listed for the module in the manifest, and all from categories).
+      """
+      m = __import__("%s.%s" % (self.package, module), fromlist = [module])
+      for (name, value) in vars(m).items():
+         if name.endswith("_CaseSubCategories") and type(value) == dict:
+            self.CaseSubCategories.update(value)
+            continue
+         if type(value) != list:
+            value = [value]
+         for k in value:
+            if type(k) in [types.ClassType, types.TypeType] and k.__name__.startswith(self.CaseBaseName):
+               caseId = self.caseClasstoId(k)
+               if self.CaseModules.get(caseId) == module or caseId.split('.')[0] in categories:
+                  self.CaseModules[caseId] = module
+                  self.addCase(k)
+
+
+   def resolveCasePatternList(self, patterns):
+      """
+      Return list of test cases that match against a list of case patterns,
+      importing optional categories a pattern touches first.
+      """
+      for c in patterns:
+         p = re.compile("^" + c.split('.')[0].replace('*', '.*') + "$")
+         for category in self.optional.keys():
+            if p.match(category):
+               self.loadModule(self.optional.pop(category), [category])
+      return CaseSet.resolveCasePatternList(self, patterns)
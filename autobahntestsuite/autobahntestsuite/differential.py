@@ -0,0 +1,288 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['startClient',
+           'DIFF_ASPECTS',
+           'findDivergences',
+           ]
+
+##
+## Differential fuzzing: run each case against all servers of the spec at
+## the same time (one connection per server, started in the same reactor
+## turn), and when all have finished, compare what the servers did:
+##
+##    - the events received (messages, pings, pongs)
+##    - the close code sent by the server, and who closed the connection
+##    - the case verdicts
+##    - the close timing (case duration)
+##
+## Divergences are printed as soon as a case is done, and appended to
+## "divergences.json" (one JSON object per line) in outdir, so they can be
+## followed while the run continues. At the end, the usual reports (one
+## agent per server) and a summary "differential.json" are written.
+##
+
+import os, json
+
+from twisted.internet.defer import Deferred
+
+import autobahn
+import autobahntestsuite
+
+from autobahn.twisted.websocket import WebSocketClientFactory
+
+from fuzzing import FuzzingFactory, FuzzingClientFactory
+from util import Tabify
+
+
+## (aspect, function of case result) compared between servers
+##
+DIFF_ASPECTS = [("events", lambda r: r["received"]),
+                ("closeCode", lambda r: r["remoteCloseCode"]),
+                ("closedBy", lambda r: "testsuite" if r["closedByMe"] else "server"),
+                ("clean", lambda r: r["wasClean"]),
+                ("behavior", lambda r: (r["behavior"], r["behaviorClose"]))]
+
+
+def findDivergences(results, threshold = 0.5, noise = 250):
+   """
+   Compare the results of a case between servers.
+
+   :param results: Case results by agent (None when the connection failed).
+   :type results: dict
+   :param threshold: Close timing diverges when the slowest server took more
+      than (1 + threshold) times as long as the fastest ..
+   :type threshold: float
+   :param noise: .. and more than noise ms longer.
+   :type noise: int
+   :returns: dict -- Diverging aspects, each with the value by agent.
+   """
+   diverging = {}
+   agents = sorted(results.keys())
+
+   failed = [a for a in agents if results[a] is None]
+   if len(failed) > 0:
+      diverging["connect"] = dict([(a, "failed" if results[a] is None else "ok") for a in agents])
+      agents = [a for a in agents if results[a] is not None]
+
+   if len(agents) < 2:
+      return diverging
+
+   for (aspect, get) in DIFF_ASPECTS:
+      values = dict([(a, get(results[a])) for a in agents])
+      if len(set([json.dumps(v) for v in values.values()])) > 1:
+         diverging[aspect] = values
+
+   durations = dict([(a, results[a]["duration"]) for a in agents])
+   fastest = min(durations.values())
+   slowest = max(durations.values())
+   if slowest - fastest > noise and slowest > (1. + threshold) * fastest:
+      diverging["closeTiming"] = durations
+
+   return diverging
+
+
+
+class DifferentialClientFactory(FuzzingClientFactory):
+   """
+   Runs the cases against one server of the spec, in lockstep with the
+   factories for the other servers.
+   """
+
+   def __init__(self, differential, index, debug = False):
+
+      WebSocketClientFactory.__init__(self, debug = debug, debugCodePaths = debug)
+      FuzzingFactory.__init__(self, differential.outdir)
+
+      # needed for wire log / stats
+      self.logOctets = True
+      self.logFrames = True
+
+      self.differential = differential
+      self.spec = differential.spec
+      self.CaseSet = differential.CaseSet
+      self.specCases = differential.specCases
+      self.specExcludeAgentCases = differential.specExcludeAgentCases
+      self.batch = None
+      self.connector = None
+
+      self.currServer = index - 1
+      self.nextServer()
+
+      ## servers are told apart by agent in the report
+      ##
+      if not self.agent:
+         self.agent = self.spec["servers"][index]["url"]
+
+
+   def logCase(self, caseResults):
+      self.differential.logCase(caseResults)
+
+
+   def clientConnectionLost(self, connector, reason):
+      self.connector = connector
+      self.differential.caseDone(self)
+
+
+   def clientConnectionFailed(self, connector, reason):
+      self.connector = connector
+      print "Connection to %s failed (%s)" % (self.spec["servers"][self.currServer]["url"], reason.getErrorMessage())
+      self.differential.caseDone(self)
+
+
+
+class Differential(FuzzingFactory):
+   """
+   Runs cases against all servers at once and compares the results.
+   """
+
+   def __init__(self, spec, debug = False):
+      FuzzingFactory.__init__(self, spec.get("outdir", "./reports/differential"))
+      self.spec = spec
+      self.debug = debug
+
+      timing = spec.get("close-timing", {})
+      self.threshold = float(timing.get("threshold", 0.5))
+      self.noise = int(timing.get("noise", 250))
+
+      self.CaseSet = self.createCaseSet(spec)
+      self.specCases = self.CaseSet.parseSpecCases(spec)
+      self.specExcludeAgentCases = self.CaseSet.parseExcludeAgentCases(spec)
+
+      if len(spec["servers"]) < 2:
+         raise Exception("differential mode needs at least 2 servers")
+
+      self.factories = [DifferentialClientFactory(self, i, debug) for i in xrange(len(spec["servers"]))]
+      agents = [f.agent for f in self.factories]
+      if len(set(agents)) < len(agents):
+         raise Exception("servers must have distinct agent names (%s)" % ', '.join(agents))
+
+      self.pending = set()
+      self.results = {}
+      self.divergences = []
+
+      print "Autobahn Differential WebSocket Client (Autobahn Version %s / Autobahn Testsuite Version %s)" % (autobahn.version, autobahntestsuite.version)
+      print "Ok, will run %d test cases against %d servers at once" % (len(self.specCases), len(self.factories))
+      print "Cases = %s" % str(self.specCases)
+      print "Servers = %s" % str([x["url"] for x in spec["servers"]])
+
+
+   def run(self):
+      if not os.path.exists(self.outdir):
+         os.makedirs(self.outdir)
+      self.divergenceLog = open(os.path.join(self.outdir, "divergences.json"), 'w')
+      self.d = Deferred()
+      self.nextCase()
+      return self.d
+
+
+   def nextCase(self):
+      more = [f.nextCase() for f in self.factories]
+      if not more[0]:
+         self.finish()
+         return
+
+      self.results = dict([(f.agent, None) for f in self.factories])
+      self.pending = set(self.factories)
+
+      ## start all connections in the same reactor turn
+      ##
+      for f in self.factories:
+         if f.connector is None:
+            f.connectServer()
+         else:
+            f.connector.connect()
+
+
+   def logCase(self, caseResults):
+      FuzzingFactory.logCase(self, caseResults)
+      self.results[caseResults["agent"]] = caseResults
+
+
+   def caseDone(self, factory):
+      self.pending.discard(factory)
+      if len(self.pending) > 0:
+         return
+
+      caseId = self.factories[0].currentCaseId
+
+      ## cases excluded (by agent) are not compared
+      ##
+      results = {}
+      for f in self.factories:
+         if self.results[f.agent] is not None:
+            results[f.agent] = self.results[f.agent]
+         elif not self.CaseSet.checkAgentCaseExclude(self.specExcludeAgentCases, f.agent, caseId):
+            results[f.agent] = None
+
+      diverging = findDivergences(results, self.threshold, self.noise)
+      if len(diverging) > 0:
+         self.logDivergence(caseId, diverging)
+
+      self.nextCase()
+
+
+   def logDivergence(self, caseId, diverging):
+      print "Divergence in case %s:" % caseId
+      for aspect in sorted(diverging.keys()):
+         values = diverging[aspect]
+         print "   %-12s %s" % (aspect, ' | '.join(["%s: %s" % (a, self.limitString(values[a], 60)) for a in sorted(values.keys())]))
+
+      divergence = {"case": caseId, "aspects": diverging}
+      self.divergences.append(divergence)
+      self.divergenceLog.write(json.dumps(divergence, sort_keys = True) + "\n")
+      self.divergenceLog.flush()
+
+
+   def finish(self):
+      self.divergenceLog.close()
+      self.createReports()
+
+      aspects = ["connect"] + [a[0] for a in DIFF_ASPECTS] + ["closeTiming"]
+      counts = dict([(a, 0) for a in aspects])
+      for d in self.divergences:
+         for a in d["aspects"]:
+            counts[a] += 1
+
+      summary = {"servers": [f.agent for f in self.factories],
+                 "cases": len(self.specCases),
+                 "divergentCases": len(self.divergences),
+                 "byAspect": counts,
+                 "divergences": self.divergences}
+      f = open(os.path.join(self.outdir, "differential.json"), 'w')
+      f.write(json.dumps(summary, sort_keys = True, indent = 3, separators = (',', ': ')))
+      f.close()
+
+      tab = Tabify(['l16', 'r10'])
+      print
+      print tab.tabify(['Aspect', 'Cases'])
+      print tab.tabify()
+      for a in aspects:
+         print tab.tabify([a, counts[a]])
+      print tab.tabify()
+      print tab.tabify(['any', len(self.divergences)])
+      print
+      print "%d of %d cases diverged between %d servers, details in %s" % (len(self.divergences), len(self.specCases), len(self.factories), os.path.join(self.outdir, "differential.json"))
+
+      self.d.callback(summary)
+
+
+
+def startClient(spec, debug = False):
+   differential = Differential(spec, debug)
+   return differential.run()
@@ -19,7 +19,7 @@
 __all__ = ['startClient', 'startServer', 'WS_COMPRESSION_TESTDATA']
 
 
-import os, json, binascii, time, textwrap, pkg_resources
+import os, sys, json, binascii, time, textwrap, pkg_resources
 
 from twisted.python import log, usage
 from twisted.internet import reactor, ssl
@@ -37,14 +37,19 @@ from autobahn.twisted.websocket import WebSocketServerFactory, \
                                        WebSocketClientFactory, \
                                        WebSocketClientProtocol
 
-from case import Case, \
-                 Cases, \
-                 CaseCategories, \
-                 CaseSubCategories, \
+from case import CaseCategories, \
                  CaseSetname, \
-                 CaseBasename
+                 CaseBasename, \
+                 loadManifest
+from case.case import Case, CaseBatch
 
-from caseset import CaseSet
+from case.case20_x_x import generateMatrixCases
+
+from caseset import ManifestCaseSet
+
+from netem import networkProfile, startNetworkProxy
+
+from stats import median, medianConfidenceInterval
 
 from autobahn.util import utcnow
 
@@ -160,7 +165,35 @@ class FuzzingProtocol:
                        "txFrameStats": self.txFrameStats,
                        "httpRequest": self.http_request_data if hasattr(self, 'http_request_data') else '?',
                        "httpResponse": self.http_response_data if hasattr(self, 'http_response_data') else '?',
-                       "trafficStats": self.runCase.trafficStats.__json__() if self.runCase.trafficStats else None}
+                       "trafficStats": self.runCase.trafficStats.__json__() if self.runCase.trafficStats else None,
+                       "reportLatency": self.runCase.reportLatency,
+                       "latencyStats": self.runCase.latencyStats.__json__() if self.runCase.latencyStats else None,
+                       "reportThroughput": self.runCase.reportThroughput,
+                       "throughputStats": self.runCase.throughputStats,
+                       "reportCompressionCost": self.runCase.reportCompressionCost,
+                       "compressionStats": self.runCase.compressionStats,
+                       "reportMemory": self.runCase.reportMemory,
+                       "memoryStats": self.runCase.memoryStats,
+                       "reportClose": self.runCase.reportClose,
+                       "closeStats": self.runCase.closeStats,
+                       "reportHandshake": self.runCase.reportHandshake,
+                       "handshakeStats": self.runCase.handshakeStats,
+                       "network": self.factory.network}
+
+         ## batched cases are logged one by one, with the events of each
+         ##
+         if isinstance(self.runCase, CaseBatch):
+            caseResults = []
+            for (C, res) in self.runCase.batchResults():
+               cr = caseResult.copy()
+               cr.update(res)
+               cr["id"] = self.factory.CaseSet.caseClasstoId(C)
+               cr["case"] = self.factory.CaseSet.CasesIndices[cr["id"]]
+               cr["description"] = C.DESCRIPTION
+               cr["expectation"] = C.EXPECTATION
+               caseResults.append(cr)
+         else:
+            caseResults = [caseResult]
 
          def cleanBin(e_old):
             e_new = []
@@ -176,15 +209,21 @@ class FuzzingProtocol:
                   raise Exception("unknown part type %s" % t[0])
             return e_new
 
-         for k in caseResult['expected']:
-            e_old = caseResult['expected'][k]
-            caseResult['expected'][k] = cleanBin(e_old)
+         for caseResult in caseResults:
+            for k in caseResult['expected']:
+               e_old = caseResult['expected'][k]
+               caseResult['expected'][k] = cleanBin(e_old)
 
-         caseResult['received'] = cleanBin(caseResult['received'])
+            caseResult['received'] = cleanBin(caseResult['received'])
 
-         ## now log the case results
-         ##
-         self.factory.logCase(caseResult)
+            ## now log the case results
+            ##
+            self.factory.logCase(caseResult)
+
+
+   def unregisterProducer(self):
+      ## counterpart of registerProducer() (see WebSocketAdapterProtocol)
+      self.transport.unregisterProducer()
 
 
    def enableWirelog(self, enable):
@@ -281,7 +320,25 @@ class FuzzingProtocol:
 
       self.connectionWasOpen = True
 
-      if self.runCase:
+      if isinstance(self.runCase, CaseBatch):
+
+         ## batched cases: only run those not excluded for the agent
+         cases = []
+         for C in self.runCase.cases:
+            cc_id = self.factory.CaseSet.caseClasstoId(C)
+            if self.factory.CaseSet.checkAgentCaseExclude(self.factory.specExcludeAgentCases, self.caseAgent, cc_id):
+               print "Skipping test case %s for agent %s by test configuration!" % (cc_id, self.caseAgent)
+            else:
+               cases.append(C)
+         self.runCase.cases = cases
+         if len(cases) == 0:
+            self.runCase = None
+            self.sendClose()
+         else:
+            self.caseStart = time.time()
+            self.runCase.onOpen()
+
+      elif self.runCase:
 
          cc_id = self.factory.CaseSet.caseClasstoId(self.runCase.__class__)
          if self.factory.CaseSet.checkAgentCaseExclude(self.factory.specExcludeAgentCases, self.caseAgent, cc_id):
@@ -415,6 +472,10 @@ class FuzzingFactory:
 
    MAX_CASE_PICKLE_LEN = 1000
 
+   ## name of network profile cases run with (see netem.py)
+   ##
+   network = None
+
    def __init__(self, outdir):
       self.repeatAgentRowPerSubcategory = True
       self.outdir = outdir
@@ -422,6 +483,126 @@ class FuzzingFactory:
       self.cases = {}
       self.resultListeners = {}
 
+      ## repeated measurement of performance cases (see parseRepeat)
+      ##
+      self.repeat = None
+      self.caseRuns = {}
+      self.caseRunPending = False
+
+
+   def createCaseSet(self, spec):
+      """
+      Create the set of cases to run from: the builtin cases (from the
+      manifest, imported only when run) plus cases generated from the spec.
+      This is cases 12.x.x for user supplied corpus files:
+
+         "compression-corpora": ["/data/telemetry/*.json", "/data/protobuf"]
+
+      and cases 20.x.x for matrices of message parameters:
+
+         "generate": {"sizes": [64, 65536], "fragments": [0, 1024], "binary": [true, false]}
+
+      and cases 21.x.x replaying frames found by the mutation fuzzer:
+
+         "repros": ["./reports/mutations/repro_*.json"]
+      """
+      manifest = loadManifest()
+      cases = []
+      subCategories = manifest["subCategories"]
+      if spec.has_key("compression-corpora"):
+         from case.case12_x_x import generateCorpusCases
+         corpusCases, corpusSubCategories = generateCorpusCases(spec["compression-corpora"])
+         cases = cases + corpusCases
+         subCategories.update(corpusSubCategories)
+      if spec.has_key("generate"):
+         matrixCases, matrixSubCategories = generateMatrixCases(spec["generate"])
+         cases = cases + matrixCases
+         subCategories.update(matrixSubCategories)
+      if spec.has_key("repros"):
+         from case.case21_x_x import generateReproCases
+         reproCases, reproSubCategories = generateReproCases(spec["repros"])
+         cases = cases + reproCases
+         subCategories.update(reproSubCategories)
+      return ManifestCaseSet(CaseSetname, CaseBasename, manifest, "autobahntestsuite.case", CaseCategories, subCategories, cases)
+
+
+   def parseRepeat(self, spec):
+      """
+      Parses "repeat" from the spec: number of warmup runs and measured runs
+      for performance cases (those which report time), i.e.
+
+         "repeat": {"warmup": 2, "runs": 10}
+      """
+      if spec.has_key("repeat"):
+         r = spec["repeat"]
+         repeat = {"warmup": int(r.get("warmup", 0)), "runs": int(r.get("runs", 1))}
+         if repeat["warmup"] < 0 or repeat["runs"] < 1:
+            raise Exception("invalid repeat specification %s" % r)
+         return repeat
+      else:
+         return None
+
+
+   def parseBatch(self, spec):
+      """
+      Parses "batch" from the spec: run cases which support it (valid UTF-8
+      cases 6.x) together on one connection, up to the given number of cases
+      per connection (true for no limit), i.e.
+
+         "batch": true
+      """
+      batch = spec.get("batch", False)
+      if batch is True:
+         return sys.maxint
+      elif batch is False or batch is None:
+         return None
+      elif type(batch) in [int, long] and batch > 0:
+         return batch
+      else:
+         raise Exception("invalid batch specification %s" % batch)
+
+
+   def aggregateCaseRuns(self, runs):
+      """
+      Aggregate the results of repeated runs of a performance case into one
+      case result. The details reported are from the first measured run which
+      did not pass, or the last measured run. The duration reported is the
+      median over all measured runs.
+      """
+      warmup = self.repeat["warmup"]
+      measured = runs[warmup:]
+
+      res = measured[-1]
+      for r in measured:
+         if r["behavior"] != Case.OK:
+            res = r
+            break
+      res = dict(res)
+
+      samples = []
+      for r in measured:
+         sample = {"duration": r["duration"],
+                   "behavior": r["behavior"],
+                   "started": r["started"]}
+         if r.get("latencyStats") is not None:
+            sample["latency"] = dict([(k, v) for (k, v) in r["latencyStats"].items() if k != "buckets"])
+         if r.get("throughputStats") is not None:
+            sample["throughput"] = r["throughputStats"]
+         if r.get("compressionStats") is not None:
+            sample["compression"] = r["compressionStats"]
+         samples.append(sample)
+
+      durations = [r["duration"] for r in measured]
+      res["repeat"] = {"warmup": warmup,
+                       "runs": len(measured),
+                       "warmupDurations": [r["duration"] for r in runs[:warmup]],
+                       "median": median(durations),
+                       "ci95": medianConfidenceInterval(durations),
+                       "samples": samples}
+      res["duration"] = int(round(res["repeat"]["median"]))
+      return res
+
+
    def logCase(self, caseResults):
       """
       Called from FuzzingProtocol instances when case has been finished to store case results.
@@ -430,6 +611,18 @@ class FuzzingFactory:
       agent = caseResults["agent"]
       case = caseResults["id"]
 
+      ## collect runs of performance cases when doing repeated measurements,
+      ## and only store results after the last run
+      ##
+      if self.repeat and caseResults["reportTime"] and caseResults["behavior"] != Case.UNIMPLEMENTED:
+         runs = self.caseRuns.setdefault((agent, case), [])
+         runs.append(caseResults)
+         if len(runs) < self.repeat["warmup"] + self.repeat["runs"]:
+            self.caseRunPending = True
+            return
+         caseResults = self.aggregateCaseRuns(runs)
+         del self.caseRuns[(agent, case)]
+
       ## index by agent->case
       ##
       if not self.agents.has_key(agent):
@@ -526,6 +719,26 @@ class FuzzingFactory:
             c["behaviorClose"] = case["behaviorClose"]
             c["remoteCloseCode"] = case["remoteCloseCode"]
             c["duration"] = case["duration"]
+            c["reportTime"] = case["reportTime"]
+            if case.get("repeat") is not None:
+               c["repeat"] = dict([(k, v) for (k, v) in case["repeat"].items() if k != "samples"])
+            if case.get("reportLatency") and case.get("latencyStats") is not None:
+               c["latency"] = dict([(k, v) for (k, v) in case["latencyStats"].items() if k != "buckets"])
+            if case.get("reportThroughput") and case.get("throughputStats") is not None:
+               c["throughput"] = case["throughputStats"]
+            if case.get("reportCompressionCost") and case.get("compressionStats") is not None:
+               c["compression"] = case["compressionStats"]
+            if case.get("reportMemory") and case.get("memoryStats") is not None:
+               c["memory"] = case["memoryStats"]
+            if case.get("reportClose") and case.get("closeStats") is not None:
+               c["close"] = dict(case["closeStats"])
+               for k in ["closeReply", "tcpFin"]:
+                  c["close"][k] = dict([(kk, vv) for (kk, vv) in case["closeStats"][k].items() if kk != "buckets"])
+            if case.get("reportHandshake") and case.get("handshakeStats") is not None:
+               c["handshake"] = dict(case["handshakeStats"])
+               c["handshake"]["upgradeLatency"] = dict([(k, v) for (k, v) in case["handshakeStats"]["upgradeLatency"].items() if k != "buckets"])
+            if case.get("network") is not None:
+               c["network"] = case["network"]
             c["reportfile"] = report_filename
             res[agentId][caseId] = c
 
@@ -616,9 +829,9 @@ class FuzzingFactory:
       ## create list ordered list of case Ids
       ##
       cl = []
-      for c in Cases:
-         t = self.CaseSet.caseClasstoIdTuple(c)
-         cl.append((t, self.CaseSet.caseIdTupletoId(t)))
+      for c in self.CaseSet.CasesIndices.keys():
+         t = self.CaseSet.caseIdtoIdTuple(c)
+         cl.append((t, c))
       cl = sorted(cl)
       caseList = []
       for c in cl:
@@ -630,9 +843,9 @@ class FuzzingFactory:
       for caseId in caseList:
 
          caseCategoryIndex = caseId.split('.')[0]
-         caseCategory = CaseCategories.get(caseCategoryIndex, "Misc")
+         caseCategory = self.CaseSet.CaseCategories.get(caseCategoryIndex, "Misc")
          caseSubCategoryIndex = '.'.join(caseId.split('.')[:2])
-         caseSubCategory = CaseSubCategories.get(caseSubCategoryIndex, None)
+         caseSubCategory = self.CaseSet.CaseSubCategories.get(caseSubCategoryIndex, None)
 
          ## Category/Agents row
          ##
@@ -708,12 +921,21 @@ class FuzzingFactory:
 
                   if case["reportTime"]:
                      detail += "%d ms" % case["duration"]
+                     if case.get("repeat") is not None:
+                        detail += " [%d-%d]" % tuple(case["repeat"]["ci95"])
 
                   if case["reportCompressionRatio"] and case["trafficStats"] is not None:
                      crIn = case["trafficStats"]["incomingCompressionRatio"]
                      crOut = case["trafficStats"]["outgoingCompressionRatio"]
                      detail += " [%s/%s]" % ("%.3f" % crIn if crIn is not None else "-", "%.3f" % crOut if crOut is not None else "-")
 
+                  if case.get("reportThroughput") and case.get("throughputStats") is not None and case["throughputStats"].get("messagesPerSec") is not None:
+                     detail += "<br/>%d msg/s" % case["throughputStats"]["messagesPerSec"]
+
+                  if case.get("reportMemory") and case.get("memoryStats") is not None and case["memoryStats"]["bytesPerConnection"] is not None:
+                     cr = case["memoryStats"]["compressionRatio"]
+                     detail += "<br/>%.1f kB/conn [%s]" % (case["memoryStats"]["bytesPerConnection"] / 1024., "%.3f" % cr if cr is not None else "-")
+
                   if detail != "":
                      f.write('            <td class="%s"><a href="%s">%s</a><br/><span class="case_duration">%s</span></td><td class="close close_hide %s"><span class="close_code">%s</span></td>\n' % (td_class, agent_case_report_file, td_text, detail, ctd_class, ctd_text))
                   else:
@@ -730,6 +952,26 @@ class FuzzingFactory:
       f.write("      </table>\n")
       f.write("      <br/><hr/>\n")
 
+      ## Throughput vs. latency for cases keeping multiple messages in flight
+      ##
+      self.writeThroughputCurvesHTML(f, agentList, caseList)
+
+      ## Compression cost for cases using per-message compression
+      ##
+      self.writeCompressionCostHTML(f, agentList, caseList)
+
+      ## Side-by-side comparison of compression extensions
+      ##
+      self.writeCompressionComparisonHTML(f, agentList, caseList)
+
+      ## Testee memory per connection
+      ##
+      self.writeMemoryHTML(f, agentList, caseList)
+
+      ## Opening handshake cost
+      ##
+      self.writeHandshakeHTML(f, agentList, caseList)
+
       ## Case descriptions
       ##
       f.write('      <div id="test_case_descriptions">\n')
@@ -755,6 +997,289 @@ class FuzzingFactory:
       return report_filename
 
 
+   def writeThroughputCurvesHTML(self, f, agentList, caseList):
+      """
+      Write throughput vs. latency tables (one per agent) for all
+      cases that report throughput.
+
+      :param f: File to write to.
+      :type f: file
+      :param agentList: Sorted list of agents.
+      :type agentList: list
+      :param caseList: Sorted list of case IDs.
+      :type caseList: list
+      """
+      curves = []
+      for agentId in agentList:
+         rows = []
+         for caseId in caseList:
+            case = self.agents[agentId].get(caseId, None)
+            if case and case.get("reportThroughput") and case.get("throughputStats") is not None:
+               rows.append((caseId, case))
+         if len(rows) > 0:
+            curves.append((agentId, rows))
+
+      if len(curves) == 0:
+         return
+
+      def ms(v):
+         return "%.3f" % (v / 1000.) if v is not None else "-"
+
+      f.write('      <div id="throughput_curves">\n')
+      f.write('      <h2>Throughput vs. Latency</h2>\n')
+      for agentId, rows in curves:
+         f.write('      <h3>%s</h3>\n' % agentId)
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Case</td><td>Window</td><td>Size</td><td>msg/s</td><td>MB/s</td><td>p50 (ms)</td><td>p99 (ms)</td></tr>\n')
+         for caseId, case in rows:
+            tp = case["throughputStats"]
+            lat = case.get("latencyStats") or {}
+            f.write('         <tr class="stats_row"><td><a href="%s">%s</a></td><td>%s</td><td>%s</td><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>\n' % \
+               (self.makeAgentCaseReportFilename(agentId, caseId, ext = 'html'),
+                caseId,
+                tp.get("window", "-"),
+                tp.get("size", "-"),
+                "%d" % tp["messagesPerSec"] if tp.get("messagesPerSec") is not None else "-",
+                "%.3f" % (tp["octetsPerSec"] / 1048576.) if tp.get("octetsPerSec") is not None else "-",
+                ms(lat.get("p50")),
+                ms(lat.get("p99"))))
+         f.write('      </table>\n')
+      f.write('      </div>\n')
+      f.write("      <br/><hr/>\n")
+
+
+   def writeCompressionCostHTML(self, f, agentList, caseList):
+      """
+      Write compression cost tables (one per agent) for all cases that
+      report fuzzer side compression timing, so that combinations of corpus,
+      message size, fragment size and window bits can be compared.
+
+      :param f: File to write to.
+      :type f: file
+      :param agentList: Sorted list of agents.
+      :type agentList: list
+      :param caseList: Sorted list of case IDs.
+      :type caseList: list
+      """
+      tables = []
+      for agentId in agentList:
+         rows = []
+         for caseId in caseList:
+            case = self.agents[agentId].get(caseId, None)
+            if case and case.get("reportCompressionCost") and case.get("compressionStats") is not None:
+               rows.append((caseId, case))
+         if len(rows) > 0:
+            tables.append((agentId, rows))
+
+      if len(tables) == 0:
+         return
+
+      def ms(v):
+         return "%.3f" % (v / 1000.) if v is not None else "-"
+
+      def mbps(v):
+         return "%.1f" % v if v is not None else "-"
+
+      f.write('      <div id="compression_cost">\n')
+      f.write('      <h2>Compression Cost</h2>\n')
+      f.write('      <p style="margin-left: 40px;">Time spent by the fuzzer compressing (deflate) the messages sent and decompressing (inflate) the messages received, and message roundtrip times.</p>\n')
+      for agentId, rows in tables:
+         f.write('      <h3>%s</h3>\n' % agentId)
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Case</td><td class="left">Corpus</td><td>Size</td><td>Fragment</td><td>Window Bits</td><td>Deflate (ms)</td><td>Deflate MB/s</td><td>Inflate (ms)</td><td>Inflate MB/s</td><td>Ratio</td><td>RTT p50 (ms)</td><td>RTT p99 (ms)</td></tr>\n')
+         for caseId, case in rows:
+            cs = case["compressionStats"]
+            lat = case.get("latencyStats") or {}
+            ratio = float(cs["deflateOctetsOut"]) / float(cs["deflateOctetsIn"]) if cs["deflateOctetsIn"] > 0 else None
+            f.write('         <tr class="stats_row"><td><a href="%s">%s</a></td><td class="left">%s</td><td>%s</td><td>%s</td><td>%s/%s</td><td>%.1f</td><td>%s</td><td>%.1f</td><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>\n' % \
+               (self.makeAgentCaseReportFilename(agentId, caseId, ext = 'html'),
+                caseId,
+                os.path.basename(cs["corpus"]),
+                cs["size"],
+                cs["autoFragmentSize"] or "-",
+                cs["windowBits"] or "-",
+                cs["peerWindowBits"] or "-",
+                1000. * cs["deflateTime"],
+                mbps(cs["deflateMBPerSec"]),
+                1000. * cs["inflateTime"],
+                mbps(cs["inflateMBPerSec"]),
+                "%.3f" % ratio if ratio is not None else "-",
+                ms(lat.get("p50")),
+                ms(lat.get("p99"))))
+         f.write('      </table>\n')
+      f.write('      </div>\n')
+      f.write("      <br/><hr/>\n")
+
+
+   def writeCompressionComparisonHTML(self, f, agentList, caseList):
+      """
+      Write tables (one per agent) comparing compression ratio, throughput and
+      latency of the different compression extensions side-by-side: case
+      X.j.i of each extension family sends the same payloads.
+
+      :param f: File to write to.
+      :type f: file
+      :param agentList: Sorted list of agents.
+      :type agentList: list
+      :param caseList: Sorted list of case IDs.
+      :type caseList: list
+      """
+      from case.case12_x_x import COMPRESSION_EXTENSIONS
+      extensions = [(str(e[0]), e[1]) for e in COMPRESSION_EXTENSIONS]
+      if len(extensions) < 2:
+         return
+
+      ## "j.i" => case ID of each extension family
+      ##
+      rows = {}
+      for caseId in caseList:
+         t = caseId.split('.')
+         for category, name in extensions:
+            if t[0] == category:
+               key = tuple([int(x) for x in t[1:]])
+               if not rows.has_key(key):
+                  rows[key] = {}
+               rows[key][category] = caseId
+
+      def cell(case):
+         if case is None or case.get("compressionStats") is None:
+            return '<td>-</td><td>-</td><td>-</td>'
+         cs = case["compressionStats"]
+         ratio = float(cs["deflateOctetsOut"]) / float(cs["deflateOctetsIn"]) if cs["deflateOctetsIn"] > 0 else None
+         mbps = (cs["messages"] * cs["size"] / 1048576.) / (case["duration"] / 1000.) if case["duration"] > 0 else None
+         p50 = (case.get("latencyStats") or {}).get("p50")
+         return '<td>%s</td><td>%s</td><td>%s</td>' % ("%.3f" % ratio if ratio is not None else "-",
+                                                      "%.2f" % mbps if mbps is not None else "-",
+                                                      "%.3f" % (p50 / 1000.) if p50 is not None else "-")
+
+      f.write('      <div id="compression_comparison">\n')
+      f.write('      <h2>Compression Extensions Compared</h2>\n')
+      f.write('      <p style="margin-left: 40px;">Compression ratio, echo throughput (MB/s) and median roundtrip time (ms) for the same payloads with each compression extension.</p>\n')
+      for agentId in agentList:
+         agentRows = []
+         for key in sorted(rows.keys()):
+            cases = dict([(category, self.agents[agentId].get(rows[key].get(category))) for category, name in extensions])
+            if len([c for c in cases.values() if c is not None and c.get("compressionStats") is not None]) > 0:
+               agentRows.append((key, cases))
+         if len(agentRows) == 0:
+            continue
+         f.write('      <h3>%s</h3>\n' % agentId)
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td class="left">Payload</td><td>Size</td><td>Fragment</td>%s</tr>\n' % ''.join(['<td colspan="3">%s (%s.x)</td>' % (name, category) for category, name in extensions]))
+         f.write('         <tr class="stats_header"><td></td><td></td><td></td>%s</tr>\n' % ''.join(['<td>Ratio</td><td>MB/s</td><td>RTT p50</td>' for e in extensions]))
+         for key, cases in agentRows:
+            cs = [c["compressionStats"] for c in cases.values() if c is not None and c.get("compressionStats") is not None][0]
+            f.write('         <tr class="stats_row"><td class="left">%s</td><td>%s</td><td>%s</td>%s</tr>\n' % \
+               (os.path.basename(cs["corpus"]),
+                cs["size"],
+                cs["autoFragmentSize"] or "-",
+                ''.join([cell(cases[category]) for category, name in extensions])))
+         f.write('      </table>\n')
+      f.write('      </div>\n')
+      f.write("      <br/><hr/>\n")
+
+
+   def writeMemoryHTML(self, f, agentList, caseList):
+      """
+      Write tables (one per agent) with testee memory per connection next to
+      the compression ratio for all cases that sample testee memory.
+
+      :param f: File to write to.
+      :type f: file
+      :param agentList: Sorted list of agents.
+      :type agentList: list
+      :param caseList: Sorted list of case IDs.
+      :type caseList: list
+      """
+      tables = []
+      for agentId in agentList:
+         rows = []
+         for caseId in caseList:
+            case = self.agents[agentId].get(caseId, None)
+            if case and case.get("reportMemory") and case.get("memoryStats") is not None:
+               rows.append((caseId, case))
+         if len(rows) > 0:
+            tables.append((agentId, rows))
+
+      if len(tables) == 0:
+         return
+
+      def kb(v):
+         return "%.1f" % (v / 1024.) if v is not None else "-"
+
+      f.write('      <div id="testee_memory">\n')
+      f.write('      <h2>Testee Memory per Connection</h2>\n')
+      for agentId, rows in tables:
+         f.write('      <h3>%s</h3>\n' % agentId)
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Case</td><td class="left">Offers</td><td>Connections</td><td>kB/conn (open)</td><td>kB/conn (after traffic)</td><td>Ratio</td></tr>\n')
+         for caseId, case in rows:
+            ms = case["memoryStats"]
+            f.write('         <tr class="stats_row"><td><a href="%s">%s</a></td><td class="left">%s</td><td>%s</td><td>%s</td><td>%s</td><td>%s</td></tr>\n' % \
+               (self.makeAgentCaseReportFilename(agentId, caseId, ext = 'html'),
+                caseId,
+                ms["clientOffers"],
+                ms["connections"],
+                kb(ms["bytesPerConnectionOpen"]),
+                kb(ms["bytesPerConnection"]),
+                "%.3f" % ms["compressionRatio"] if ms["compressionRatio"] is not None else "-"))
+         f.write('      </table>\n')
+      f.write('      </div>\n')
+      f.write("      <br/><hr/>\n")
+
+
+   def writeHandshakeHTML(self, f, agentList, caseList):
+      """
+      Write tables (one per agent) with opening handshake latency and rate
+      for all cases measuring handshakes, showing how the cost grows with
+      the size of the handshake request and extension negotiation.
+
+      :param f: File to write to.
+      :type f: file
+      :param agentList: Sorted list of agents.
+      :type agentList: list
+      :param caseList: Sorted list of case IDs.
+      :type caseList: list
+      """
+      tables = []
+      for agentId in agentList:
+         rows = []
+         for caseId in caseList:
+            case = self.agents[agentId].get(caseId, None)
+            if case and case.get("reportHandshake") and case.get("handshakeStats") is not None:
+               rows.append((caseId, case))
+         if len(rows) > 0:
+            tables.append((agentId, rows))
+
+      if len(tables) == 0:
+         return
+
+      def ms(v):
+         return "%.3f" % (v / 1000.) if v is not None else "-"
+
+      f.write('      <div id="handshake_cost">\n')
+      f.write('      <h2>Opening Handshake Cost</h2>\n')
+      for agentId, rows in tables:
+         f.write('      <h3>%s</h3>\n' % agentId)
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Case</td><td class="left">Variation</td><td>Request (octets)</td><td>Concurrency</td><td>Upgrade p50 (ms)</td><td>Upgrade p99 (ms)</td><td>Handshakes/s</td><td>Rejected</td></tr>\n')
+         for caseId, case in rows:
+            hs = case["handshakeStats"]
+            f.write('         <tr class="stats_row"><td><a href="%s">%s</a></td><td class="left">%s</td><td>%s</td><td>%d</td><td>%s</td><td>%s</td><td>%s</td><td>%d</td></tr>\n' % \
+               (self.makeAgentCaseReportFilename(agentId, caseId, ext = 'html'),
+                caseId,
+                hs["variation"],
+                hs["requestSize"] if hs["requestSize"] is not None else "-",
+                hs["concurrency"],
+                ms(hs["upgradeLatency"].get("p50")),
+                ms(hs["upgradeLatency"].get("p99")),
+                "%d" % hs["handshakesPerSec"] if hs["handshakesPerSec"] is not None else "-",
+                hs["rejected"]))
+         f.write('      </table>\n')
+      f.write('      </div>\n')
+      f.write("      <br/><hr/>\n")
+
+
    def createAgentCaseReportJSON(self, agentId, caseId, outdir):
       """
       Create case detail report JSON file.
@@ -786,6 +1311,33 @@ class FuzzingFactory:
       f.close()
 
 
+   def writeLatencyStatsHTML(self, f, title, stats):
+      """
+      Write table with summary of a latency histogram (see stats.Histogram).
+
+      :param f: File to write to.
+      :type f: file
+      :param title: Section title.
+      :type title: str
+      :param stats: Serialized histogram.
+      :type stats: dict
+      """
+      def ms(v):
+         if v is None:
+            return "-"
+         if stats.get("unit", "us") == "us":
+            v = v / 1000.
+         return "%.3f" % v
+
+      f.write('      <h2>%s</h2>\n' % title)
+      f.write('      <table>\n')
+      f.write('         <tr class="stats_header"><td>Statistic</td><td>Value (ms)</td></tr>\n')
+      for key in ["min", "p50", "p90", "p99", "p99.9", "max", "mean"]:
+         f.write('         <tr class="stats_row"><td>%s</td><td>%s</td></tr>\n' % (key, ms(stats.get(key))))
+      f.write('         <tr class="stats_total"><td>Samples</td><td>%d</td></tr>\n' % stats.get("count", 0))
+      f.write('      </table>\n')
+
+
    def createAgentCaseReportHTML(self, agentId, caseId, outdir):
       """
       Create case detail report HTML file.
@@ -864,11 +1416,82 @@ class FuzzingFactory:
       f.write("      <br/><hr/>\n")
 
 
+      ## Repeated Measurement
+      ##
+      if case.get("repeat") is not None:
+         rp = case["repeat"]
+         f.write('      <h2>Repeated Measurement</h2>\n')
+         f.write('      <p style="margin-left: 40px;">%d measured runs after %d warmup runs (%s ms): median <b>%s ms</b>, 95%% confidence interval of median %s - %s ms.</p>\n' % \
+            (rp["runs"], rp["warmup"], ', '.join([str(d) for d in rp["warmupDurations"]]) or '-', rp["median"], rp["ci95"][0], rp["ci95"][1]))
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Run</td><td>Duration (ms)</td><td class="left">Behavior</td><td class="left">Started</td></tr>\n')
+         i = 1
+         for sample in rp["samples"]:
+            f.write('         <tr class="stats_row"><td>%d</td><td>%d</td><td class="left">%s</td><td class="left">%s</td></tr>\n' % (i, sample["duration"], sample["behavior"], sample["started"]))
+            i += 1
+         f.write('      </table>\n')
+         f.write("      <br/><hr/>\n")
+
+      ## Throughput and Latency
+      ##
+      if case.get("reportThroughput") and case.get("throughputStats") is not None:
+         tp = case["throughputStats"]
+         f.write('      <h2>Throughput</h2>\n')
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Key</td><td class="left">Value</td></tr>\n')
+         for key in sorted(tp.keys()):
+            f.write('         <tr class="stats_row"><td>%s</td><td class="left">%s</td></tr>\n' % (key, tp[key]))
+         f.write('      </table>\n')
+         f.write("      <br/><hr/>\n")
+
+      if case.get("reportLatency") and case.get("latencyStats") is not None:
+         self.writeLatencyStatsHTML(f, "Message Roundtrip Time", case["latencyStats"])
+         f.write("      <br/><hr/>\n")
+
+      ## Compression Cost
+      ##
+      if case.get("reportCompressionCost") and case.get("compressionStats") is not None:
+         cs = case["compressionStats"]
+         f.write('      <h2>Compression Cost</h2>\n')
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Key</td><td class="left">Value</td></tr>\n')
+         for key in sorted(cs.keys()):
+            if key not in ["deflatePerMessage", "inflatePerMessage"]:
+               f.write('         <tr class="stats_row"><td>%s</td><td class="left">%s</td></tr>\n' % (key, cs[key]))
+         f.write('      </table>\n')
+         self.writeLatencyStatsHTML(f, "Deflate Time per Message", cs["deflatePerMessage"])
+         self.writeLatencyStatsHTML(f, "Inflate Time per Message", cs["inflatePerMessage"])
+         f.write("      <br/><hr/>\n")
+
+      ## Testee Memory
+      ##
+      if case.get("reportMemory") and case.get("memoryStats") is not None:
+         ms = case["memoryStats"]
+         f.write('      <h2>Testee Memory</h2>\n')
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Key</td><td class="left">Value</td></tr>\n')
+         for key in sorted(ms.keys()):
+            f.write('         <tr class="stats_row"><td>%s</td><td class="left">%s</td></tr>\n' % (key, ms[key]))
+         f.write('      </table>\n')
+         f.write("      <br/><hr/>\n")
+
+
       ## Opening Handshake
       ##
       f.write('      <h2>Opening Handshake</h2>\n')
       f.write('      <pre class="http_dump">%s</pre>\n' % case["httpRequest"].strip())
       f.write('      <pre class="http_dump">%s</pre>\n' % case["httpResponse"].strip())
+
+      ## opening handshake latency and rate over many connections (cases 0.x.x)
+      if case.get("reportHandshake") and case.get("handshakeStats") is not None:
+         hs = case["handshakeStats"]
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Key</td><td class="left">Value</td></tr>\n')
+         for key in sorted(hs.keys()):
+            if key != "upgradeLatency":
+               f.write('         <tr class="stats_row"><td>%s</td><td class="left">%s</td></tr>\n' % (key, hs[key]))
+         f.write('      </table>\n')
+         self.writeLatencyStatsHTML(f, "Upgrade Latency", hs["upgradeLatency"])
       f.write("      <br/><hr/>\n")
 
 
@@ -894,6 +1517,18 @@ class FuzzingFactory:
       for c in cbv:
          f.write(('         <tr class="stats_row"><td>%s</td><td class="left">%s</td><td class="left">%s</td></tr>\n' % (c[0], case[c[0]], c[1])).encode("utf-8"))
       f.write('      </table>')
+
+      ## closing handshake latency over many connections (cases 7.14.x)
+      if case.get("reportClose") and case.get("closeStats") is not None:
+         cs = case["closeStats"]
+         f.write('      <table>\n')
+         f.write('         <tr class="stats_header"><td>Key</td><td class="left">Value</td></tr>\n')
+         for key in sorted(cs.keys()):
+            if key not in ["closeReply", "tcpFin"]:
+               f.write('         <tr class="stats_row"><td>%s</td><td class="left">%s</td></tr>\n' % (key, cs[key]))
+         f.write('      </table>\n')
+         self.writeLatencyStatsHTML(f, "Close Frame to Close Reply", cs["closeReply"])
+         self.writeLatencyStatsHTML(f, "Close Frame to TCP FIN", cs["tcpFin"])
       f.write("      <br/><hr/>\n")
 
 
@@ -1159,10 +1794,13 @@ class FuzzingServerFactory(FuzzingFactory, WebSocketServerFactory):
 
       self.spec = spec
 
-      self.CaseSet = CaseSet(CaseSetname, CaseBasename, Cases, CaseCategories, CaseSubCategories)
+      self.CaseSet = self.createCaseSet(spec)
 
       self.specCases = self.CaseSet.parseSpecCases(self.spec)
       self.specExcludeAgentCases = self.CaseSet.parseExcludeAgentCases(self.spec)
+      if self.spec.has_key("repeat"):
+         ## the testee client drives which cases are run (and how often)
+         print "Warning: repeated measurement is only supported by the fuzzing client - ignoring 'repeat'"
       print "Autobahn WebSockets %s/%s Fuzzing Server (Port %d%s)" % (autobahntestsuite.version, autobahn.version, self.port, ' TLS' if self.isSecure else '')
       print "Ok, will run %d test cases for any clients connecting" % len(self.specCases)
       print "Cases = %s" % str(self.specCases)
@@ -1180,7 +1818,12 @@ class FuzzingClientProtocol(FuzzingProtocol, WebSocketClientProtocol):
    def onConnect(self, response):
       if not self.caseAgent:
          self.caseAgent = response.headers.get('server', 'UnknownServer')
-      print "Running test case ID %s for agent %s from peer %s" % (self.factory.CaseSet.caseClasstoId(self.Case), self.caseAgent, self.peer)
+      if isinstance(self.runCase, CaseBatch):
+         print "Running test cases ID %s to %s (%d cases, batched) for agent %s from peer %s" % (self.factory.CaseSet.caseClasstoId(self.runCase.cases[0]), self.factory.CaseSet.caseClasstoId(self.runCase.cases[-1]), len(self.runCase.cases), self.caseAgent, self.peer)
+      elif self.factory.repeat and self.factory.caseRun > 0:
+         print "Running test case ID %s for agent %s from peer %s (repetition %d)" % (self.factory.CaseSet.caseClasstoId(self.Case), self.caseAgent, self.peer, self.factory.caseRun)
+      else:
+         print "Running test case ID %s for agent %s from peer %s" % (self.factory.CaseSet.caseClasstoId(self.Case), self.caseAgent, self.peer)
 
 
    def connectionLost(self, reason):
@@ -1193,6 +1836,10 @@ class FuzzingClientFactory(FuzzingFactory, WebSocketClientFactory):
 
    protocol = FuzzingClientProtocol
 
+   ## listening port of network emulation proxy for current server
+   ##
+   networkProxy = None
+
    def __init__(self, spec, debug = False):
 
       WebSocketClientFactory.__init__(self, debug = debug, debugCodePaths = debug)
@@ -1202,37 +1849,109 @@ class FuzzingClientFactory(FuzzingFactory, WebSocketClientFactory):
       self.logOctets = True
       self.logFrames = True
 
-      self.spec = spec
+      self.spec = self.expandNetworkProfiles(spec)
 
-      self.CaseSet = CaseSet(CaseSetname, CaseBasename, Cases, CaseCategories, CaseSubCategories)
+      self.CaseSet = self.createCaseSet(spec)
 
       self.specCases = self.CaseSet.parseSpecCases(self.spec)
       self.specExcludeAgentCases = self.CaseSet.parseExcludeAgentCases(self.spec)
+      self.repeat = self.parseRepeat(self.spec)
+      self.batch = self.parseBatch(self.spec)
       print "Autobahn Fuzzing WebSocket Client (Autobahn Version %s / Autobahn Testsuite Version %s)" % (autobahntestsuite.version, autobahn.version)
-      print "Ok, will run %d test cases against %d servers" % (len(self.specCases), len(spec["servers"]))
+      print "Ok, will run %d test cases against %d servers" % (len(self.specCases), len(self.spec["servers"]))
+      if self.repeat:
+         print "Performance cases will be run %d times after %d warmup runs" % (self.repeat["runs"], self.repeat["warmup"])
+      if self.batch == sys.maxint:
+         print "Cases which support it will be run batched on one connection"
+      elif self.batch:
+         print "Cases which support it will be run in batches of up to %d cases per connection" % self.batch
       print "Cases = %s" % str(self.specCases)
       print "Servers = %s" % str([x["url"] for x in spec["servers"]])
+      if spec.has_key("network-profiles"):
+         print "Network profiles = %s" % str([networkProfile(x)[0] for x in spec["network-profiles"]])
 
       self.currServer = -1
       if self.nextServer():
          if self.nextCase():
-            connectWS(self)
+            self.connectServer()
+
+
+   def expandNetworkProfiles(self, spec):
+      """
+      Parses "network-profiles" from the spec: every server is run once per
+      network profile (through a network emulation proxy, see netem.py), as
+      an agent of its own, so results show up side by side, e.g.
+
+         "network-profiles": ["loopback", "wan", "3g"]
+
+      A single server can also be given a profile with "network".
+      """
+      if not spec.has_key("network-profiles"):
+         return spec
+      servers = []
+      for server in spec["servers"]:
+         for profile in spec["network-profiles"]:
+            name, p = networkProfile(profile)
+            s = dict(server)
+            s["agent"] = "%s [%s]" % (server.get("agent") or server["url"], name)
+            s["network"] = profile
+            servers.append(s)
+      return dict(spec, servers = servers)
+
+
+   def startNetwork(self, profile):
+      """
+      Start a network emulation proxy to the current server, unless the
+      profile is None or empty.
+      """
+      if self.networkProxy is not None:
+         self.networkProxy.stopListening()
+         self.networkProxy = None
+      self.network = None
+      if profile is not None:
+         self.network, p = networkProfile(profile)
+         if len(p) > 0:
+            self.networkProxy = startNetworkProxy(self.host, self.port, p)
+
+
+   def connectServer(self, factory = None):
+      """
+      Connect to the current server, through the network emulation proxy if any.
+
+      :param factory: Client factory to connect (default: this one), e.g. for
+         additional connections opened by a case (see case/peers.py).
+      :type factory: obj
+      """
+      if factory is None:
+         factory = self
+      if self.networkProxy is not None:
+         port = self.networkProxy.getHost().port
+         if factory.isSecure:
+            reactor.connectSSL("127.0.0.1", port, factory, ssl.ClientContextFactory())
+         else:
+            reactor.connectTCP("127.0.0.1", port, factory)
+      else:
+         connectWS(factory)
 
 
    def buildProtocol(self, addr):
-      proto = FuzzingClientProtocol()
+      proto = self.protocol()
       proto.factory = self
 
       proto.caseAgent = self.agent
       proto.case = self.currentCaseIndex
-      proto.Case = Cases[self.currentCaseIndex - 1]
-      proto.runCase = proto.Case(proto)
+      proto.Case = self.CaseSet.CasesById[self.currentCaseId]
+      if self.currentBatch:
+         proto.runCase = proto.Case.BATCH(proto, self.currentBatch)
+      else:
+         proto.runCase = proto.Case(proto)
 
       return proto
 
 
    def nextServer(self):
       self.currSpecCase = -1
+      self.batched = set()
       self.currServer += 1
       if self.currServer < len(self.spec["servers"]):
          ## run tests for next server
@@ -1243,6 +1962,10 @@ class FuzzingClientFactory(FuzzingFactory, WebSocketClientFactory):
          ##
          self.agent = server.get("agent")
 
+         ## testee process (PID or /proc path) for cases sampling testee memory
+         ##
+         self.testeeMemory = server.get("memory", None)
+
          ## WebSocket session parameters
          ##
          self.setSessionParameters(url = server["url"],
@@ -1256,28 +1979,58 @@ class FuzzingClientFactory(FuzzingFactory, WebSocketClientFactory):
          self.setProtocolOptions(failByDrop = False) # spec conformance
          self.setProtocolOptions(**self.spec.get("options", {})) # set spec global options
          self.setProtocolOptions(**server.get("options", {})) # set server specific options
+
+         ## network emulation
+         ##
+         self.startNetwork(server.get("network", None))
          return True
       else:
          return False
 
 
    def nextCase(self):
+      self.caseRun = 0
+      self.caseRunPending = False
       self.currSpecCase += 1
+      while self.currSpecCase < len(self.specCases) and self.specCases[self.currSpecCase] in self.batched:
+         ## already run within a batch
+         self.currSpecCase += 1
       if self.currSpecCase < len(self.specCases):
          self.currentCaseId = self.specCases[self.currSpecCase]
          self.currentCaseIndex = self.CaseSet.CasesIndices[self.currentCaseId]
+
+         ## collect the remaining cases which can run together with this one
+         ##
+         self.currentBatch = None
+         C = self.CaseSet.CasesById[self.currentCaseId]
+         if self.batch and C.BATCH:
+            batch = [C]
+            for caseId in self.specCases[self.currSpecCase + 1:]:
+               if len(batch) >= self.batch:
+                  break
+               N = self.CaseSet.CasesById[caseId]
+               if N.BATCH is C.BATCH and caseId not in self.batched:
+                  batch.append(N)
+                  self.batched.add(caseId)
+            if len(batch) > 1:
+               self.currentBatch = batch
          return True
       else:
          return False
 
 
    def clientConnectionLost(self, connector, reason):
-      if self.nextCase():
+      if self.caseRunPending:
+         ## repeated measurement: run same case again on a fresh connection
+         self.caseRunPending = False
+         self.caseRun += 1
+         connector.connect()
+      elif self.nextCase():
          connector.connect()
       else:
          if self.nextServer():
             if self.nextCase():
-               connectWS(self)
+               self.connectServer()
          else:
             self.createReports()
             reactor.stop()
@@ -1287,7 +2040,7 @@ class FuzzingClientFactory(FuzzingFactory, WebSocketClientFactory):
       print "Connection to %s failed (%s)" % (self.spec["servers"][self.currServer]["url"], reason.getErrorMessage())
       if self.nextServer():
          if self.nextCase():
-            connectWS(self)
+            self.connectServer()
       else:
          self.createReports()
          reactor.stop()
@@ -1295,7 +2048,7 @@ class FuzzingClientFactory(FuzzingFactory, WebSocketClientFactory):
 
 def startClient(spec, debug = False):
    factory = FuzzingClientFactory(spec, debug)
-   # no connectWS done here, since this is done within
+   # no connect done here, since this is done within
    # FuzzingClientFactory automatically to orchestrate tests
    return True
 
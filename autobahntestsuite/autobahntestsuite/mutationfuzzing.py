@@ -0,0 +1,546 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['startClient',
+           'MUTATIONS',
+           'seedsFromCases',
+           'mutate',
+           'minimize',
+           ]
+
+##
+## Mutation fuzzing: take the frame sequences of (declarative) cases as
+## seeds, mutate opcodes, reserved bits, FIN, length encodings, masking,
+## fragmentation, UTF-8 and frame order, and send each mutated sequence on
+## a connection of its own, many connections in parallel. After the frames,
+## a Ping is sent as probe. Per session, the testee either
+##
+##   - answers the probe ("pong")
+##   - fails or closes the connection ("closed")
+##   - does neither within the timeout ("hang")
+##
+## and when new connections get refused ("refused"), are dropped before the
+## opening handshake is done ("rejected") or the handshake times out
+## ("timeout") repeatedly, the testee crashed or got stuck.
+##
+## Hangs are minimized by replaying the sequence with frames dropped and
+## payloads shortened as long as it still hangs. Hangs, and for crashes and
+## timeouts the sessions run just before, are saved as repro files which
+## the fuzzingclient mode replays as cases 21.x.x.
+##
+
+import os, json, time, random
+from collections import deque
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, succeed, inlineCallbacks, returnValue
+
+from autobahn.twisted.websocket import connectWS, \
+                                       WebSocketClientFactory, \
+                                       WebSocketClientProtocol
+
+from case import CaseSetname, CaseBasename, CaseCategories, loadManifest
+from case.declarative import DeclarativeCase, compileCase
+from case.case21_x_x import frame, encodeFrames, saveRepro
+from caseset import ManifestCaseSet
+from util import Tabify
+
+
+## text with 2, 3 and 4 octet UTF-8 code points, as seed for UTF-8 mutations
+##
+UTF8_SEED = ("utf8", [frame(1, "\xce\xba\xe1\xbd\xb9\xcf\x83\xce\xbc\xce\xb5 \xe2\x82\xac \xf0\xa4\xad\xa2")])
+
+## octets making UTF-8 invalid: overlong, surrogate, beyond U+10FFFF,
+## invalid octet, truncated and lone continuation
+##
+INVALID_UTF8 = ["\xc0\xaf", "\xed\xa0\x80", "\xf4\x90\x80\x80", "\xff", "\xe2\x82", "\x80"]
+
+## consecutive sessions which could not connect until the testee is
+## considered down
+##
+UNRESPONSIVE = 3
+
+
+def mutateOpcode(rnd, frames):
+   f = rnd.choice(frames)
+   f["opcode"] = rnd.randint(0, 15)
+   return True
+
+def mutateRsv(rnd, frames):
+   f = rnd.choice(frames)
+   f["rsv"] = rnd.randint(1, 7)
+   return True
+
+def mutateFin(rnd, frames):
+   f = rnd.choice(frames)
+   f["fin"] = not f["fin"]
+   return True
+
+def mutateLength(rnd, frames):
+   ## non-minimal length encodings
+   candidates = [f for f in frames if len(f["payload"]) <= 0xFFFF]
+   if len(candidates) == 0:
+      return False
+   f = rnd.choice(candidates)
+   f["lengthBytes"] = rnd.choice([2, 8]) if len(f["payload"]) <= 125 else 8
+   return True
+
+def mutateMask(rnd, frames):
+   f = rnd.choice(frames)
+   f["masked"] = False
+   return True
+
+def mutateFragment(rnd, frames):
+   ## split a message into fragments at random octets (and so within code points)
+   candidates = [i for i in xrange(len(frames)) if frames[i]["opcode"] in [1, 2] and frames[i]["fin"] and len(frames[i]["payload"]) > 1]
+   if len(candidates) == 0:
+      return False
+   i = rnd.choice(candidates)
+   f = frames[i]
+   l = len(f["payload"])
+   n = rnd.randint(2, min(8, l))
+   cuts = [0] + sorted(rnd.sample(xrange(1, l), n - 1)) + [l]
+   fragments = []
+   for k in xrange(n):
+      fragments.append(dict(f, opcode = f["opcode"] if k == 0 else 0, fin = k == n - 1, payload = f["payload"][cuts[k]:cuts[k + 1]]))
+   frames[i:i + 1] = fragments
+   return True
+
+def mutateUtf8(rnd, frames):
+   candidates = [f for f in frames if f["opcode"] in [0, 1]]
+   if len(candidates) == 0:
+      return False
+   f = rnd.choice(candidates)
+   k = rnd.randint(0, len(f["payload"]))
+   f["payload"] = f["payload"][:k] + rnd.choice(INVALID_UTF8) + f["payload"][k:]
+   return True
+
+def mutateControl(rnd, frames):
+   ## interleave a control frame, with a payload which may be too long
+   opcode = rnd.choice([8, 9, 10])
+   payload = "*" * rnd.choice([0, 1, 125, 126])
+   if opcode == 8 and len(payload) > 0:
+      payload = "\x03\xe8" + payload[2:]
+   frames.insert(rnd.randint(0, len(frames)), frame(opcode, payload))
+   return True
+
+def mutatePayload(rnd, frames):
+   candidates = [f for f in frames if len(f["payload"]) > 0]
+   if len(candidates) == 0:
+      return False
+   f = rnd.choice(candidates)
+   k = rnd.randint(0, len(f["payload"]) - 1)
+   f["payload"] = f["payload"][:k] + chr(rnd.randint(0, 255)) + f["payload"][k + 1:]
+   return True
+
+def mutateOrder(rnd, frames):
+   ## duplicate, drop or swap frames
+   i = rnd.randint(0, len(frames) - 1)
+   j = rnd.randint(0, len(frames) - 1)
+   what = rnd.choice(["duplicate", "drop", "swap"])
+   if what == "duplicate":
+      frames.insert(j, dict(frames[i]))
+   elif what == "drop" and len(frames) > 1:
+      del frames[i]
+   else:
+      frames[i], frames[j] = frames[j], frames[i]
+   return True
+
+
+## list of (name, mutation)
+##
+MUTATIONS = [("opcode", mutateOpcode),
+             ("rsv", mutateRsv),
+             ("fin", mutateFin),
+             ("length", mutateLength),
+             ("mask", mutateMask),
+             ("fragment", mutateFragment),
+             ("utf8", mutateUtf8),
+             ("control", mutateControl),
+             ("payload", mutatePayload),
+             ("order", mutateOrder)]
+
+
+def mutate(rnd, frames, count):
+   """
+   Mutate a copy of a frame sequence.
+
+   :param rnd: Random generator.
+   :type rnd: random.Random
+   :param frames: Frame sequence (see case21_x_x.frame).
+   :type frames: list
+   :param count: Number of mutations to apply.
+   :type count: int
+   :returns: tuple -- (mutated frames, list of names of mutations applied)
+   """
+   frames = [dict(f) for f in frames]
+   applied = []
+   tries = 0
+   while len(applied) < count and tries < 4 * count:
+      tries += 1
+      name, mutation = rnd.choice(MUTATIONS)
+      if len(frames) > 0 and mutation(rnd, frames):
+         applied.append(name)
+   return frames, applied
+
+
+def seedsFromCases(patterns):
+   """
+   Get seed frame sequences from the declarative cases matching case
+   patterns, plus a text message with multi-octet UTF-8.
+
+   :returns: list -- (seed case ID, frames) pairs.
+   """
+   manifest = loadManifest()
+   caseSet = ManifestCaseSet(CaseSetname, CaseBasename, manifest, "autobahntestsuite.case", CaseCategories, manifest["subCategories"])
+   seeds = []
+   for caseId in caseSet.parseSpecCases({"cases": patterns}):
+      C = caseSet.CasesById[caseId]
+      if issubclass(C, DeclarativeCase):
+         frames = []
+         for op in compileCase(C, True):
+            if op[0] == "write":
+               for f in op[1]:
+                  frames.append(frame(f[0].opcode, f[2], f[0].fin, f[0].rsv))
+         if len(frames) > 0:
+            seeds.append((caseId, frames))
+   seeds.append(UTF8_SEED)
+   return seeds
+
+
+@inlineCallbacks
+def minimize(frames, reproduces, maxTries = 50):
+   """
+   Reduce a frame sequence: drop frames one by one, then halve payloads,
+   keeping every reduction which still reproduces.
+
+   :param frames: Frame sequence.
+   :type frames: list
+   :param reproduces: Called with a candidate frame sequence, returns a
+      Deferred firing True when the candidate still reproduces.
+   :type reproduces: callable
+   :param maxTries: Maximum number of candidates to try.
+   :type maxTries: int
+   :returns: Deferred -- Fires with the reduced frame sequence.
+   """
+   tries = 0
+   i = 0
+   while i < len(frames) and len(frames) > 1 and tries < maxTries:
+      candidate = frames[:i] + frames[i + 1:]
+      tries += 1
+      res = yield reproduces(candidate)
+      if res:
+         frames = candidate
+      else:
+         i += 1
+   for i in xrange(len(frames)):
+      while len(frames[i]["payload"]) > 0 and tries < maxTries:
+         f = dict(frames[i], payload = frames[i]["payload"][:len(frames[i]["payload"]) // 2])
+         candidate = frames[:i] + [f] + frames[i + 1:]
+         tries += 1
+         res = yield reproduces(candidate)
+         if res:
+            frames = candidate
+         else:
+            break
+   returnValue(frames)
+
+
+
+class MutationClientProtocol(WebSocketClientProtocol):
+
+   def onOpen(self):
+      self.factory.session.onOpen(self)
+
+   def onPong(self, payload):
+      self.factory.session.onPong(self, payload)
+
+   def onClose(self, wasClean, code, reason):
+      self.factory.session.onClose(self, wasClean, code, reason)
+
+
+class MutationClientFactory(WebSocketClientFactory):
+
+   protocol = MutationClientProtocol
+
+   def __init__(self, session, url, timeout, options):
+      WebSocketClientFactory.__init__(self, url)
+      self.session = session
+      self.setProtocolOptions(failByDrop = False, openHandshakeTimeout = timeout)
+      self.setProtocolOptions(**options)
+
+   def clientConnectionFailed(self, connector, reason):
+      self.session.finish("refused")
+
+
+
+class MutationSession:
+   """
+   Sends a frame sequence and a probe Ping on a new connection.
+   """
+
+   def __init__(self, fuzzer, seed, frames, mutations):
+      self.fuzzer = fuzzer
+      self.seed = seed
+      self.frames = frames
+      self.mutations = mutations
+      self.outcome = None
+      self.closeCode = None
+      self.proto = None
+      self.timer = None
+
+   def start(self):
+      self.d = Deferred()
+      connectWS(MutationClientFactory(self, self.fuzzer.url, self.fuzzer.timeout, self.fuzzer.options))
+      return self.d
+
+   def onOpen(self, proto):
+      self.proto = proto
+      self.probe = os.urandom(8)
+      proto.sendData(encodeFrames(self.frames))
+      proto.sendPing(self.probe)
+      self.timer = reactor.callLater(self.fuzzer.timeout, self.onTimeout)
+
+   def onPong(self, proto, payload):
+      if payload == self.probe:
+         self.finish("pong")
+         proto.dropConnection(abort = True)
+
+   def onTimeout(self):
+      self.timer = None
+      self.finish("hang")
+      self.proto.dropConnection(abort = True)
+
+   def onClose(self, proto, wasClean, code, reason):
+      if self.proto is None:
+         self.finish("timeout" if proto.wasOpenHandshakeTimeout else "rejected")
+      else:
+         self.closeCode = code
+         self.finish("closed")
+
+   def finish(self, outcome):
+      if self.outcome is None:
+         self.outcome = outcome
+         if self.timer:
+            self.timer.cancel()
+            self.timer = None
+         self.d.callback(self)
+
+
+
+class MutationFuzzer:
+
+   def __init__(self, spec, debug = False):
+      self.debug = debug
+      self.url = spec["url"]
+      self.outdir = spec.get("outdir", "./reports/mutations")
+      self.sessions = int(spec.get("sessions", 10000))
+      self.concurrency = int(spec.get("concurrency", 50))
+      self.maxMutations = int(spec.get("mutations", 3))
+      self.timeout = float(spec.get("timeout", 5))
+      self.maxFindings = int(spec.get("max-findings", 20))
+      self.options = spec.get("options", {})
+      self.random = random.Random(spec.get("random-seed", None))
+      self.seeds = seedsFromCases(spec.get("seeds", ["1.*", "3.*", "4.*"]))
+
+      self.launched = 0
+      self.inflight = set()
+      self.recent = deque(maxlen = self.concurrency)
+      self.unresponsive = 0
+      self.stopping = False
+      self.down = None
+      self.minimizing = 0
+
+      self.outcomes = {}
+      self.closeCodes = {}
+      self.mutationOutcomes = dict([(m[0], {}) for m in MUTATIONS])
+      self.findings = []
+      self.hangs = {}
+
+
+   def run(self):
+      print "Mutation fuzzing %s: %d sessions, %d at a time, up to %d mutations per session, %d seeds" % (self.url, self.sessions, self.concurrency, self.maxMutations, len(self.seeds))
+      self.d = Deferred()
+      self.started = time.time()
+      self.fill()
+      reactor.callLater(1, self.printProgress)
+      return self.d
+
+
+   def fill(self):
+      while not self.stopping and self.launched < self.sessions and len(self.inflight) < self.concurrency:
+         seed, frames = self.random.choice(self.seeds)
+         frames, mutations = mutate(self.random, frames, self.random.randint(1, self.maxMutations))
+         session = MutationSession(self, seed, frames, mutations)
+         self.launched += 1
+         self.inflight.add(session)
+         session.start().addCallback(self.onSessionDone)
+
+
+   def onSessionDone(self, session):
+      self.inflight.discard(session)
+
+      self.outcomes[session.outcome] = self.outcomes.get(session.outcome, 0) + 1
+      if session.outcome == "closed":
+         self.closeCodes[str(session.closeCode)] = self.closeCodes.get(str(session.closeCode), 0) + 1
+      for m in set(session.mutations):
+         self.mutationOutcomes[m][session.outcome] = self.mutationOutcomes[m].get(session.outcome, 0) + 1
+
+      if session.outcome in ["refused", "rejected", "timeout"]:
+         self.unresponsive += 1
+         if self.unresponsive >= UNRESPONSIVE and not self.stopping:
+            self.onDown("crash" if session.outcome == "refused" else "timeout")
+      else:
+         self.unresponsive = 0
+         self.recent.append(session)
+         if session.outcome == "hang":
+            self.onHang(session)
+
+      self.fill()
+      self.checkDone()
+
+
+   def onHang(self, session):
+      ## minimize each combination of seed and mutations only once
+      key = (session.seed, tuple(sorted(set(session.mutations))))
+      if self.hangs.has_key(key):
+         self.hangs[key]["occurrences"] += 1
+         return
+      if len(self.findings) >= self.maxFindings:
+         return
+      finding = {"kind": "hang",
+                 "seed": session.seed,
+                 "mutations": session.mutations,
+                 "occurrences": 1,
+                 "frames": session.frames,
+                 "timeout": int(self.timeout)}
+      self.hangs[key] = finding
+      self.findings.append(finding)
+
+      def reproduces(frames):
+         if self.down:
+            return succeed(False)
+         d = MutationSession(self, session.seed, frames, []).start()
+         d.addCallback(lambda s: s.outcome == "hang")
+         return d
+
+      def minimized(frames):
+         finding["frames"] = frames
+         finding["minimized"] = True
+
+      def done(_):
+         self.minimizing -= 1
+         self.checkDone()
+
+      self.minimizing += 1
+      d = minimize(session.frames, reproduces)
+      d.addCallback(minimized)
+      d.addBoth(done)
+
+
+   def onDown(self, kind):
+      ## the testee crashed or got stuck: the culprit is among the sessions
+      ## run just before, which are all saved (unminimized)
+      print
+      print "Testee is down (%s) after %d sessions" % (kind, self.launched)
+      self.stopping = True
+      self.down = kind
+      seen = set()
+      for s in self.recent:
+         data = encodeFrames([dict(f, masked = False) for f in s.frames])
+         if data not in seen and len(self.findings) < self.maxFindings + self.concurrency:
+            seen.add(data)
+            self.findings.append({"kind": kind,
+                                  "seed": s.seed,
+                                  "mutations": s.mutations,
+                                  "outcome": s.outcome,
+                                  "occurrences": 1,
+                                  "frames": s.frames,
+                                  "timeout": int(self.timeout)})
+
+
+   def printProgress(self):
+      if self.d is None:
+         return
+      duration = time.time() - self.started
+      done = sum(self.outcomes.values())
+      print "%d sessions (%.0f/s): %s, %d findings" % (done, done / duration if duration > 0 else 0, ', '.join(["%s %d" % x for x in sorted(self.outcomes.items())]), len(self.findings))
+      reactor.callLater(1, self.printProgress)
+
+
+   def checkDone(self):
+      if len(self.inflight) > 0 or self.minimizing > 0 or (self.launched < self.sessions and not self.stopping):
+         return
+      if self.d is None:
+         return
+
+      duration = time.time() - self.started
+      done = sum(self.outcomes.values())
+
+      if not os.path.exists(self.outdir):
+         os.makedirs(self.outdir)
+
+      findings = []
+      for i in xrange(len(self.findings)):
+         finding = self.findings[i]
+         fn = os.path.join(self.outdir, "repro_%d.json" % (i + 1))
+         saveRepro(fn, dict(finding, url = self.url))
+         findings.append({"file": fn,
+                          "kind": finding["kind"],
+                          "seed": finding["seed"],
+                          "mutations": finding["mutations"],
+                          "frames": len(finding["frames"]),
+                          "occurrences": finding["occurrences"]})
+
+      summary = {"url": self.url,
+                 "sessions": done,
+                 "duration": duration,
+                 "sessionsPerSec": done / duration if duration > 0 else None,
+                 "down": self.down,
+                 "outcomes": self.outcomes,
+                 "closeCodes": self.closeCodes,
+                 "mutations": self.mutationOutcomes,
+                 "findings": findings}
+      f = open(os.path.join(self.outdir, "mutationfuzzing.json"), 'w')
+      f.write(json.dumps(summary, sort_keys = True, indent = 3, separators = (',', ': ')))
+      f.close()
+
+      outcomes = ["pong", "closed", "hang", "refused", "rejected", "timeout"]
+      tab = Tabify(['l12'] + ['r9'] * len(outcomes))
+      print
+      print tab.tabify(['Mutation'] + outcomes)
+      print tab.tabify()
+      for m in MUTATIONS:
+         print tab.tabify([m[0]] + [self.mutationOutcomes[m[0]].get(o, 0) for o in outcomes])
+      print tab.tabify()
+      print tab.tabify(['all'] + [self.outcomes.get(o, 0) for o in outcomes])
+      print
+      print "%d sessions in %.1f s (%.0f/s), close codes %s" % (done, duration, summary["sessionsPerSec"] or 0, self.closeCodes)
+      for r in findings:
+         print "%s: %s from seed %s with mutations %s, %d frames (%d occurrences)" % (r["file"], r["kind"], r["seed"], ', '.join(r["mutations"]), r["frames"], r["occurrences"])
+      if len(findings) > 0:
+         print 'Replay with "repros": ["%s"] in a fuzzingclient spec' % os.path.join(self.outdir, "repro_*.json")
+
+      d, self.d = self.d, None
+      d.callback(summary)
+
+
+
+def startClient(spec, debug = False):
+   fuzzer = MutationFuzzer(spec, debug)
+   return fuzzer.run()
@@ -0,0 +1,245 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['NETWORK_PROFILES',
+           'networkProfile',
+           'NetworkLink',
+           'startNetworkProxy',
+           'startProxy',
+           ]
+
+##
+## Network emulation: a TCP proxy which delays, throttles and segments what
+## goes through it (in both directions), to see how testees perform over
+## networks other than loopback - without any outside service (like Linux
+## netem) needed.
+##
+## A network profile has (all optional)
+##
+##    "latency":   one-way delay [ms]
+##    "jitter":    delay varies uniformly by up to +/- jitter [ms]
+##    "bandwidth": link speed [kbit/s], per direction
+##    "segment":   maximum octets per TCP segment (each written on its own)
+##
+## The order of octets is preserved (as TCP does), so jitter never reorders.
+##
+## The fuzzing client uses the proxy for servers with a "network" profile,
+## and runs every server once per profile given in "network-profiles"
+## (see FuzzingClientFactory.expandNetworkProfiles). Mode "netem" runs the
+## proxy standalone.
+##
+
+import random
+from collections import deque
+
+from twisted.internet import reactor
+from twisted.protocols import portforward
+
+from autobahn.websocket.protocol import parseWsUrl
+
+
+## named network profiles
+##
+NETWORK_PROFILES = {"loopback": {},
+                    "lan": {"latency": 0.25, "jitter": 0.05, "bandwidth": 1000000},
+                    "wan": {"latency": 20, "jitter": 2, "bandwidth": 50000},
+                    "dsl": {"latency": 15, "jitter": 3, "bandwidth": 8000, "segment": 1452},
+                    "3g": {"latency": 100, "jitter": 20, "bandwidth": 2000, "segment": 1400},
+                    "satellite": {"latency": 300, "jitter": 10, "bandwidth": 5000}}
+
+PROFILE_KEYS = ["name", "latency", "jitter", "bandwidth", "segment"]
+
+
+def networkProfile(profile):
+   """
+   Resolve a network profile given by name, or as dict (with optional "name").
+
+   :returns: tuple -- (name, profile dict)
+   """
+   if isinstance(profile, dict):
+      for k in profile:
+         if k not in PROFILE_KEYS:
+            raise Exception("unknown network profile parameter %s" % k)
+      p = dict(profile)
+      return p.pop("name", "custom"), p
+   elif NETWORK_PROFILES.has_key(profile):
+      return profile, NETWORK_PROFILES[profile]
+   else:
+      raise Exception("unknown network profile %s (known: %s)" % (profile, ', '.join(sorted(NETWORK_PROFILES.keys()))))
+
+
+
+class NetworkLink:
+   """
+   One direction of an emulated network link: octets sent are written to
+   the destination transport delayed, throttled and segmented.
+   """
+
+   def __init__(self, profile, rnd = None, clock = None):
+      self.latency = profile.get("latency", 0) / 1000.
+      self.jitter = profile.get("jitter", 0) / 1000.
+      bandwidth = profile.get("bandwidth", None)
+      self.octetsPerSec = bandwidth * 125. if bandwidth else None
+      self.segment = profile.get("segment", None)
+      self.random = rnd or random
+      self.clock = clock or reactor
+
+      self.transport = None
+      self.queue = deque()
+      self.call = None
+      self.free = 0
+      self.last = 0
+
+   def send(self, data):
+      now = self.clock.seconds()
+      if self.segment:
+         segments = [data[i:i + self.segment] for i in xrange(0, len(data), self.segment)]
+      else:
+         segments = [data]
+      for s in segments:
+         ## the link is busy while sending (at the given bandwidth)
+         if self.octetsPerSec:
+            self.free = max(now, self.free) + len(s) / self.octetsPerSec
+            departed = self.free
+         else:
+            departed = now
+         at = departed + self.latency
+         if self.jitter:
+            at += self.random.uniform(-self.jitter, self.jitter)
+         ## no overtaking
+         at = max(at, departed, self.last)
+         self.last = at
+         self.queue.append((at, s))
+      self.schedule()
+
+   def close(self):
+      self.queue.append((max(self.last, self.clock.seconds()), None))
+      self.schedule()
+
+   def schedule(self):
+      if self.call is None and len(self.queue) > 0:
+         self.call = self.clock.callLater(max(0, self.queue[0][0] - self.clock.seconds()), self.deliver)
+
+   def deliver(self):
+      self.call = None
+      now = self.clock.seconds()
+      while len(self.queue) > 0 and self.queue[0][0] <= now:
+         at, s = self.queue.popleft()
+         if self.transport is None:
+            self.queue.clear()
+            return
+         if s is None:
+            self.transport.loseConnection()
+            self.queue.clear()
+            return
+         self.transport.write(s)
+         if self.segment:
+            ## one segment per reactor iteration, so segments do not coalesce
+            ## into one write
+            break
+      self.schedule()
+
+
+
+class NetworkProxyClient(portforward.ProxyClient):
+   """
+   Connection to the testee.
+   """
+
+   def connectionMade(self):
+      self.transport.setTcpNoDelay(True)
+      factory = self.peer.factory
+      self.link = NetworkLink(factory.profile, factory.random)
+      self.link.transport = self.peer.transport
+      self.peer.link.transport = self.transport
+      portforward.ProxyClient.connectionMade(self)
+
+   def dataReceived(self, data):
+      self.link.send(data)
+
+   def connectionLost(self, reason):
+      ## close the other side after what is still on the way
+      if self.peer is not None:
+         self.link.close()
+         self.peer = None
+
+
+class NetworkProxyClientFactory(portforward.ProxyClientFactory):
+
+   protocol = NetworkProxyClient
+   noisy = False
+
+
+class NetworkProxyServer(portforward.ProxyServer):
+   """
+   Connection from the client (e.g. the fuzzer).
+   """
+
+   clientProtocolFactory = NetworkProxyClientFactory
+
+   def connectionMade(self):
+      self.transport.setTcpNoDelay(True)
+      self.link = NetworkLink(self.factory.profile, self.factory.random)
+      portforward.ProxyServer.connectionMade(self)
+
+   def dataReceived(self, data):
+      self.link.send(data)
+
+   def connectionLost(self, reason):
+      if self.peer is not None:
+         self.link.close()
+         self.peer = None
+
+
+class NetworkProxyFactory(portforward.ProxyFactory):
+
+   protocol = NetworkProxyServer
+   noisy = False
+
+   def __init__(self, host, port, profile, seed = None):
+      portforward.ProxyFactory.__init__(self, host, port)
+      self.profile = profile
+      self.random = random.Random(seed)
+
+
+
+def startNetworkProxy(host, port, profile, listen = 0, interface = "127.0.0.1"):
+   """
+   Start a network emulation proxy to host:port.
+
+   :param profile: Network profile (dict).
+   :type profile: dict
+   :param listen: Port to listen on (0 for any free port).
+   :type listen: int
+   :returns: obj -- Listening port (see IListeningPort).
+   """
+   return reactor.listenTCP(listen, NetworkProxyFactory(host, port, profile), interface = interface)
+
+
+def startProxy(spec, debug = False):
+   """
+   Start a network emulation proxy listening on spec["listen"] (port, on
+   spec["interface"]) and forwarding to spec["url"] with spec["profile"].
+   """
+   (isSecure, host, port, resource, path, params) = parseWsUrl(spec["url"])
+   name, profile = networkProfile(spec.get("profile", "wan"))
+   listen = int(spec.get("listen", 9100))
+   interface = spec.get("interface", "")
+   startNetworkProxy(host, port, profile, listen, interface)
+   print "Emulating network %s %s to %s: connect to %s:%d instead" % (name, profile, spec["url"], interface or "*", listen)
+   return True
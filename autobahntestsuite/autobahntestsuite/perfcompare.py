@@ -0,0 +1,179 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['start', 'loadReport', 'compareReports']
+
+
+import os, re, json
+
+from util import Tabify
+
+
+def loadReport(reportdir):
+   """
+   Load timings of performance cases (those with reportTime set) from
+   a fuzzing report directory.
+
+   :param reportdir: Directory with fuzzing reports (containing "index.json").
+   :type reportdir: str
+   :returns: dict -- agent => case ID => case summary
+   """
+   index = json.loads(open(os.path.join(reportdir, "index.json")).read())
+   res = {}
+   for agent in index:
+      res[agent] = {}
+      for caseId in index[agent]:
+         c = index[agent][caseId]
+         if not c.has_key("reportTime"):
+            ## reports created before "reportTime" was included in
+            ## the index: get it from the case detail report
+            fn = os.path.join(reportdir, c["reportfile"])
+            c["reportTime"] = json.loads(open(fn).read()).get("reportTime", False)
+         if c["reportTime"]:
+            res[agent][caseId] = c
+   return res
+
+
+def _casePatterns(patterns):
+   return [re.compile("^" + p.replace('.', '\.').replace('*', '.*') + "$") for p in patterns]
+
+
+def _matches(patterns, caseId):
+   for p in patterns:
+      if p.match(caseId):
+         return True
+   return False
+
+
+def _caseIdTuple(caseId):
+   return tuple([int(x) for x in caseId.split('.')])
+
+
+def compareReports(baseline, candidate, threshold = 0.1, noise = 5, cases = ["*"], excludeCases = []):
+   """
+   Compare timings of performance cases between a baseline and a candidate report.
+
+   A case regresses when its candidate duration exceeds the baseline by more
+   than the noise floor (in ms) *and* by more than the relative threshold. When
+   both reports were run with repeated measurement, the confidence intervals
+   of the medians must not overlap either.
+
+   :param baseline: Baseline report as returned from loadReport.
+   :type baseline: dict
+   :param candidate: Candidate report as returned from loadReport.
+   :type candidate: dict
+   :param threshold: Relative threshold, i.e. 0.1 for 10%.
+   :type threshold: float
+   :param noise: Noise floor in ms: smaller absolute differences are ignored.
+   :type noise: int
+   :returns: list -- Compared cases, sorted by relative change (largest first).
+   """
+   incl = _casePatterns(cases)
+   excl = _casePatterns(excludeCases)
+
+   res = []
+   for agent in sorted(candidate.keys()):
+      if not baseline.has_key(agent):
+         continue
+      for caseId in sorted(candidate[agent].keys(), key = _caseIdTuple):
+         if not baseline[agent].has_key(caseId):
+            continue
+         if not _matches(incl, caseId) or _matches(excl, caseId):
+            continue
+
+         b = baseline[agent][caseId]
+         c = candidate[agent][caseId]
+
+         r = {"agent": agent,
+              "case": caseId,
+              "baseline": b["duration"],
+              "candidate": c["duration"],
+              "delta": c["duration"] - b["duration"],
+              "change": float(c["duration"] - b["duration"]) / b["duration"] if b["duration"] > 0 else None,
+              "regression": False}
+
+         if b["behavior"] != "OK" or c["behavior"] != "OK":
+            ## can't compare timings of failing runs, but a case which
+            ## passed before and now fails is always a regression
+            r["status"] = "%s/%s" % (b["behavior"], c["behavior"])
+            r["regression"] = b["behavior"] == "OK"
+         else:
+            overlap = False
+            if b.get("repeat") and c.get("repeat"):
+               overlap = c["repeat"]["ci95"][0] <= b["repeat"]["ci95"][1]
+            if r["delta"] > noise and (r["change"] is None or r["change"] > threshold) and not overlap:
+               r["status"] = "REGRESSION"
+               r["regression"] = True
+            elif r["delta"] < -noise and (r["change"] is not None and r["change"] < -threshold):
+               r["status"] = "IMPROVED"
+            else:
+               r["status"] = "OK"
+         res.append(r)
+
+   def rank(r):
+      return (not r["regression"], -(r["change"] if r["change"] is not None else 0))
+
+   return sorted(res, key = rank)
+
+
+def start(spec, debug = False):
+   """
+   Compare a candidate against a baseline report as specified and print a
+   ranked table.
+
+   :returns: int -- Number of regressions found.
+   """
+   threshold = float(spec.get("threshold", 0.1))
+   noise = int(spec.get("noise", 5))
+
+   baseline = loadReport(spec["baseline"])
+   candidate = loadReport(spec["candidate"])
+
+   res = compareReports(baseline,
+                        candidate,
+                        threshold,
+                        noise,
+                        spec.get("cases", ["*"]),
+                        spec.get("exclude-cases", []))
+
+   regressions = [r for r in res if r["regression"]]
+
+   print "Comparing %s (candidate) against %s (baseline): threshold %.1f%%, noise floor %d ms" % (spec["candidate"], spec["baseline"], 100. * threshold, noise)
+
+   tab = Tabify(['l24', 'r10', 'r12', 'r12', 'r9', 'l*'])
+   print
+   print tab.tabify(['Agent', 'Case', 'Baseline ms', 'Cand. ms', 'Change', 'Status'])
+   print tab.tabify()
+   for r in res:
+      if r["status"] != "OK" or debug:
+         print tab.tabify([r['agent'],
+                           r['case'],
+                           r['baseline'],
+                           r['candidate'],
+                           "%+.1f%%" % (100. * r['change']) if r['change'] is not None else '-',
+                           r['status']])
+   print
+
+   print "%d cases compared, %d regressions" % (len(res), len(regressions))
+
+   if spec.get("outfile", None):
+      f = open(spec["outfile"], 'w')
+      f.write(json.dumps(res, sort_keys = True, indent = 3, separators = (',', ': ')))
+      f.close()
+
+   return len(regressions)
@@ -0,0 +1,526 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['startRecord',
+           'startReplay',
+           'RecordingWriter',
+           'readRecording',
+           'TX',
+           'RX',
+           'TX_CLOSE',
+           'RX_CLOSE',
+           ]
+
+##
+## Record and replay of raw WebSocket sessions.
+##
+## Mode "record" is a transparent TCP proxy: clients connect to the proxy
+## instead of the testee, and everything going through is saved, one file
+## per connection. Mode "replay" sends the client side of recordings to a
+## testee again (many times, possibly concurrently), either with the
+## original timing or as fast as possible, and compares what the testee
+## sends back with what it sent when recorded.
+##
+## Recordings are binary files: a header
+##
+##    "ABREC", version (B), start time (!d, Unix time), URL length (!H), URL
+##
+## followed by chunks
+##
+##    kind (B), time since previous chunk (!I, microsecs), length (!I), data
+##
+## where kind is TX (client to testee), RX (testee to client), or TX_CLOSE /
+## RX_CLOSE (client / testee closed the connection, no data).
+##
+## Replays are compared from the end of the testee's HTTP response headers,
+## since those have per-connection values (like Date). Headers which differ
+## are reported separately.
+##
+
+import os, glob, json, time, struct
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+from twisted.internet.protocol import Protocol, ClientFactory
+from twisted.protocols import portforward
+
+from autobahn.websocket.protocol import parseWsUrl
+
+from stats import median
+from util import Tabify
+
+
+MAGIC = "ABREC"
+VERSION = 1
+
+## chunk kinds
+##
+TX = 0
+RX = 1
+TX_CLOSE = 2
+RX_CLOSE = 3
+
+HEADER = struct.Struct("!BdH")
+CHUNK = struct.Struct("!BII")
+
+
+class RecordingWriter:
+   """
+   Writes a recording chunk by chunk.
+   """
+
+   def __init__(self, filename, url):
+      url = url.encode('utf8')
+      self.f = open(filename, 'wb')
+      self.last = time.time()
+      self.f.write(MAGIC + HEADER.pack(VERSION, self.last, len(url)) + url)
+
+   def write(self, kind, data = ""):
+      if self.f is None:
+         return
+      now = time.time()
+      delta = min(int(round(1000000. * (now - self.last))), 0xFFFFFFFF)
+      self.last = now
+      self.f.write(CHUNK.pack(kind, delta, len(data)))
+      self.f.write(data)
+
+   def close(self):
+      if self.f is not None:
+         self.f.close()
+         self.f = None
+
+
+def readRecording(filename):
+   """
+   Read a recording.
+
+   :returns: tuple -- (header, chunks), where header is a dict with "started"
+      and "url", and chunks a list of (kind, secs since start, data).
+   """
+   f = open(filename, 'rb')
+   data = f.read()
+   f.close()
+
+   if data[:len(MAGIC)] != MAGIC:
+      raise Exception("%s is not a recording" % filename)
+   o = len(MAGIC)
+   version, started, l = HEADER.unpack_from(data, o)
+   if version != VERSION:
+      raise Exception("%s: unsupported recording version %d" % (filename, version))
+   o += HEADER.size
+   url = data[o:o + l]
+   o += l
+
+   chunks = []
+   t = 0
+   while o < len(data):
+      kind, delta, l = CHUNK.unpack_from(data, o)
+      o += CHUNK.size
+      t += delta / 1000000.
+      chunks.append((kind, t, data[o:o + l]))
+      o += l
+   return {"started": started, "url": url}, chunks
+
+
+def _target(url):
+   (isSecure, host, port, resource, path, params) = parseWsUrl(url)
+   if isSecure:
+      raise Exception("recording and replay work on plain TCP, not %s" % url)
+   return host, port
+
+
+
+class RecordingProxyClient(portforward.ProxyClient):
+
+   def dataReceived(self, data):
+      self.peer.recording.write(RX, data)
+      portforward.ProxyClient.dataReceived(self, data)
+
+   def connectionLost(self, reason):
+      if self.peer is not None:
+         self.peer.recording.write(RX_CLOSE)
+      portforward.ProxyClient.connectionLost(self, reason)
+
+
+class RecordingProxyClientFactory(portforward.ProxyClientFactory):
+
+   protocol = RecordingProxyClient
+
+
+class RecordingProxyServer(portforward.ProxyServer):
+
+   clientProtocolFactory = RecordingProxyClientFactory
+
+   def connectionMade(self):
+      self.factory.count += 1
+      fn = os.path.join(self.factory.outdir, "session_%d.abr" % self.factory.count)
+      self.recording = RecordingWriter(fn, self.factory.url)
+      print "Recording connection from %s to %s" % (self.transport.getPeer().host, fn)
+      portforward.ProxyServer.connectionMade(self)
+
+   def dataReceived(self, data):
+      self.recording.write(TX, data)
+      portforward.ProxyServer.dataReceived(self, data)
+
+   def connectionLost(self, reason):
+      if self.peer is not None:
+         self.recording.write(TX_CLOSE)
+      portforward.ProxyServer.connectionLost(self, reason)
+      self.recording.close()
+
+
+class RecordingProxyFactory(portforward.ProxyFactory):
+
+   protocol = RecordingProxyServer
+   noisy = False
+
+   def __init__(self, url, outdir):
+      host, port = _target(url)
+      portforward.ProxyFactory.__init__(self, host, port)
+      self.url = url
+      self.outdir = outdir
+      self.count = 0
+
+
+
+class ReplayProtocol(Protocol):
+   """
+   Sends the client side of a recording and collects what the testee sends.
+   """
+
+   def connectionMade(self):
+      self.chunks = self.factory.chunks
+      self.rxBefore = self.factory.rxBefore
+      self.received = []
+      self.rxBytes = 0
+      self.rxSkipped = 0
+      ## octets received after the HTTP response headers (all, when the
+      ## recording has none)
+      self.headerDone = False
+      self.headerSkipped = False
+      self.wsBytes = 0
+      self.txBytes = 0
+      self.stalls = 0
+      self.next = 0
+      self.timer = None
+      self.closing = False
+      self.started = time.time()
+      self.proceed()
+
+   def wait(self, delay, fun):
+      self.timer = reactor.callLater(delay, fun)
+
+   def progress(self):
+      ## what the testee sent so far, comparable with rxBefore
+      return (self.headerDone or self.headerSkipped, self.wsBytes + self.rxSkipped)
+
+   def proceed(self):
+      """
+      Send chunks as long as allowed: in fast mode as soon as the testee sent
+      as much as it had when the chunk was recorded, otherwise when due.
+      """
+      if self.timer and self.timer.active():
+         self.timer.cancel()
+      self.timer = None
+
+      while self.next < len(self.chunks):
+         kind, t, data = self.chunks[self.next]
+         if kind in [RX, RX_CLOSE]:
+            self.next += 1
+            continue
+         if self.factory.fast:
+            if self.progress() < self.rxBefore[self.next]:
+               self.wait(self.factory.stall, self.onStall)
+               return
+         else:
+            due = self.started + t - time.time()
+            if due > 0:
+               self.wait(due, self.proceed)
+               return
+         self.next += 1
+         if kind == TX:
+            self.transport.write(data)
+            self.txBytes += len(data)
+         elif self.factory.testeeCloses:
+            ## the testee closed first when recorded: give it time to do so
+            self.closing = True
+            self.wait(self.factory.stall, self.transport.loseConnection)
+            return
+         else:
+            self.transport.loseConnection()
+            return
+
+      ## all sent: wait for the rest of what the testee sent when recorded
+      if self.progress() >= self.rxBefore[-1]:
+         self.transport.loseConnection()
+      else:
+         self.wait(self.factory.stall, self.onStall)
+
+   def onStall(self):
+      ## the testee did not send as much as recorded: a divergence, but go on
+      self.timer = None
+      self.stalls += 1
+      if self.next < len(self.chunks):
+         headerDone, wsBytes = self.rxBefore[self.next]
+         self.headerSkipped = self.headerSkipped or headerDone
+         self.rxSkipped = max(self.rxSkipped, wsBytes - self.wsBytes)
+         self.proceed()
+      else:
+         self.transport.loseConnection()
+
+   def dataReceived(self, data):
+      self.received.append(data)
+      self.rxBytes += len(data)
+      if self.headerDone or self.factory.expectedHead is None:
+         self.wsBytes += len(data)
+      else:
+         head, body = _splitHandshake(''.join(self.received))
+         if head is not None:
+            self.headerDone = True
+            self.wsBytes = len(body)
+      if self.timer and not self.closing and (self.factory.fast or self.next >= len(self.chunks)):
+         self.proceed()
+
+   def connectionLost(self, reason):
+      if self.timer and self.timer.active():
+         self.timer.cancel()
+      received = ''.join(self.received)
+      if self.factory.expectedHead is None:
+         head, body = None, received
+      else:
+         head, body = _splitHandshake(received)
+      if head is None and self.factory.expectedHead is not None:
+         ## no complete HTTP response: compare nothing after it
+         divergence, headers = 0, ["status"]
+      else:
+         divergence = _divergence(self.factory.expectedBody, body)
+         headers = _headerDiff(self.factory.expectedHead, head)
+      self.factory.runDone({"duration": time.time() - self.started,
+                            "txBytes": self.txBytes,
+                            "rxBytes": len(received),
+                            "stalls": self.stalls,
+                            "divergence": divergence,
+                            "headers": headers})
+
+
+def _splitHandshake(data):
+   """
+   Split octets received from the testee into the HTTP response headers
+   (up to and including the empty line) and what follows.
+
+   :returns: tuple -- (headers or None when incomplete, rest)
+   """
+   i = data.find("\r\n\r\n")
+   if i < 0:
+      return None, data
+   return data[:i + 4], data[i + 4:]
+
+
+def _headerDiff(expected, received):
+   """
+   Names (lowercase) of HTTP response headers which differ between the
+   recording and a replay, "status" for the status line.
+   """
+   def parse(head):
+      lines = (head or "").split("\r\n")
+      headers = {"status": lines[0]}
+      for line in lines[1:]:
+         if ':' in line:
+            name, value = line.split(':', 1)
+            name = name.strip().lower()
+            headers[name] = headers.get(name, ()) + (value.strip(),)
+      return headers
+   e = parse(expected)
+   r = parse(received)
+   return sorted([k for k in set(e.keys() + r.keys()) if e.get(k) != r.get(k)])
+
+
+def _divergence(expected, received):
+   """
+   Offset of the first octet received (after the HTTP response headers)
+   which differs from the recording, or None.
+   """
+   if expected == received:
+      return None
+   n = min(len(expected), len(received))
+   for i in xrange(n):
+      if expected[i] != received[i]:
+         return i
+   return n
+
+
+class ReplayFactory(ClientFactory):
+
+   protocol = ReplayProtocol
+
+   def __init__(self, replay, filename, fast, stall):
+      self.replay = replay
+      self.filename = filename
+      self.fast = fast
+      self.stall = stall
+      self.header, self.chunks = readRecording(filename)
+      expected = ''.join([c[2] for c in self.chunks if c[0] == RX])
+      self.expectedHead, self.expectedBody = _splitHandshake(expected)
+      self.recordedDuration = self.chunks[-1][1] if len(self.chunks) > 0 else 0
+      closes = [c[0] for c in self.chunks if c[0] in [TX_CLOSE, RX_CLOSE]]
+      self.testeeCloses = len(closes) > 0 and closes[0] == RX_CLOSE
+
+      ## what was received from the testee before each chunk when recorded:
+      ## (HTTP response headers complete, octets received after them)
+      ##
+      self.rxBefore = []
+      h = len(self.expectedHead) if self.expectedHead is not None else None
+      n = 0
+      for c in self.chunks + [(RX, None, "")]:
+         if h is None:
+            self.rxBefore.append((False, n))
+         else:
+            self.rxBefore.append((n >= h, max(0, n - h)))
+         if c[0] == RX:
+            n += len(c[2])
+
+   def runDone(self, res):
+      self.replay.runDone(self, res)
+
+   def clientConnectionFailed(self, connector, reason):
+      self.replay.runDone(self, {"failed": reason.getErrorMessage()})
+
+
+
+class Replay:
+
+   def __init__(self, spec, debug = False):
+      self.debug = debug
+      self.url = spec["url"]
+      self.host, self.port = _target(self.url)
+      self.runs = int(spec.get("runs", 1))
+      self.concurrency = int(spec.get("concurrency", 1))
+      self.fast = spec.get("timing", "fast") == "fast"
+      self.stall = float(spec.get("stall", 1))
+      self.outfile = spec.get("outfile", None)
+
+      recordings = spec.get("recordings", ["./recordings/*.abr"])
+      if type(recordings) != list:
+         recordings = [recordings]
+      files = []
+      for pattern in recordings:
+         files.extend(sorted(glob.glob(os.path.expanduser(pattern))))
+      if len(files) == 0:
+         raise Exception("no recordings match %s" % recordings)
+
+      self.factories = [ReplayFactory(self, fn, self.fast, self.stall) for fn in files]
+      self.results = dict([(f, []) for f in self.factories])
+      self.queue = [f for f in self.factories for i in xrange(self.runs)]
+      self.inflight = 0
+
+
+   def run(self):
+      print "Replaying %d recordings %d times each against %s, %s, %d at a time" % (len(self.factories), self.runs, self.url, "as fast as possible" if self.fast else "with original timing", self.concurrency)
+      self.d = Deferred()
+      self.started = time.time()
+      self.fill()
+      return self.d
+
+
+   def fill(self):
+      while len(self.queue) > 0 and self.inflight < self.concurrency:
+         f = self.queue.pop(0)
+         self.inflight += 1
+         reactor.connectTCP(self.host, self.port, f)
+
+
+   def runDone(self, factory, res):
+      self.inflight -= 1
+      self.results[factory].append(res)
+      if res.get("divergence") is not None and len([r for r in self.results[factory] if r.get("divergence") is not None]) == 1:
+         print "%s diverged at octet %d received after the handshake" % (factory.filename, res["divergence"])
+      if res.get("headers") and len([r for r in self.results[factory] if r.get("headers")]) == 1:
+         print "%s handshake headers differ: %s" % (factory.filename, ', '.join(res["headers"]))
+      self.fill()
+      if self.inflight == 0 and len(self.queue) == 0:
+         self.finish()
+
+
+   def finish(self):
+      duration = time.time() - self.started
+
+      res = []
+      for f in self.factories:
+         runs = [r for r in self.results[f] if not r.has_key("failed")]
+         durations = [r["duration"] for r in runs]
+         octets = sum([r["txBytes"] + r["rxBytes"] for r in runs])
+         divergences = [r["divergence"] for r in runs if r["divergence"] is not None]
+         headers = set()
+         for r in runs:
+            headers.update(r["headers"])
+         res.append({"recording": f.filename,
+                     "runs": len(runs),
+                     "failed": len(self.results[f]) - len(runs),
+                     "diverged": len(divergences),
+                     "firstDivergence": min(divergences) if len(divergences) > 0 else None,
+                     "headersDiffering": sorted(headers),
+                     "stalls": sum([r["stalls"] for r in runs]),
+                     "recordedDuration": f.recordedDuration,
+                     "medianDuration": median(durations) if len(durations) > 0 else None,
+                     "octetsPerSec": octets / sum(durations) if sum(durations) > 0 else None})
+
+      tab = Tabify(['l32', 'r6', 'r8', 'r12', 'r12', 'r9', 'r10'])
+      print
+      print tab.tabify(['Recording', 'Runs', 'Diverged', 'Recorded ms', 'Median ms', 'Speedup', 'MB/s'])
+      print tab.tabify()
+      for r in res:
+         print tab.tabify([os.path.basename(r["recording"]),
+                           r["runs"],
+                           r["diverged"],
+                           "%.1f" % (1000. * r["recordedDuration"]),
+                           "%.1f" % (1000. * r["medianDuration"]) if r["medianDuration"] is not None else '-',
+                           "%.1fx" % (r["recordedDuration"] / r["medianDuration"]) if r["medianDuration"] else '-',
+                           "%.2f" % (r["octetsPerSec"] / 1000000.) if r["octetsPerSec"] else '-'])
+      print
+
+      total = sum([r["runs"] for r in res])
+      print "%d runs in %.1f s (%.1f runs/s), %d diverged, %d failed" % (total, duration, total / duration if duration > 0 else 0, sum([r["diverged"] for r in res]), sum([r["failed"] for r in res]))
+
+      if self.outfile:
+         f = open(self.outfile, 'w')
+         f.write(json.dumps(res, sort_keys = True, indent = 3, separators = (',', ': ')))
+         f.close()
+
+      self.d.callback(res)
+
+
+
+def startRecord(spec, debug = False):
+   """
+   Start a recording proxy listening on spec["listen"] (port, on
+   spec["interface"]) and forwarding to spec["url"].
+   """
+   outdir = spec.get("outdir", "./recordings")
+   if not os.path.exists(outdir):
+      os.makedirs(outdir)
+   port = int(spec.get("listen", 9100))
+   interface = spec.get("interface", "")
+   factory = RecordingProxyFactory(spec["url"], outdir)
+   reactor.listenTCP(port, factory, interface = interface)
+   print "Recording sessions to %s in %s: connect to %s:%d instead" % (spec["url"], outdir, interface or "*", port)
+   return True
+
+
+def startReplay(spec, debug = False):
+   replay = Replay(spec, debug)
+   return replay.run()
@@ -0,0 +1,419 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ['startClient',
+           'DRIFT_METRICS',
+           'findDrift',
+           ]
+
+##
+## Soak testing: run a workload against a testee for hours, and watch for
+## slow drift, such as memory leaks or latency creeping up. The workload is
+## either
+##
+##    - "echo": connections each keeping a window of messages in flight to
+##      an echo testee (as cases 9.11/9.12 do), the latency being the round
+##      trip time of each message
+##    - "cases": the selected cases run in a loop, one after the other, the
+##      latency being the case duration
+##
+## Every interval, latency percentiles, the error rate and (optionally) the
+## testee's RSS are appended as one JSON line to "soak.json" in outdir. Each
+## metric is tested for a monotonic trend (Mann-Kendall) over the intervals,
+## and drift is flagged when the trend is significant *and* the change over
+## the run (Theil-Sen slope) exceeds a relative threshold of the level in the
+## first intervals. At the end, "soak_summary.json" is written.
+##
+
+import os, json
+from collections import deque
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred
+
+from autobahn.twisted.websocket import connectWS, \
+                                       WebSocketClientFactory, \
+                                       WebSocketClientProtocol
+
+from case.case import Case
+from fuzzing import FuzzingFactory, FuzzingClientFactory, FuzzingClientProtocol
+from stats import Histogram, median, mannKendall, theilSenSlope
+from util import Tabify, monotonic, readRss
+
+
+## secs to wait for connections to finish when stopping
+##
+STOP_TIMEOUT = 30
+
+## metrics watched for drift: (name, higher is worse)
+##
+DRIFT_METRICS = [("p50", True),
+                 ("p99", True),
+                 ("errorRate", True),
+                 ("rate", False),
+                 ("rss", True)]
+
+
+def findDrift(intervals, z = 2.58, threshold = 0.2, baseline = 3):
+   """
+   Find metrics drifting over the intervals of a soak run.
+
+   :param intervals: Interval records (with "t" and the metrics).
+   :type intervals: list
+   :param z: Critical value of the trend test (2.58 for 1%).
+   :type z: float
+   :param threshold: Minimum change over the run, relative to the baseline.
+   :type threshold: float
+   :param baseline: Number of first intervals giving the baseline level.
+   :type baseline: int
+   :returns: dict -- Per metric: trend z score, slope (per hour), baseline,
+      relative change and whether drift is flagged.
+   """
+   res = {}
+   for (metric, higherIsWorse) in DRIFT_METRICS:
+      points = [(i["t"], i[metric]) for i in intervals if i.get(metric) is not None]
+      if len(points) < max(baseline + 2, 6):
+         continue
+      xs = [p[0] for p in points]
+      ys = [p[1] for p in points]
+      score = mannKendall(ys)
+      slope = theilSenSlope(xs, ys)
+      level = median(ys[:baseline])
+      change = slope * (xs[-1] - xs[0])
+      if level:
+         relative = change / float(level)
+      else:
+         ## e.g. error rate starting at zero
+         relative = None if change == 0 else (1. if change > 0 else -1.)
+      worse = (score > z) if higherIsWorse else (score < -z)
+      res[metric] = {"trend": score,
+                     "slopePerHour": slope * 3600.,
+                     "baseline": level,
+                     "change": relative,
+                     "drift": bool(worse and relative is not None and abs(relative) > threshold)}
+   return res
+
+
+
+class SoakEchoProtocol(WebSocketClientProtocol):
+
+   def onOpen(self):
+      self.inflight = deque()
+      for i in xrange(self.factory.window):
+         self.sendOne()
+
+   def sendOne(self):
+      self.inflight.append(monotonic())
+      self.sendMessage(self.factory.payload, self.factory.binary)
+
+   def onMessage(self, payload, binary):
+      ## echo preserves message order, so this answers the oldest message in flight
+      sent = self.inflight.popleft()
+      if binary != self.factory.binary or payload != self.factory.payload:
+         self.factory.soak.error("echo differs")
+         self.sendClose(self.CLOSE_STATUS_CODE_NORMAL)
+         return
+      self.factory.soak.record(round(1000000. * (monotonic() - sent)))
+      if self.factory.soak.running:
+         self.sendOne()
+      elif len(self.inflight) == 0:
+         self.sendClose(self.CLOSE_STATUS_CODE_NORMAL)
+
+   def onClose(self, wasClean, code, reason):
+      if self.factory.soak.running:
+         self.factory.soak.error("connection closed (%s)" % (code if code else reason))
+
+
+class SoakEchoFactory(WebSocketClientFactory):
+
+   protocol = SoakEchoProtocol
+
+   def __init__(self, soak, spec):
+      WebSocketClientFactory.__init__(self, soak.url)
+      self.soak = soak
+      self.window = int(spec.get("window", 8))
+      self.binary = bool(spec.get("binary", False))
+      self.payload = ("\xfe" if self.binary else "*") * int(spec.get("size", 256))
+      self.setProtocolOptions(**soak.options)
+
+   def clientConnectionLost(self, connector, reason):
+      self.soak.reconnect(connector)
+
+   def clientConnectionFailed(self, connector, reason):
+      self.soak.error("connection failed (%s)" % reason.getErrorMessage())
+      self.soak.reconnect(connector)
+
+
+
+class SoakCaseProtocol(FuzzingClientProtocol):
+
+   def onConnect(self, response):
+      ## no output per case
+      pass
+
+
+class SoakCaseFactory(FuzzingClientFactory):
+   """
+   Runs the selected cases in a loop.
+   """
+
+   protocol = SoakCaseProtocol
+
+   def __init__(self, soak, spec, debug = False):
+
+      WebSocketClientFactory.__init__(self, debug = debug, debugCodePaths = debug)
+      FuzzingFactory.__init__(self, soak.outdir)
+
+      # needed for wire log / stats
+      self.logOctets = True
+      self.logFrames = True
+
+      self.soak = soak
+      self.spec = {"servers": [{"agent": "Soak", "url": soak.url, "memory": spec.get("memory", None)}],
+                   "options": soak.options}
+      self.CaseSet = self.createCaseSet(spec)
+      self.specCases = self.CaseSet.parseSpecCases(spec)
+      self.specExcludeAgentCases = {}
+      self.batch = None
+
+      self.currServer = -1
+      self.nextServer()
+
+
+   def nextCase(self):
+      if FuzzingClientFactory.nextCase(self):
+         return True
+      ## start over
+      self.currSpecCase = -1
+      return FuzzingClientFactory.nextCase(self)
+
+
+   def logCase(self, caseResults):
+      ## case results are not kept, just recorded (with a case timeout being an error)
+      if caseResults["behavior"] in [Case.OK, Case.NON_STRICT, Case.INFORMATIONAL]:
+         self.soak.record(1000 * caseResults["duration"])
+      else:
+         self.soak.error("case %s %s" % (caseResults["id"], caseResults["behavior"]))
+
+
+   def clientConnectionLost(self, connector, reason):
+      if self.soak.running:
+         self.nextCase()
+         connector.connect()
+      else:
+         self.soak.connectionDone()
+
+
+   def clientConnectionFailed(self, connector, reason):
+      self.soak.error("connection failed (%s)" % reason.getErrorMessage())
+      self.soak.reconnect(connector)
+
+
+
+class Soak:
+
+   def __init__(self, spec, debug = False):
+      self.spec = spec
+      self.debug = debug
+      self.url = spec["url"]
+      self.outdir = spec.get("outdir", "./reports/soak")
+      self.duration = float(spec.get("duration", 4 * 3600))
+      self.interval = float(spec.get("interval", 60))
+      self.workload = spec.get("workload", "echo")
+      self.memory = spec.get("memory", None)
+      self.options = spec.get("options", {})
+
+      drift = spec.get("drift", {})
+      self.z = float(drift.get("z", 2.58))
+      self.threshold = float(drift.get("threshold", 0.2))
+      self.baseline = int(drift.get("baseline", 3))
+      self.window = int(drift.get("window", 360))
+
+      if self.workload not in ["echo", "cases"]:
+         raise Exception("unknown soak workload %s" % self.workload)
+
+      self.running = False
+      self.connections = 0
+      self.intervals = []
+      self.drifting = set()
+      self.errors = {}
+      self.histogram = Histogram()
+      self.total = Histogram()
+      self.errorCount = 0
+
+
+   def run(self):
+      if not os.path.exists(self.outdir):
+         os.makedirs(self.outdir)
+      self.timeseries = open(os.path.join(self.outdir, "soak.json"), 'w')
+
+      self.d = Deferred()
+      self.running = True
+      self.started = monotonic()
+      self.intervalStarted = self.started
+
+      if self.workload == "echo":
+         echo = self.spec.get("echo", {})
+         factory = SoakEchoFactory(self, echo)
+         self.connections = int(echo.get("connections", 4))
+         for i in xrange(self.connections):
+            connectWS(factory)
+         what = "%d echo connections, window %d, %d octet %s messages" % (self.connections, factory.window, len(factory.payload), "binary" if factory.binary else "text")
+      else:
+         factory = SoakCaseFactory(self, self.spec, self.debug)
+         self.connections = 1
+         factory.nextCase()
+         connectWS(factory)
+         what = "%d cases in a loop" % len(factory.specCases)
+
+      print "Soaking %s for %.1f hours with %s, reporting every %d s to %s" % (self.url, self.duration / 3600., what, self.interval, os.path.join(self.outdir, "soak.json"))
+
+      self.intervalCall = reactor.callLater(self.interval, self.onInterval)
+      self.stopCall = reactor.callLater(self.duration, self.stop)
+      reactor.addSystemEventTrigger('before', 'shutdown', self.finish, True)
+      return self.d
+
+
+   def record(self, latency):
+      self.histogram.record(latency)
+
+
+   def error(self, what):
+      self.errorCount += 1
+      self.errors[what] = self.errors.get(what, 0) + 1
+      if self.debug:
+         print "Error: %s" % what
+
+
+   def reconnect(self, connector):
+      if self.running:
+         reactor.callLater(1, connector.connect)
+      else:
+         self.connectionDone()
+
+
+   def connectionDone(self):
+      self.connections -= 1
+      if self.connections == 0:
+         self.finish()
+
+
+   def onInterval(self):
+      now = monotonic()
+      elapsed = now - self.intervalStarted
+      self.intervalStarted = now
+
+      h = self.histogram
+      self.histogram = Histogram()
+      self.total.merge(h)
+      errors = self.errorCount
+      self.errorCount = 0
+
+      i = {"t": round(now - self.started, 3),
+           "count": h.count,
+           "errors": errors,
+           "errorRate": float(errors) / (h.count + errors) if h.count + errors > 0 else None,
+           "rate": h.count / elapsed if elapsed > 0 else None,
+           "rss": readRss(self.memory) if self.memory else None}
+      latency = h.summary()
+      for p in ["min", "p50", "p90", "p99", "p99.9", "max"]:
+         i[p] = latency[p]
+
+      self.intervals.append(i)
+      self.timeseries.write(json.dumps(i, sort_keys = True) + "\n")
+      self.timeseries.flush()
+
+      drift = findDrift(self.intervals[-self.window:], self.z, self.threshold, self.baseline)
+      i["drift"] = drift
+
+      print "%7.0f s: %d ok (%.0f/s), %d errors, latency p50 %s p99 %s max %s us%s" % \
+         (i["t"], h.count, i["rate"] or 0, errors, i["p50"], i["p99"], i["max"], ", RSS %.1f MB" % (i["rss"] / 1048576.) if i["rss"] else "")
+      for metric in sorted(drift.keys()):
+         if drift[metric]["drift"] and metric not in self.drifting:
+            self.drifting.add(metric)
+            print "Drift: %s changed by %+.1f%% since start (trend z = %.1f)" % (metric, 100. * drift[metric]["change"], drift[metric]["trend"])
+
+      if self.running:
+         self.intervalCall = reactor.callLater(self.interval, self.onInterval)
+
+
+   def stop(self):
+      print "Soak duration reached, stopping"
+      self.running = False
+      if self.intervalCall.active():
+         self.intervalCall.cancel()
+      self.onInterval()
+      ## don't wait forever for a stuck testee
+      self.stopCall = reactor.callLater(STOP_TIMEOUT, self.finish)
+
+
+   def finish(self, shutdown = False):
+      """
+      Write the summary. Also done when the reactor is shut down early,
+      e.g. on Ctrl-C.
+      """
+      if self.d is None:
+         return
+      self.running = False
+      for call in [self.intervalCall, self.stopCall]:
+         if call.active():
+            call.cancel()
+      self.timeseries.close()
+
+      drift = findDrift(self.intervals[-self.window:], self.z, self.threshold, self.baseline)
+      summary = {"url": self.url,
+                 "workload": self.workload,
+                 "duration": monotonic() - self.started,
+                 "intervals": len(self.intervals),
+                 "count": self.total.count,
+                 "errors": sum(self.errors.values()),
+                 "errorsByKind": self.errors,
+                 "latency": self.total.summary(),
+                 "first": self.intervals[0] if len(self.intervals) > 0 else None,
+                 "last": self.intervals[-1] if len(self.intervals) > 0 else None,
+                 "drift": drift,
+                 "drifting": sorted([m for m in drift if drift[m]["drift"]])}
+      f = open(os.path.join(self.outdir, "soak_summary.json"), 'w')
+      f.write(json.dumps(summary, sort_keys = True, indent = 3, separators = (',', ': ')))
+      f.close()
+
+      tab = Tabify(['l10', 'r14', 'r14', 'r12', 'r9', 'l*'])
+      print
+      print tab.tabify(['Metric', 'Baseline', 'Slope / h', 'Change', 'Trend z', 'Drift'])
+      print tab.tabify()
+      for (metric, higherIsWorse) in DRIFT_METRICS:
+         if drift.has_key(metric):
+            r = drift[metric]
+            print tab.tabify([metric,
+                              "%.4g" % r["baseline"] if r["baseline"] is not None else '-',
+                              "%+.4g" % r["slopePerHour"],
+                              "%+.1f%%" % (100. * r["change"]) if r["change"] is not None else '-',
+                              "%.2f" % r["trend"],
+                              "DRIFT" if r["drift"] else "ok"])
+      print
+      print "%d intervals, %d ok, %d errors, drifting: %s" % (len(self.intervals), self.total.count, summary["errors"], ', '.join(summary["drifting"]) or "none")
+
+      d, self.d = self.d, None
+      if not shutdown:
+         d.callback(summary)
+
+
+
+def startClient(spec, debug = False):
+   soak = Soak(spec, debug)
+   return soak.run()
@@ -21,7 +21,14 @@ __all__= ("SPEC_FUZZINGSERVER",
           "SPEC_FUZZINGWAMPSERVER",
           "SPEC_FUZZINGWAMPCLIENT",
           "SPEC_WSPERFCONTROL",
-          "SPEC_MASSCONNECT",)
+          "SPEC_MASSCONNECT",
+          "SPEC_PERFCOMPARE",
+          "SPEC_MUTATIONFUZZING",
+          "SPEC_DIFFERENTIAL",
+          "SPEC_RECORD",
+          "SPEC_REPLAY",
+          "SPEC_SOAK",
+          "SPEC_NETEM",)
 
 
 SPEC_FUZZINGSERVER = """
@@ -44,7 +51,7 @@ SPEC_FUZZINGCLIENT = """
                   }
               ],
    "cases": ["*"],
-   "exclude-cases": [],
+   "exclude-cases": ["0.*", "7.14.*", "9.13.*", "14.*"],
    "exclude-agent-cases": {}
 }
 """
@@ -138,3 +145,81 @@ SPEC_MASSCONNECT = """
                ]
 }
 """
+
+SPEC_PERFCOMPARE = """
+{
+   "baseline": "./reports/baseline",
+   "candidate": "./reports/servers",
+   "threshold": 0.1,
+   "noise": 5,
+   "cases": ["9.*", "12.*", "13.*"],
+   "exclude-cases": []
+}
+"""
+
+SPEC_MUTATIONFUZZING = """
+{
+   "url": "ws://127.0.0.1:9001",
+   "outdir": "./reports/mutations",
+   "seeds": ["1.*", "3.*", "4.*"],
+   "sessions": 10000,
+   "concurrency": 50,
+   "mutations": 3,
+   "timeout": 5
+}
+"""
+
+SPEC_DIFFERENTIAL = """
+{
+   "outdir": "./reports/differential",
+   "servers": [
+                  {"agent": "Server A", "url": "ws://127.0.0.1:9001"},
+                  {"agent": "Server B", "url": "ws://127.0.0.1:9002"}
+              ],
+   "cases": ["*"],
+   "exclude-cases": ["9.*", "12.*", "13.*"],
+   "exclude-agent-cases": {},
+   "close-timing": {"threshold": 0.5, "noise": 250}
+}
+"""
+
+SPEC_RECORD = """
+{
+   "listen": 9100,
+   "url": "ws://127.0.0.1:9001",
+   "outdir": "./recordings"
+}
+"""
+
+SPEC_REPLAY = """
+{
+   "url": "ws://127.0.0.1:9001",
+   "recordings": ["./recordings/*.abr"],
+   "timing": "fast",
+   "runs": 100,
+   "concurrency": 1,
+   "stall": 1
+}
+"""
+
+SPEC_SOAK = """
+{
+   "url": "ws://127.0.0.1:9001",
+   "outdir": "./reports/soak",
+   "duration": 14400,
+   "interval": 60,
+   "workload": "echo",
+   "echo": {"connections": 4, "window": 8, "size": 256, "binary": false},
+   "cases": ["1.*", "2.*", "3.*", "4.*", "5.*", "6.*", "7.*"],
+   "exclude-cases": [],
+   "drift": {"z": 2.58, "threshold": 0.2, "baseline": 3}
+}
+"""
+
+SPEC_NETEM = """
+{
+   "listen": 9100,
+   "url": "ws://127.0.0.1:9001",
+   "profile": "wan"
+}
+"""
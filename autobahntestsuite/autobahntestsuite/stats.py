@@ -0,0 +1,240 @@
+###############################################################################
+##
+##  Copyright (C) 2014 Tavendo GmbH
+##
+##  Licensed under the Apache License, Version 2.0 (the "License");
+##  you may not use this file except in compliance with the License.
+##  You may obtain a copy of the License at
+##
+##      http://www.apache.org/licenses/LICENSE-2.0
+##
+##  Unless required by applicable law or agreed to in writing, software
+##  distributed under the License is distributed on an "AS IS" BASIS,
+##  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+##  See the License for the specific language governing permissions and
+##  limitations under the License.
+##
+###############################################################################
+
+__all__ = ("Histogram",
+           "jainFairness",
+           "median",
+           "medianConfidenceInterval",
+           "mannKendall",
+           "theilSenSlope",)
+
+import math
+
+
+class Histogram:
+   """
+   Compact latency histogram with logarithmic buckets (HdrHistogram style).
+
+   Values are non-negative integers (we use microseconds). Values below
+   2**SUB_BUCKET_BITS are recorded exactly, larger values go into buckets
+   which split every power of 2 into 2**(SUB_BUCKET_BITS - 1) sub-buckets,
+   which gives a relative error of less than 2**-(SUB_BUCKET_BITS - 1).
+   Only non-empty buckets are stored.
+   """
+
+   SUB_BUCKET_BITS = 6
+   SUB_BUCKET_COUNT = 2**SUB_BUCKET_BITS
+   SUB_BUCKET_HALF = 2**(SUB_BUCKET_BITS - 1)
+
+   PERCENTILES = [50, 90, 99, 99.9]
+
+   def __init__(self, unit = "us"):
+      self.unit = unit
+      self.reset()
+
+
+   def reset(self):
+      self.buckets = {}
+      self.count = 0
+      self.total = 0
+      self.min = None
+      self.max = None
+
+
+   def bucketIndex(self, value):
+      """
+      Value => index of bucket holding the value.
+      """
+      if value < Histogram.SUB_BUCKET_COUNT:
+         return value
+      shift = value.bit_length() - Histogram.SUB_BUCKET_BITS
+      return Histogram.SUB_BUCKET_COUNT + \
+             (shift - 1) * Histogram.SUB_BUCKET_HALF + \
+             (value >> shift) - Histogram.SUB_BUCKET_HALF
+
+
+   def bucketRange(self, index):
+      """
+      Index of bucket => (lowest, highest) value falling into the bucket.
+      """
+      if index < Histogram.SUB_BUCKET_COUNT:
+         return (index, index)
+      shift = (index - Histogram.SUB_BUCKET_COUNT) // Histogram.SUB_BUCKET_HALF + 1
+      m = (index - Histogram.SUB_BUCKET_COUNT) % Histogram.SUB_BUCKET_HALF + Histogram.SUB_BUCKET_HALF
+      return (m << shift, ((m + 1) << shift) - 1)
+
+
+   def record(self, value, count = 1):
+      value = int(value)
+      if value < 0:
+         raise Exception("cannot record negative value %d" % value)
+      idx = self.bucketIndex(value)
+      self.buckets[idx] = self.buckets.get(idx, 0) + count
+      self.count += count
+      self.total += value * count
+      if self.min is None or value < self.min:
+         self.min = value
+      if self.max is None or value > self.max:
+         self.max = value
+
+
+   def merge(self, other):
+      """
+      Add all values recorded in another histogram to this one.
+      """
+      for idx in other.buckets:
+         self.buckets[idx] = self.buckets.get(idx, 0) + other.buckets[idx]
+      self.count += other.count
+      self.total += other.total
+      if other.min is not None and (self.min is None or other.min < self.min):
+         self.min = other.min
+      if other.max is not None and (self.max is None or other.max > self.max):
+         self.max = other.max
+
+
+   def percentile(self, p):
+      """
+      Value at given percentile (0 - 100). Returns the highest value equivalent
+      to the bucket the percentile falls into, clipped to the recorded range.
+      """
+      if self.count == 0:
+         return None
+      threshold = max(1, int(round(self.count * float(p) / 100.)))
+      seen = 0
+      for idx in sorted(self.buckets.keys()):
+         seen += self.buckets[idx]
+         if seen >= threshold:
+            return max(self.min, min(self.max, self.bucketRange(idx)[1]))
+      return self.max
+
+
+   def mean(self):
+      if self.count == 0:
+         return None
+      return float(self.total) / float(self.count)
+
+
+   def summary(self):
+      """
+      Summary statistics: count, min, max, mean and standard percentiles.
+      """
+      res = {"unit": self.unit,
+             "count": self.count,
+             "min": self.min,
+             "max": self.max,
+             "mean": self.mean()}
+      for p in Histogram.PERCENTILES:
+         res["p%s" % p] = self.percentile(p)
+      return res
+
+
+   def __json__(self):
+      res = self.summary()
+      res["buckets"] = [[idx, self.buckets[idx]] for idx in sorted(self.buckets.keys())]
+      return res
+
+
+   def __str__(self):
+      return "Histogram(%s)" % str(self.summary())
+
+
+def jainFairness(values):
+   """
+   Jain's fairness index of a list of (throughput) values: 1.0 when all
+   values are equal, down to 1/n when a single value takes everything.
+   """
+   if len(values) == 0:
+      return None
+   s = float(sum(values))
+   s2 = float(sum([v * v for v in values]))
+   if s2 == 0:
+      return None
+   return s * s / (len(values) * s2)
+
+
+def median(values):
+   """
+   Median of a list of values.
+   """
+   if len(values) == 0:
+      return None
+   v = sorted(values)
+   n = len(v)
+   if n % 2 == 1:
+      return v[n // 2]
+   else:
+      return (v[n // 2 - 1] + v[n // 2]) / 2.
+
+
+def medianConfidenceInterval(values, z = 1.96):
+   """
+   Distribution-free confidence interval for the median (default: 95%),
+   from the order statistics of the samples. For few samples, this is the
+   full range of the samples.
+   """
+   if len(values) == 0:
+      return None
+   v = sorted(values)
+   n = len(v)
+   j = int(math.floor(n / 2. - z * math.sqrt(n) / 2.))
+   k = int(math.ceil(1 + n / 2. + z * math.sqrt(n) / 2.))
+   j = min(max(j, 1), n)
+   k = min(max(k, 1), n)
+   return (v[j - 1], v[k - 1])
+
+
+def mannKendall(values):
+   """
+   Mann-Kendall trend test of a series of values (in time order): a
+   distribution-free test for a monotonic upward or downward trend.
+
+   :returns: float -- z score (normal approximation, without tie
+      correction), positive for an upward trend, or None for fewer than
+      3 values. A trend is significant at 5% / 1% when abs(z) > 1.96 / 2.58.
+   """
+   n = len(values)
+   if n < 3:
+      return None
+   s = 0
+   for i in xrange(n - 1):
+      for j in xrange(i + 1, n):
+         d = values[j] - values[i]
+         if d > 0:
+            s += 1
+         elif d < 0:
+            s -= 1
+   var = n * (n - 1) * (2 * n + 5) / 18.
+   if s > 0:
+      return (s - 1) / math.sqrt(var)
+   elif s < 0:
+      return (s + 1) / math.sqrt(var)
+   else:
+      return 0.
+
+
+def theilSenSlope(xs, ys):
+   """
+   Theil-Sen estimate of the slope of ys over xs: the median of the slopes
+   between all pairs of points, which is robust against outliers.
+   """
+   slopes = []
+   for i in xrange(len(xs) - 1):
+      for j in xrange(i + 1, len(xs)):
+         if xs[j] != xs[i]:
+            slopes.append(float(ys[j] - ys[i]) / (xs[j] - xs[i]))
+   return median(slopes)
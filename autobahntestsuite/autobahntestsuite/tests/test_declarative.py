@@ -0,0 +1,43 @@
+from twisted.trial import unittest
+from autobahn.websocket.xormasker import createXorMasker
+from autobahntestsuite.case.frames import maskPayload, encodeFrame
+from autobahntestsuite.case.declarative import compileCase
+from autobahntestsuite.case.case3_2 import Case3_2
+from autobahntestsuite.case.case3_3 import Case3_3
+
+
+class TestDeclarative(unittest.TestCase):
+    """
+    This test case checks compiling declarative cases to frame octets.
+    """
+
+    def testMaskPayload(self):
+        """
+        Masking in one pass should give the same as the XOR masker.
+        """
+        for n in [0, 1, 3, 4, 5, 125, 65537]:
+            payload = "".join([chr(i % 256) for i in xrange(n)])
+            self.assertEquals(maskPayload("\x12\x34\x56\x78", payload),
+                              createXorMasker("\x12\x34\x56\x78", n).process(payload))
+
+
+    def testCoalesce(self):
+        """
+        Frames without sync/chopsize should be written at once, already
+        encoded when not masked.
+        """
+        program = compileCase(Case3_2, False)
+        self.assertEquals([op[0] for op in program], ["write", "killAfter"])
+        self.assertEquals(program[0][4],
+                          encodeFrame(1, "Hello, world!") + encodeFrame(1, "Hello, world!", rsv = 2) + encodeFrame(9))
+
+
+    def testSync(self):
+        """
+        Frames with sync should be written one by one, and masked frames
+        only get encoded when written.
+        """
+        program = compileCase(Case3_3, True)
+        self.assertEquals([op[0] for op in program], ["write", "write", "write", "killAfter"])
+        self.assertEquals(program[0][4], None)
+        self.assertTrue(compileCase(Case3_3, True) is program)
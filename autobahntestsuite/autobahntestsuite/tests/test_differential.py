@@ -0,0 +1,37 @@
+from twisted.trial import unittest
+from autobahntestsuite.differential import findDivergences
+
+
+def result(received = [], closeCode = 1000, duration = 10):
+    return {"received": received,
+            "remoteCloseCode": closeCode,
+            "closedByMe": True,
+            "wasClean": True,
+            "behavior": "OK",
+            "behaviorClose": "OK",
+            "duration": duration}
+
+
+class TestDifferential(unittest.TestCase):
+    """
+    This test case checks comparing case results between servers.
+    """
+
+    def testAgree(self):
+        """
+        Equal results do not diverge, nor do small timing differences.
+        """
+        self.assertEquals(findDivergences({"A": result([("message", "x", False)]),
+                                           "B": result([("message", "x", False)], duration = 200)}), {})
+
+
+    def testDiverge(self):
+        """
+        Diverging aspects are reported with the value of each server.
+        """
+        d = findDivergences({"A": result(closeCode = 1002),
+                             "B": result(closeCode = 1007, duration = 2000),
+                             "C": None})
+        self.assertEquals(sorted(d.keys()), ["closeCode", "closeTiming", "connect"])
+        self.assertEquals(d["closeCode"], {"A": 1002, "B": 1007})
+        self.assertEquals(d["connect"]["C"], "failed")
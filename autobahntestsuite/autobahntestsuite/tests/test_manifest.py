@@ -0,0 +1,44 @@
+from twisted.trial import unittest
+from autobahntestsuite.case import CaseSetname, CaseBasename, CaseCategories, loadManifest
+from autobahntestsuite.case.builtin import Cases, CaseSubCategories, OPTIONAL_CATEGORIES, createManifest
+from autobahntestsuite.caseset import ManifestCaseSet
+
+
+class TestManifest(unittest.TestCase):
+    """
+    This test case checks the manifest of builtin cases.
+    """
+
+    def testUpToDate(self):
+        """
+        The manifest should list the builtin cases as they are (recreate it
+        with python -m autobahntestsuite.case.builtin when this fails).
+        """
+        manifest = createManifest()
+        self.assertEquals(loadManifest()["cases"], manifest["cases"])
+        self.assertEquals(loadManifest()["optional"], manifest["optional"])
+
+
+    def testOptional(self):
+        """
+        Optional categories are never listed, whether available or not.
+        """
+        manifest = createManifest()
+        self.assertEquals(sorted(manifest["optional"].keys()), sorted(OPTIONAL_CATEGORIES.keys()))
+        for c in manifest["cases"]:
+            self.assertFalse(c["id"].split('.')[0] in OPTIONAL_CATEGORIES)
+
+
+    def testLoad(self):
+        """
+        Cases should load from the modules listed in the manifest.
+        """
+        caseSet = ManifestCaseSet(CaseSetname, CaseBasename, loadManifest(), "autobahntestsuite.case", CaseCategories, dict(CaseSubCategories))
+        self.assertEquals(caseSet.parseSpecCases({"cases": ["6.5.*", "1.1.1"], "exclude-cases": ["6.5.2"]}),
+                          ["1.1.1", "6.5.1", "6.5.3", "6.5.4", "6.5.5"])
+        for C in Cases:
+            caseId = caseSet.caseClasstoId(C)
+            if caseId.split('.')[0] in OPTIONAL_CATEGORIES:
+                continue
+            self.assertTrue(caseSet.CasesById[caseId] is C)
+            self.assertEquals(Cases[caseSet.CasesIndices[caseId] - 1], C)
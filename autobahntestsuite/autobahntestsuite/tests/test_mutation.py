@@ -0,0 +1,68 @@
+import os, random, tempfile
+from twisted.trial import unittest
+from twisted.internet import defer
+from autobahntestsuite.case.frames import encodeHeader, encodeFrame
+from autobahntestsuite.case.case21_x_x import frame, saveRepro, loadRepro, generateReproCases
+from autobahntestsuite.mutationfuzzing import mutate, minimize
+
+
+class TestMutation(unittest.TestCase):
+    """
+    This test case checks mutating, minimizing and saving frame sequences.
+    """
+
+    def testLengthBytes(self):
+        """
+        Lengths can be encoded with more octets than needed.
+        """
+        self.assertEquals(encodeHeader(1, 5), "\x81\x05")
+        self.assertEquals(encodeHeader(1, 5, lengthBytes = 2), "\x81\x7e\x00\x05")
+        self.assertEquals(encodeHeader(1, 5, lengthBytes = 8), "\x81\x7f" + "\x00" * 7 + "\x05")
+        self.assertEquals(encodeFrame(2, "abc", lengthBytes = 0), encodeFrame(2, "abc"))
+
+
+    def testHeaderBits(self):
+        """
+        Opcode and RSV never overflow into other bits of the header.
+        """
+        self.assertEquals(encodeHeader(0x1f, 0, fin = False), "\x0f\x00")
+        self.assertEquals(encodeHeader(1, 0, rsv = 9), "\x91\x00")
+
+
+    def testMutate(self):
+        """
+        Mutating works on a copy.
+        """
+        frames = [frame(1, "Hello"), frame(9)]
+        rnd = random.Random(1)
+        for i in xrange(100):
+            mutated, applied = mutate(rnd, frames, 3)
+            self.assertTrue(len(applied) <= 3)
+        self.assertEquals(frames, [frame(1, "Hello"), frame(9)])
+
+
+    @defer.inlineCallbacks
+    def testMinimize(self):
+        """
+        Minimizing keeps the frames and payload octets needed to reproduce.
+        """
+        frames = [frame(1, "a" * 100), frame(8, "\xff" * 8), frame(9, "ping")]
+        reproduces = lambda c: defer.succeed(any([f["opcode"] == 8 and f["payload"].startswith("\xff\xff") for f in c]))
+        res = yield minimize(frames, reproduces)
+        self.assertEquals(res, [frame(8, "\xff\xff")])
+
+
+    def testRepro(self):
+        """
+        Repros are saved with binary payloads and replayed as cases 21.x.x.
+        """
+        fd, fn = tempfile.mkstemp(suffix = ".json")
+        os.close(fd)
+        self.addCleanup(os.remove, fn)
+        frames = [frame(1, "\xed\xa0\x80", fin = False, lengthBytes = 8), frame(0, "", rsv = 4, masked = False)]
+        saveRepro(fn, {"kind": "hang", "frames": frames, "timeout": 3})
+        self.assertEquals(loadRepro(fn)["frames"], frames)
+        cases, subCategories = generateReproCases([fn])
+        self.assertEquals([C.__name__ for C in cases], ["Case21_1_1"])
+        self.assertEquals(cases[0].WAITSECS, 3)
+        self.assertTrue(subCategories.has_key("21.1"))
@@ -0,0 +1,80 @@
+from twisted.trial import unittest
+from twisted.internet.task import Clock
+from autobahntestsuite.netem import NetworkLink, networkProfile
+
+
+class FakeTransport:
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.writes = []
+        self.closed = None
+
+    def write(self, data):
+        self.writes.append((self.clock.seconds(), data))
+
+    def loseConnection(self):
+        self.closed = self.clock.seconds()
+
+
+class TestNetem(unittest.TestCase):
+    """
+    This test case checks the emulated network link.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.transport = FakeTransport(self.clock)
+
+
+    def link(self, **profile):
+        link = NetworkLink(profile, clock = self.clock)
+        link.transport = self.transport
+        return link
+
+
+    def testLatency(self):
+        """
+        Octets arrive after the latency, and the close after them.
+        """
+        link = self.link(latency = 50)
+        link.send("hello")
+        link.close()
+        self.clock.advance(0.049)
+        self.assertEquals(self.transport.writes, [])
+        self.clock.advance(0.001)
+        self.assertEquals([w[1] for w in self.transport.writes], ["hello"])
+        self.assertEquals(self.transport.closed, 0.05)
+
+
+    def testBandwidthAndSegments(self):
+        """
+        Segments are written one by one, at the pace of the bandwidth.
+        """
+        link = self.link(bandwidth = 8, segment = 500)
+        link.send("*" * 1500)
+        self.clock.pump([0.5] * 4)
+        self.assertEquals([(round(t, 3), len(d)) for (t, d) in self.transport.writes],
+                          [(0.5, 500), (1.0, 500), (1.5, 500)])
+
+
+    def testNoReordering(self):
+        """
+        Jitter never reorders octets.
+        """
+        link = self.link(latency = 10, jitter = 10)
+        for i in xrange(100):
+            link.send(chr(i))
+            self.clock.advance(0.001)
+        self.clock.advance(1)
+        self.assertEquals(''.join([w[1] for w in self.transport.writes]), ''.join([chr(i) for i in xrange(100)]))
+
+
+    def testProfiles(self):
+        """
+        Profiles are given by name or as dict.
+        """
+        self.assertEquals(networkProfile("loopback"), ("loopback", {}))
+        self.assertEquals(networkProfile({"name": "slow", "latency": 100}), ("slow", {"latency": 100}))
+        self.assertRaises(Exception, networkProfile, "nonexistent")
+        self.assertRaises(Exception, networkProfile, {"loss": 0.1})
@@ -0,0 +1,63 @@
+import os, tempfile
+from twisted.trial import unittest
+from autobahntestsuite.recording import RecordingWriter, readRecording, ReplayFactory, \
+                                        TX, RX, TX_CLOSE, _divergence, _splitHandshake, _headerDiff
+
+
+class TestRecording(unittest.TestCase):
+    """
+    This test case checks the recording format and comparing replays.
+    """
+
+    def testRoundtrip(self):
+        """
+        Chunks are read back as written, with increasing times.
+        """
+        fd, fn = tempfile.mkstemp(suffix = ".abr")
+        os.close(fd)
+        self.addCleanup(os.remove, fn)
+        w = RecordingWriter(fn, u"ws://127.0.0.1:9001")
+        w.write(TX, "GET / HTTP/1.1\r\n\r\n")
+        w.write(RX, "\x81\x05Hello")
+        w.write(TX_CLOSE)
+        w.close()
+        w.write(RX, "ignored")
+        header, chunks = readRecording(fn)
+        self.assertEquals(header["url"], "ws://127.0.0.1:9001")
+        self.assertEquals([(c[0], c[2]) for c in chunks],
+                          [(TX, "GET / HTTP/1.1\r\n\r\n"), (RX, "\x81\x05Hello"), (TX_CLOSE, "")])
+        self.assertTrue(chunks[0][1] <= chunks[1][1] <= chunks[2][1])
+
+
+    def testDivergence(self):
+        """
+        Divergence is the offset of the first differing octet.
+        """
+        self.assertEquals(_divergence("abc", "abc"), None)
+        self.assertEquals(_divergence("abc", "abd"), 2)
+        self.assertEquals(_divergence("abc", "ab"), 2)
+
+
+    def testHandshake(self):
+        """
+        Replays are compared after the HTTP response headers, which are
+        compared by header.
+        """
+        response = "HTTP/1.1 101 Switching Protocols\r\nServer: A\r\nDate: 1\r\n\r\n"
+        self.assertEquals(_splitHandshake(response + "\x81\x00"), (response, "\x81\x00"))
+        self.assertEquals(_splitHandshake("HTTP/1.1 101"), (None, "HTTP/1.1 101"))
+        self.assertEquals(_headerDiff(response, response.replace("Date: 1", "Date: 22")), ["date"])
+        self.assertEquals(_headerDiff(response, response.replace("101", "400")), ["status"])
+
+        fd, fn = tempfile.mkstemp(suffix = ".abr")
+        os.close(fd)
+        self.addCleanup(os.remove, fn)
+        w = RecordingWriter(fn, u"ws://127.0.0.1:9001")
+        w.write(TX, "GET / HTTP/1.1\r\n\r\n")
+        w.write(RX, response + "\x81\x02")
+        w.write(RX, "Hi")
+        w.write(TX, "\x88\x80abcd")
+        w.close()
+        f = ReplayFactory(None, fn, True, 1)
+        self.assertEquals(f.expectedBody, "\x81\x02Hi")
+        self.assertEquals(f.rxBefore, [(False, 0), (False, 0), (True, 2), (True, 4), (True, 4)])
@@ -0,0 +1,28 @@
+from twisted.trial import unittest
+from autobahntestsuite.soak import findDrift
+
+
+def intervals(rss, p99 = 1000):
+    return [{"t": 60 * i, "p50": 500, "p99": p99, "errorRate": 0., "rate": 1000., "rss": rss(i)} for i in xrange(30)]
+
+
+class TestSoak(unittest.TestCase):
+    """
+    This test case checks flagging drift in soak runs.
+    """
+
+    def testLeak(self):
+        """
+        Memory growing steadily by more than the threshold is drift.
+        """
+        drift = findDrift(intervals(lambda i: 50000000 + 1000000 * i))
+        self.assertTrue(drift["rss"]["drift"])
+        self.assertFalse(drift["p99"]["drift"])
+
+
+    def testSmallOrFlat(self):
+        """
+        A significant but small change, or no change, is not drift.
+        """
+        self.assertFalse(findDrift(intervals(lambda i: 50000000 + 1000 * i))["rss"]["drift"])
+        self.assertFalse(findDrift(intervals(lambda i: 50000000))["rss"]["drift"])
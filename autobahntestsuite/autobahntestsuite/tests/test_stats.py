@@ -0,0 +1,79 @@
+from twisted.trial import unittest
+from autobahntestsuite.stats import Histogram, mannKendall, theilSenSlope
+
+
+class TestHistogram(unittest.TestCase):
+    """
+    This test case checks if the latency histogram behaves as expected.
+    """
+
+    def setUp(self):
+        self.histogram = Histogram()
+
+
+    def testBucketRange(self):
+        """
+        Every value should fall into the range of the bucket it is mapped to.
+        """
+        for val in [0, 1, 63, 64, 65, 127, 128, 129, 1000, 65535, 123456789]:
+            lo, hi = self.histogram.bucketRange(self.histogram.bucketIndex(val))
+            self.assertTrue(lo <= val <= hi)
+
+
+    def testPercentiles(self):
+        """
+        Percentiles should be exact for small values and within bucket
+        precision for larger ones.
+        """
+        for val in xrange(1, 101):
+            self.histogram.record(val)
+        self.assertEquals(self.histogram.count, 100)
+        self.assertEquals(self.histogram.min, 1)
+        self.assertEquals(self.histogram.max, 100)
+        self.assertEquals(self.histogram.percentile(50), 50)
+        self.assertTrue(abs(self.histogram.percentile(90) - 90) <= 2)
+
+
+    def testMerge(self):
+        """
+        Merging histograms should add up counts and keep min/max.
+        """
+        other = Histogram()
+        self.histogram.record(10)
+        other.record(5)
+        other.record(5000)
+        self.histogram.merge(other)
+        self.assertEquals(self.histogram.count, 3)
+        self.assertEquals(self.histogram.min, 5)
+        self.assertEquals(self.histogram.max, 5000)
+
+
+    def testEmpty(self):
+        """
+        An empty histogram has no percentiles.
+        """
+        self.assertEquals(self.histogram.percentile(99), None)
+        self.assertEquals(self.histogram.summary()["count"], 0)
+
+
+
+class TestTrend(unittest.TestCase):
+    """
+    This test case checks trend statistics used for drift detection.
+    """
+
+    def testMannKendall(self):
+        """
+        A steady upward series is a significant trend, noise is not.
+        """
+        self.assertTrue(mannKendall(range(20)) > 2.58)
+        self.assertTrue(mannKendall(range(20, 0, -1)) < -2.58)
+        self.assertTrue(abs(mannKendall([5, 3, 6, 2, 5, 4, 3, 6, 4, 5])) < 1.96)
+        self.assertEquals(mannKendall([1, 2]), None)
+
+
+    def testTheilSen(self):
+        """
+        The slope estimate ignores outliers.
+        """
+        self.assertEquals(theilSenSlope([0, 1, 2, 3, 4], [0, 2, 4, 100, 8]), 2.)
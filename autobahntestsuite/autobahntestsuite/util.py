@@ -16,10 +16,10 @@
 ##
 ###############################################################################
 
-__all__ = ("AttributeBag", "Tabify", "perf_counter", )
+__all__ = ("AttributeBag", "Tabify", "perf_counter", "monotonic", "readRss", "transportPending", )
 
 
-import json, platform, sys
+import os, json, platform, sys
 from datetime import datetime
 
 from twisted.python import log
@@ -45,6 +45,76 @@ else:
    perf_counter = time.perf_counter
 
 
+# http://www.python.org/dev/peps/pep-0418/#time-monotonic
+# until time.monotonic becomes available in Python 2 we use clock_gettime()
+# on Linux, and fall back to perf_counter elsewhere. Use this for measuring
+# latencies, since it does not jump with wall clock adjustments.
+if hasattr(time, 'monotonic'):
+   monotonic = time.monotonic
+else:
+   try:
+      import ctypes, ctypes.util
+
+      class _timespec(ctypes.Structure):
+         _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+      _CLOCK_MONOTONIC = 1
+      _librt = ctypes.CDLL(ctypes.util.find_library('rt') or 'librt.so.1', use_errno = True)
+      _clock_gettime = _librt.clock_gettime
+      _clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(_timespec)]
+
+      def monotonic():
+         t = _timespec()
+         if _clock_gettime(_CLOCK_MONOTONIC, ctypes.pointer(t)) != 0:
+            raise OSError(ctypes.get_errno(), "clock_gettime failed")
+         return t.tv_sec + t.tv_nsec * 1e-9
+
+      monotonic()
+   except:
+      monotonic = perf_counter
+
+
+def readRss(source):
+   """
+   Read the resident set size (in bytes) of a (local) process, e.g. a testee.
+   Only works on Linux (/proc).
+
+   :param source: PID of process, a /proc/<pid> directory or a /proc/<pid>/status file.
+   :type source: int or str
+   :returns: int -- RSS in bytes or None if it could not be read.
+   """
+   if type(source) in [int, long]:
+      fn = "/proc/%d/status" % source
+   elif str(source).isdigit():
+      fn = "/proc/%s/status" % source
+   elif os.path.isdir(source):
+      fn = os.path.join(source, "status")
+   else:
+      fn = source
+   try:
+      for line in open(fn).readlines():
+         if line.startswith("VmRSS:"):
+            ## "VmRSS:     12345 kB"
+            return int(line.split()[1]) * 1024
+   except IOError:
+      pass
+   return None
+
+
+def transportPending(transport):
+   """
+   Octets written to a Twisted transport, but not yet written to the socket.
+
+   :param transport: A Twisted TCP transport.
+   :returns: int -- Number of octets pending, or None when this can't be
+      told for the transport (e.g. TLS).
+   """
+   try:
+      return len(transport.dataBuffer) - transport.offset + transport._tempDataLen
+   except AttributeError:
+      return None
+
+
 class AttributeBag:
 
    def __init__(self, **args):
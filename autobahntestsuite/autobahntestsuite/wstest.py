@@ -44,6 +44,12 @@ import fuzzing
 import echo
 import broadcast
 import massconnect
+import perfcompare
+import mutationfuzzing
+import differential
+import recording
+import soak
+import netem
 #import wsperfcontrol
 #import wsperfmaster
 import serializer
@@ -54,7 +60,14 @@ from spectemplate import SPEC_FUZZINGSERVER, \
                          SPEC_FUZZINGWAMPSERVER, \
                          SPEC_FUZZINGWAMPCLIENT, \
                          SPEC_WSPERFCONTROL, \
-                         SPEC_MASSCONNECT
+                         SPEC_MASSCONNECT, \
+                         SPEC_PERFCOMPARE, \
+                         SPEC_MUTATIONFUZZING, \
+                         SPEC_DIFFERENTIAL, \
+                         SPEC_RECORD, \
+                         SPEC_REPLAY, \
+                         SPEC_SOAK, \
+                         SPEC_NETEM
 
 
 
@@ -80,6 +93,13 @@ class WsTestOptions(usage.Options):
             #'wamptesteeserver',
             #'wampclient',
             'massconnect',
+            'perfcompare',
+            'mutationfuzzing',
+            'differential',
+            'record',
+            'replay',
+            'soak',
+            'netem',
             #'web',
             #'import',
             #'export',
@@ -93,6 +113,13 @@ class WsTestOptions(usage.Options):
                          'fuzzingwampclient',
                          'wsperfcontrol',
                          'massconnect',
+                         'perfcompare',
+                         'mutationfuzzing',
+                         'differential',
+                         'record',
+                         'replay',
+                         'soak',
+                         'netem',
                          'import']
 
    # Modes that need a Websocket URI
@@ -112,6 +139,13 @@ class WsTestOptions(usage.Options):
                              'fuzzingserver':     SPEC_FUZZINGSERVER,
                              'wsperfcontrol':     SPEC_WSPERFCONTROL,
                              'massconnect':       SPEC_MASSCONNECT,
+                             'perfcompare':       SPEC_PERFCOMPARE,
+                             'mutationfuzzing':   SPEC_MUTATIONFUZZING,
+                             'differential':      SPEC_DIFFERENTIAL,
+                             'record':            SPEC_RECORD,
+                             'replay':            SPEC_REPLAY,
+                             'soak':              SPEC_SOAK,
+                             'netem':             SPEC_NETEM,
                              'fuzzingwampclient': SPEC_FUZZINGWAMPCLIENT,
                              'fuzzingwampserver': SPEC_FUZZINGWAMPSERVER}
 
@@ -235,6 +269,29 @@ class WsTestRunner(object):
       elif self.mode == "massconnect":
          return massconnect.startClient(self.spec, debug = self.debug)
 
+      elif self.mode == "perfcompare":
+         if perfcompare.start(self.spec, debug = self.debug) > 0:
+            sys.exit(1)
+         return False
+
+      elif self.mode == "mutationfuzzing":
+         return mutationfuzzing.startClient(self.spec, debug = self.debug)
+
+      elif self.mode == "differential":
+         return differential.startClient(self.spec, debug = self.debug)
+
+      elif self.mode == "record":
+         return recording.startRecord(self.spec, debug = self.debug)
+
+      elif self.mode == "replay":
+         return recording.startReplay(self.spec, debug = self.debug)
+
+      elif self.mode == "soak":
+         return soak.startClient(self.spec, debug = self.debug)
+
+      elif self.mode == "netem":
+         return netem.startProxy(self.spec, debug = self.debug)
+
       elif self.mode == "serializer":
          return serializer.start(outfilename = self.options['outfile'], debug = self.debug)
 
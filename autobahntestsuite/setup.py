@@ -96,7 +96,7 @@ setup (
    #packages = ['autobahntestsuite'],
    include_package_data = True,
    package_data = {
-        '': ['templates/*.html'],
+        '': ['templates/*.html', 'case/manifest.json'],
     },
    zip_safe = False,
    entry_points = {